@@ -41,6 +41,7 @@ class BlindNavigationClient:
         self.current_location = None
         self.is_navigating = False
         self.obstacle_detection_active = False
+        self.next_capture_ms = None  # server's pacing hint from the last frame
         self.running = True
         
         print("🎯 Blind Navigation System Initialized")
@@ -155,11 +156,13 @@ class BlindNavigationClient:
         
         # Capture frame
         ret, frame = self.camera.read()
+        captured_at = int(time.time() * 1000)
         if not ret:
             self.speak("Failed to capture image")
             return None
         
-        # Encode to base64
+        # Encode to base64; the API doesn't list image/jpeg as a binary media
+        # type, so a raw JPEG body would not reach the Lambda intact
         _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
         image_base64 = base64.b64encode(buffer).decode('utf-8')
         
@@ -168,14 +171,19 @@ class BlindNavigationClient:
             payload = {
                 'action': 'detect_obstacles',
                 'image': image_base64,
-                'location': self.current_location
+                'capturedAt': captured_at
             }
+            if self.current_location:
+                payload['latitude'], payload['longitude'] = self.current_location[:2]
             
             response = requests.post(self.api_url, json=payload, timeout=10)
             data = response.json()
+            self.next_capture_ms = None
             
             if data.get('success'):
                 body = json.loads(data['body']) if isinstance(data['body'], str) else data['body']
+                # The pacing hint travels in the same body as the rest of the result
+                self.next_capture_ms = body.get('nextCaptureMs')
                 
                 # Play warning audio
                 if body.get('audio_warning'):
@@ -210,7 +218,8 @@ class BlindNavigationClient:
                 # High danger - immediate warning
                 self.speak(result['immediate_action'])
             
-            time.sleep(2)  # Check every 2 seconds
+            # Follow the server's pacing hint; fall back to every 2 seconds
+            time.sleep((self.next_capture_ms or 2000) / 1000)
         
         if self.camera:
             self.camera.release()
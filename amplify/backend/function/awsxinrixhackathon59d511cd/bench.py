@@ -0,0 +1,1618 @@
+"""
+Local benchmarks for the vision Lambda
+Drives index.handler against in-process stand-ins for the AWS services,
+so numbers reflect our own overhead plus simulated network latency.
+
+Usage: python bench.py [benchmark ...]   (no arguments runs everything)
+"""
+
+import base64
+import contextlib
+import itertools
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import index  # noqa: E402
+import geometry  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class StubRekognition:
+    """Rekognition stand-in that sleeps to simulate service round-trips"""
+
+    def __init__(self, label_delay=0.25, text_delay=0.20, labels=None):
+        self.label_delay = label_delay
+        self.text_delay = text_delay
+        self.labels = labels or sample_labels()
+        self.calls = {"detect_labels": 0, "detect_text": 0}
+
+    def detect_labels(self, **kwargs):
+        self.calls["detect_labels"] += 1
+        time.sleep(self.label_delay)
+        # A callable scripts what the camera sees, e.g. over a replayed walk
+        return self.labels() if callable(self.labels) else self.labels
+
+    def detect_text(self, **kwargs):
+        self.calls["detect_text"] += 1
+        time.sleep(self.text_delay)
+        return {"TextDetections": [
+            {"DetectedText": "EXIT", "Type": "LINE", "Confidence": 98.0}
+        ]}
+
+
+class StubBedrock:
+    """Bedrock stand-in that 'generates' a canned description token by token"""
+
+    TEXT = ("A sidewalk stretches ahead with a person about two meters in front of you. "
+            "A parked car is on your left. "
+            "A green EXIT sign is visible above a door to the right.")
+
+    def __init__(self, delay=0.0, token_delay=0.0, model_delays=None, failing=()):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.model_delays = model_delays or {}
+        self.failing = set(failing)  # model ids that time out / throttle
+        self.calls = 0
+        self.model_calls = {}
+
+    def tokens(self):
+        words = self.TEXT.split(" ")
+        return [w + " " for w in words[:-1]] + [words[-1]]
+
+    def invoke_model(self, **kwargs):
+        self.calls += 1
+        model_id = kwargs.get("modelId")
+        self.model_calls[model_id] = self.model_calls.get(model_id, 0) + 1
+        delay = self.model_delays.get(model_id, self.delay)
+        if callable(delay):
+            delay = delay(kwargs)
+        time.sleep(delay + self.token_delay * len(self.tokens()))
+        if model_id in self.failing:
+            raise RuntimeError(f"ThrottlingException from {model_id}")
+        body = json.dumps({
+            "content": [{"type": "text", "text": self.TEXT}],
+            "usage": {"input_tokens": estimate_input_tokens(kwargs.get("body", "{}")),
+                      "output_tokens": len(self.TEXT) // 4},
+        })
+        return {"body": BytesIO(body.encode())}
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        self.calls += 1
+
+        def events():
+            time.sleep(self.delay)
+            yield {"chunk": {"bytes": json.dumps({"type": "message_start"}).encode()}}
+            for token in self.tokens():
+                time.sleep(self.token_delay)
+                delta = {"type": "content_block_delta", "delta": {"type": "text_delta", "text": token}}
+                yield {"chunk": {"bytes": json.dumps(delta).encode()}}
+            yield {"chunk": {"bytes": json.dumps({"type": "message_stop"}).encode()}}
+
+        return {"body": events()}
+
+
+class MapsStandIn:
+    """Local HTTP server answering the Google Maps endpoints we use, after a set delay"""
+
+    def __init__(self, latency=0.15, latencies=None, handshake=0.0, fail_first=None, route=None):
+        self.latency = latency
+        self.route = route or grid_route   # (origin, destination) -> one Directions route
+        self.latencies = latencies or {}   # endpoint (e.g. "directions") -> seconds
+        self.handshake = handshake         # extra delay per new connection, standing in for TCP + TLS
+        self.fail_first = dict(fail_first or {})  # endpoint -> how many 503s to send before succeeding
+        self.requests = {}
+        self.connections = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def setup(self):
+                stand_in.connections += 1
+                time.sleep(stand_in.handshake)
+                super().setup()
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                endpoint = url.path.rsplit("/", 2)[-2]
+                if endpoint == "place":
+                    endpoint = "nearbysearch"
+                stand_in.requests[endpoint] = stand_in.requests.get(endpoint, 0) + 1
+                time.sleep(stand_in.latencies.get(endpoint, stand_in.latency))
+                body = json.dumps(maps_payload(endpoint, parse_qs(url.query), stand_in.route)).encode()
+                if stand_in.fail_first.get(endpoint):
+                    stand_in.fail_first[endpoint] -= 1
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base = "http://127.0.0.1:%d/maps/api" % self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def maps_payload(endpoint, query, route=None):
+    """Minimal Google Maps JSON for one endpoint"""
+    place = {"lat": 37.7755, "lng": -122.4189}
+    if endpoint == "geocode":
+        return {"status": "OK", "results": [{"formatted_address": "1 Market St, San Francisco, CA",
+                                             "geometry": {"location": place}}]}
+    if endpoint == "nearbysearch":
+        kind = query.get("type", ["place"])[0]
+        lat, lng = (float(v) for v in query["location"][0].split(","))
+        return {"status": "OK", "results": lattice_places(kind, lat, lng)}
+    origin = [float(v) for v in query["origin"][0].split(",")]
+    destination = [float(v) for v in query["destination"][0].split(",")]
+    return {"status": "OK", "routes": [(route or grid_route)(origin, destination)]}
+
+
+def legacy_encode_polyline(coords):
+    """Per-value Python encoder, the reference for geometry.encode_polyline"""
+    out, prev = [], (0, 0)
+    for lat, lng in coords:
+        point = (int(round(lat * 1e5)), int(round(lng * 1e5)))
+        for value in (point[0] - prev[0], point[1] - prev[1]):
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev = point
+    return "".join(out)
+
+
+def grid_route(origin, destination, spacing_m=40.0):
+    """Directions route on a street grid: north/south to the destination's latitude, then east/west"""
+    corner = (destination[0], origin[1])
+    legs = [(origin, corner, "north" if destination[0] > origin[0] else "south"),
+            (corner, destination, "east" if destination[1] > origin[1] else "west")]
+    steps, path = [], []
+    for k, (a, b, heading) in enumerate(legs):
+        length = geometry.distance_m(a[0], a[1], b[0], b[1])
+        if length < 5:
+            continue
+        n = max(1, int(length / spacing_m))
+        pts = [(a[0] + (b[0] - a[0]) * i / n, a[1] + (b[1] - a[1]) * i / n) for i in range(n + 1)]
+        path += pts if not path else pts[1:]
+        text = f"Head <b>{heading}</b>" if not steps else f"Turn <b>{'left' if heading == 'west' else 'right'}</b>"
+        steps.append({"html_instructions": f"{text} on street {k}", "polyline": {"points": geometry.encode_polyline(pts)},
+                      "distance": {"text": f"{length:.0f} m", "value": round(length)},
+                      "duration": {"text": f"{length / 80:.0f} mins", "value": round(length / 1.3)}})
+    total = sum(st["distance"]["value"] for st in steps)
+    path = path or [tuple(origin)]
+    return {"legs": [{"distance": {"text": f"{total / 1000:.1f} km", "value": total},
+                      "duration": {"text": f"{total / 80:.0f} mins", "value": round(total / 1.3)},
+                      "steps": steps, "start_address": "here", "end_address": "there"}],
+            "overview_polyline": {"points": geometry.encode_polyline(path)}}
+
+
+# Stand-in places of each kind sit on a fixed lattice, this many degrees apart
+PLACE_SPACING = {"hospital": 0.011, "police": 0.014, "transit_station": 0.0035}
+
+
+def lattice_places(kind, lat, lng):
+    """rankby=distance Places results: the 20 closest lattice points"""
+    spacing = PLACE_SPACING.get(kind, 0.005)
+    i0, j0 = round(lat / spacing), round(lng / spacing)
+    found = []
+    for i in range(i0 - 4, i0 + 5):
+        for j in range(j0 - 4, j0 + 5):
+            plat, plng = i * spacing, j * spacing
+            found.append((geometry.distance_m(lat, lng, plat, plng), i, j, plat, plng))
+    found.sort()
+    return [{"name": f"{kind} {i}/{j}", "vicinity": f"{abs(i) % 900} Main St", "rating": 4.0,
+             "geometry": {"location": {"lat": plat, "lng": plng}}}
+            for _, i, j, plat, plng in found[:20]]
+
+
+def estimate_input_tokens(body, image_size=(640, 480)):
+    """Anthropic's rule of thumb: ~4 chars per text token, w*h/750 per image"""
+    tokens = 0
+    for block in json.loads(body).get("messages", [{}])[0].get("content", []):
+        if block.get("type") == "image":
+            w, h = sent_image_size(block["source"]["data"], image_size)
+            tokens += w * h // 750
+        else:
+            tokens += len(block.get("text", "")) // 4
+    return tokens
+
+
+def sent_image_size(data, default):
+    """Pixel size of a base64 image in a request body, or default if it can't be read"""
+    if Image is None or not data:
+        return default
+    try:
+        return Image.open(BytesIO(base64.b64decode(data))).size
+    except Exception:
+        return default
+
+
+def has_image(kwargs):
+    return '"type": "image"' in kwargs.get("body", "")
+
+
+def sample_labels():
+    """A typical sidewalk frame: a person off to the right, a car to the left"""
+    return {
+        "Labels": [
+            {"Name": "Person", "Confidence": 97.1, "Instances": [
+                {"Confidence": 97.1, "BoundingBox": {"Left": 0.72, "Top": 0.2, "Width": 0.16, "Height": 0.4}}
+            ]},
+            {"Name": "Car", "Confidence": 91.4, "Instances": [
+                {"Confidence": 91.4, "BoundingBox": {"Left": 0.05, "Top": 0.5, "Width": 0.3, "Height": 0.2}}
+            ]},
+            {"Name": "Sidewalk", "Confidence": 88.0, "Instances": []},
+            {"Name": "Street", "Confidence": 84.2, "Instances": []},
+        ],
+    }
+
+
+def make_frame(seed=0, size=(640, 480), quality=80, fmt='JPEG'):
+    """JPEG test frame; different seeds give visually different frames"""
+    if Image is None:
+        return b'\xff\xd8' + bytes([seed % 256]) * 2000
+    w, h = size
+    img = Image.new('RGB', size)
+    px = img.load()
+    for y in range(0, h, 4):
+        for x in range(0, w, 4):
+            v = ((x * (seed + 1)) ^ (y * (seed + 3))) & 0xFF
+            for dy in range(4):
+                for dx in range(4):
+                    px[x + dx, y + dy] = (v, (v + seed * 40) & 0xFF, 255 - v)
+    buf = BytesIO()
+    img.save(buf, format=fmt, quality=quality)
+    return buf.getvalue()
+
+
+def frame_event(img_bytes, **params):
+    body = {"image": "data:image/jpeg;base64," + base64.b64encode(img_bytes).decode()}
+    body.update(params)
+    return {"httpMethod": "POST", "body": json.dumps(body)}
+
+
+def summarize(name, samples_ms):
+    samples_ms = sorted(samples_ms)
+    p95 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))]
+    print(f"  {name:<28} mean {statistics.mean(samples_ms):8.1f} ms   "
+          f"p50 {statistics.median(samples_ms):8.1f} ms   p95 {p95:8.1f} ms")
+
+
+def time_handler(events, repeat=1):
+    out = []
+    for _ in range(repeat):
+        for ev in events:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(sys.stderr if VERBOSE else DEVNULL):
+                resp = index.handler(ev, None)
+            out.append((time.perf_counter() - start) * 1000)
+            assert resp["statusCode"] == 200, resp["body"]
+    return out
+
+
+VERBOSE = bool(os.environ.get('BENCH_VERBOSE'))
+DEVNULL = open(os.devnull, 'w')
+
+BENCHMARKS = {}
+DEFAULTS = {
+    "DEDUP_HAMMING_THRESHOLD": index.DEDUP_HAMMING_THRESHOLD,
+    "ROUTER_RULES_MAX_SCORE": index.ROUTER_RULES_MAX_SCORE,
+    "ROUTER_TEXT_MAX_SCORE": index.ROUTER_TEXT_MAX_SCORE,
+    "BEDROCK_HEDGE_AFTER_MS": index.BEDROCK_HEDGE_AFTER_MS,
+    "MAPS_DEADLINE_S": index.MAPS_DEADLINE_S,
+    "ROUTE_SIMPLIFY_M": index.ROUTE_SIMPLIFY_M,
+}
+
+
+def reset():
+    """Fresh per-container state so benchmarks don't warm each other's caches"""
+    for name, value in DEFAULTS.items():
+        setattr(index, name, value)
+    index.sessions = index.session_store.SessionStore(index.session_store.MemoryBackend())
+    index.rekognition_cache = index.detection_cache.DetectionCache(max_entries=0)
+    fresh_breakers()
+    index.scene_descriptions = index.description_cache.DescriptionCache(max_entries=0)
+    index.quality_gate = index.frame_quality.QualityGate()
+    index.maps = index.maps_client.from_env()
+    index.geocodes = index.geocode_cache.GeocodeCache(max_entries=0)
+    index.pois = index.poi_index.PoiIndex(ttl_s=0)
+
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__[len('bench_'):]] = fn
+    return fn
+
+
+@benchmark
+def bench_rekognition_fanout(frames=10):
+    """Per-frame latency with detect_labels/detect_text serial vs. parallel"""
+    index.rekognition = StubRekognition()
+    index.bedrock = None
+    # Narration is the mode that needs both calls
+    events = [frame_event(make_frame(i), tell=True) for i in range(frames)]
+
+    pool = index.rekognition_pool
+    index.rekognition_pool = ThreadPoolExecutor(max_workers=1)
+    serial = time_handler(events)
+    index.rekognition_pool = pool
+    parallel = time_handler(events)
+
+    summarize("serial (1 worker)", serial)
+    summarize("fan-out", parallel)
+
+
+@benchmark
+def bench_frame_dedup(frames=30):
+    """Continuous-mode stream of a mostly static scene, with and without dedup"""
+    index.bedrock = None
+    # Re-encoding at slightly different qualities mimics sensor noise on a still camera
+    stream = []
+    for i in range(frames):
+        scene = i // 10
+        stream.append(frame_event(make_frame(scene, quality=70 + i % 10), continuous=True))
+
+    for label, threshold in (("dedup off", 0), ("dedup on", DEFAULTS["DEDUP_HAMMING_THRESHOLD"] or 6)):
+        index.rekognition = stub = StubRekognition()
+        index.DEDUP_HAMMING_THRESHOLD = threshold
+        index.sessions = index.session_store.SessionStore(index.session_store.MemoryBackend())
+        samples = time_handler(stream)
+        summarize(label, samples)
+        print(f"  {'':<28} detect_labels calls: {stub.calls['detect_labels']}/{frames}")
+
+
+@benchmark
+def bench_session_isolation(users=4, frames=12):
+    """Interleaved tell requests from several users sharing one container"""
+    index.rekognition = StubRekognition(label_delay=0, text_delay=0)
+    bedrock = index.bedrock = StubBedrock()
+    events = []
+    for i in range(frames):
+        for u in range(users):
+            events.append(frame_event(make_frame(u, quality=70 + i % 10), tell=True,
+                                      continuous=True, sessionId=f"user-{u}"))
+    time_handler(events)
+    print(f"  {users} users x {frames} frames -> {bedrock.calls} Bedrock calls "
+          f"(one per user when scene memory is per session)")
+
+
+@benchmark
+def bench_session_store(puts=500):
+    """SessionStore.put cost as the number of stored sessions grows, per backend"""
+    import tempfile
+    store_mod = index.session_store
+    state = {"lastDesc": "A quiet street with parked cars.", "frameHash": "f0e1d2c3b4a59687",
+             "scene": {"ema": {"car": 0.8, "tree": 0.6}, "pending": 0}, "frames": 12}
+    for sessions in (1000, 10000):
+        for kind in ("memory", "sqlite"):
+            with tempfile.TemporaryDirectory() as tmp:
+                backend = (store_mod.MemoryBackend() if kind == "memory"
+                           else store_mod.SqliteBackend(os.path.join(tmp, "sessions.db")))
+                store = store_mod.SessionStore(backend)
+                for i in range(sessions):
+                    store.put(f"s{i}", state)
+                start = time.perf_counter()
+                for i in range(puts):
+                    store.get(f"s{i}")
+                    store.put(f"s{i}", state)
+                ms = (time.perf_counter() - start) * 1000 / puts
+                if kind == "sqlite":
+                    backend.conn.close()
+            print(f"  {sessions:6d} sessions  {kind:<7} {ms:7.3f} ms per get + put")
+
+
+@benchmark
+def bench_detection_cache(frames=20):
+    """Retries and duplicate submissions of byte-identical frames"""
+    index.bedrock = None
+    index.DEDUP_HAMMING_THRESHOLD = 0  # isolate the content-addressed cache
+    # Each frame is sent twice, as a client retry would
+    stream = []
+    for i in range(frames):
+        ev = frame_event(make_frame(i % 5), sessionId=f"user-{i}")
+        stream += [ev, ev]
+
+    for label, entries in (("cache off", 0), ("cache on", 256)):
+        index.rekognition = stub = StubRekognition()
+        index.rekognition_cache = index.detection_cache.DetectionCache(max_entries=entries)
+        samples = time_handler(stream)
+        summarize(label, samples)
+        print(f"  {'':<28} detect_labels calls: {stub.calls['detect_labels']}/{len(stream)}   "
+              f"{index.rekognition_cache.summary()}")
+
+
+@benchmark
+def bench_rekognition_modes(frames=10):
+    """Rekognition calls and latency per request mode, and header vs. decoded dimensions"""
+    index.bedrock = None
+    index.DEDUP_HAMMING_THRESHOLD = 0
+    modes = {
+        "hazard": {"continuous": True},
+        "navigation": {"continuous": True, "navigationMode": True},
+        "narration": {"tell": True},
+    }
+    for mode, params in modes.items():
+        index.rekognition = stub = StubRekognition()
+        samples = time_handler([frame_event(make_frame(i), **params) for i in range(frames)])
+        summarize(mode, samples)
+        print(f"  {'':<28} detect_labels {stub.calls['detect_labels']}  detect_text {stub.calls['detect_text']}")
+
+    if Image is None:
+        return
+    images = [make_frame(0, size=size, fmt=fmt)
+              for size in ((640, 480), (1280, 720), (1920, 1080)) for fmt in ('JPEG', 'PNG')]
+    for img in images:
+        assert index.imaging.image_size(img) == Image.open(BytesIO(img)).size
+    header_ms, _ = measure(lambda imgs: [index.imaging.image_size(i) for i in imgs], images)
+    pillow_ms, _ = measure(lambda imgs: [Image.open(BytesIO(i)).load() for i in imgs], images, repeat=5)
+    print(f"  dimensions for {len(images)} frames: header parse {header_ms:.3f} ms, "
+          f"Pillow decode {pillow_ms:.1f} ms (sizes match)")
+
+
+def degraded_frame(seed, kind, size=(640, 480)):
+    """A test frame as a dark room, a covered lens or a shaky hand would produce it"""
+    from PIL import ImageEnhance, ImageFilter
+    img = Image.open(BytesIO(make_frame(seed, size=size)))
+    if kind == "dark":
+        img = ImageEnhance.Brightness(img).enhance(0.08)
+    elif kind == "covered":
+        rng = random.Random(seed)
+        img = Image.new('RGB', size, (60 + rng.randrange(20),) * 3)
+        img = img.filter(ImageFilter.GaussianBlur(2))
+    elif kind == "blurry":
+        img = img.filter(ImageFilter.GaussianBlur(size[0] // 80))
+    buf = BytesIO()
+    img.save(buf, format='JPEG', quality=80)
+    return buf.getvalue()
+
+
+@benchmark
+def bench_quality_gate(frames=30):
+    """Rekognition calls and latency on a stream where a third of the frames are unusable"""
+    if Image is None or index.frame_quality.np is None:
+        print("  skipped: Pillow or NumPy not installed")
+        return
+    index.bedrock = None
+    index.DEDUP_HAMMING_THRESHOLD = 0
+    kinds = ["good", "good", "dark", "good", "good", "covered", "good", "good", "blurry"]
+    stream = [kinds[i % len(kinds)] for i in range(frames)]
+    images = [make_frame(i) if kind == "good" else degraded_frame(i, kind) for i, kind in enumerate(stream)]
+    events = [frame_event(img, continuous=True) for img in images]
+
+    verdicts = [index.quality_gate.check(img) for img in images]
+    correct = sum((v.get("reason") or "good") == kind for v, kind in zip(verdicts, stream))
+    print(f"  classified {correct}/{frames} fixtures correctly")
+    gate_ms, _ = measure(lambda imgs: [index.frame_quality.measure(i) for i in imgs], images, repeat=3)
+    print(f"  gate cost: {gate_ms / frames:.2f} ms per frame")
+
+    for label, enabled in (("gate off", False), ("gate on", True)):
+        index.quality_gate = index.frame_quality.QualityGate(enabled=enabled)
+        index.rekognition = stub = StubRekognition()
+        samples = time_handler(events)
+        summarize(label, samples)
+        print(f"  {'':<28} detect_labels calls: {stub.calls['detect_labels']}/{frames}   "
+              f"rejected: {index.quality_gate.summary()['rejected']}")
+
+
+def legacy_clean_and_decode_image(img_b64):
+    """The original decoder, kept for comparison"""
+    if 'base64,' in img_b64:
+        img_b64 = img_b64.split('base64,')[1]
+    img_b64 = img_b64.strip().replace('\n', '').replace('\r', '').replace(' ', '')
+    img_bytes = base64.b64decode(img_b64)
+    if not (img_bytes[:2] == b'\xff\xd8' or img_bytes[:4] == b'\x89PNG'):
+        raise ValueError("bad image")
+    return img_bytes
+
+
+def measure(fn, arg, repeat=50):
+    """(mean ms, peak traced bytes) for fn(arg)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    elapsed = (time.perf_counter() - start) * 1000 / repeat
+    tracemalloc.start()
+    fn(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+@benchmark
+def bench_frame_decode():
+    """Decode time and peak memory per frame: legacy vs single-pass, JSON vs binary"""
+    img = make_frame(2, size=(1280, 720), quality=90)
+    data_url = "data:image/jpeg;base64," + base64.b64encode(img).decode()
+    json_event = {"body": json.dumps({"image": data_url, "continuous": True})}
+    binary_event = {
+        "headers": {"Content-Type": "image/jpeg"},
+        "isBase64Encoded": True,
+        "body": base64.b64encode(img).decode(),
+        "queryStringParameters": {"continuous": "true"},
+    }
+    print(f"  frame: {len(img) / 1024:.0f} KiB JPEG")
+
+    def legacy_event(ev):
+        return legacy_clean_and_decode_image(json.loads(ev["body"])["image"])
+
+    cases = (
+        ("legacy decoder", legacy_clean_and_decode_image, data_url),
+        ("single-pass decoder", index.clean_and_decode_image, data_url),
+        ("legacy JSON request", legacy_event, json_event),
+        ("JSON request", index.parse_event, json_event),
+        ("binary request", index.parse_event, binary_event),
+    )
+    for label, fn, arg in cases:
+        ms, peak = measure(fn, arg)
+        print(f"  {label:<28} {ms:7.2f} ms   peak {peak / 1024:8.0f} KiB")
+
+
+@benchmark
+def bench_batch(frames=8):
+    """One batch request vs. the same frames sent as separate requests"""
+    index.bedrock = None
+    images = [make_frame(i) for i in range(frames)]
+
+    index.rekognition = StubRekognition()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(DEVNULL):
+        singles = [json.loads(index.handler(frame_event(img, sessionId="single"), None)["body"])
+                   for img in images]
+    single_ms = (time.perf_counter() - start) * 1000
+
+    index.rekognition = StubRekognition()
+    body = {"sessionId": "batch", "frames": [base64.b64encode(img).decode() for img in images]}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(DEVNULL):
+        batch = json.loads(index.handler({"body": json.dumps(body)}, None)["body"])
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    keys = ("alert", "boundingBoxes", "obstacles", "sceneChanged", "imageWidth", "imageHeight")
+    same = all(single[k] == frame[k] for single, frame in zip(singles, batch["frames"]) for k in keys)
+    print(f"  {frames} separate requests  {single_ms:8.1f} ms")
+    print(f"  1 batch of {frames}          {batch_ms:8.1f} ms   per-frame results match: {same}")
+
+
+@benchmark
+def bench_streaming_description(token_delay=0.02, first_token_delay=0.4):
+    """Time to first sentence: blocking invoke_model vs. streaming, server-side and as the client sees it"""
+    index.bedrock = StubBedrock(delay=first_token_delay, token_delay=token_delay)
+    labels, text = sample_labels(), {"TextDetections": []}
+    print(f"  stand-in: {first_token_delay * 1000:.0f} ms to first token, "
+          f"{token_delay * 1000:.0f} ms per token")
+
+    with contextlib.redirect_stdout(DEVNULL):
+        start = time.perf_counter()
+        index.describe_scene(labels, text, "")
+        blocking_ms = (time.perf_counter() - start) * 1000
+
+        _, chunks = index.collect_sentences(index.describe_scene_stream(labels, text, ""))
+
+    print(f"  blocking: first sentence at {blocking_ms:7.1f} ms (whole description)")
+    print(f"  streaming, in the Lambda: first sentence at {chunks[0]['atMs']:7.1f} ms, "
+          f"last at {chunks[-1]['atMs']:7.1f} ms ({len(chunks)} sentences)")
+    # The NDJSON response is buffered, so the client sees nothing before the last sentence
+    print(f"  streaming, at the client (buffered response): first sentence at {chunks[-1]['atMs']:7.1f} ms")
+
+
+def fresh_breakers(failure_threshold=3):
+    index.model_breakers = {
+        model_id: index.resilience.CircuitBreaker(name, failure_threshold=failure_threshold)
+        for model_id, name in ((index.SONNET_MODEL_ID, "sonnet"), (index.HAIKU_MODEL_ID, "haiku"))
+    }
+
+
+@benchmark
+def bench_model_fallback(calls=10):
+    """describe_scene while Sonnet is throttled, and hedging a slow Sonnet"""
+    labels, text = sample_labels(), {"TextDetections": []}
+    sonnet, haiku = index.SONNET_MODEL_ID, index.HAIKU_MODEL_ID
+
+    def run(label):
+        samples = []
+        with contextlib.redirect_stdout(DEVNULL):
+            for _ in range(calls):
+                start = time.perf_counter()
+                index.describe_scene(labels, text, "")
+                samples.append((time.perf_counter() - start) * 1000)
+        summarize(label, samples)
+
+    # Sonnet fails after 1 s (throttling with retries), Haiku answers in 300 ms
+    index.BEDROCK_HEDGE_AFTER_MS = 0
+    for label, threshold in (("throttled, no breaker", 10 ** 6), ("throttled, breaker", 3)):
+        fresh_breakers(threshold)
+        index.bedrock = StubBedrock(model_delays={sonnet: 1.0, haiku: 0.3}, failing=[sonnet])
+        run(label)
+    print(f"  {'':<28} sonnet breaker: {index.model_breakers[sonnet].summary()}")
+
+    # Sonnet healthy but slow (1.5 s), Haiku 300 ms, hedge after 500 ms
+    for label, hedge_ms in (("slow sonnet, no hedge", 0), ("slow sonnet, hedge 500 ms", 500)):
+        fresh_breakers()
+        index.BEDROCK_HEDGE_AFTER_MS = hedge_ms
+        index.hedge_stats.update(hedged=0, primaryWins=0, backupWins=0)
+        index.bedrock = StubBedrock(model_delays={sonnet: 1.5, haiku: 0.3})
+        run(label)
+    print(f"  {'':<28} hedges: {index.hedge_stats}")
+
+
+SCENES = {
+    "corridor": [("Corridor", 95), ("Indoors", 93), ("Floor", 88), ("Door", 80), ("Lighting", 72)],
+    "crosswalk": [("Road", 97), ("Zebra Crossing", 92), ("Car", 90), ("Traffic Light", 85),
+                  ("Person", 83), ("City", 78)],
+    "lobby": [("Lobby", 91), ("Indoors", 90), ("Chair", 84), ("Plant", 79), ("Reception", 70)],
+    "wall": [("Wall", 90), ("Indoors", 85)],
+    "busy street": [("Person", 98), ("Crowd", 95), ("Road", 94), ("Car", 93), ("Bus", 90),
+                    ("Bicycle", 86), ("Traffic Light", 84), ("City", 80), ("Sign", 75)],
+}
+
+
+def jittered_frame(scene, rng):
+    """Rekognition-like output for a scene with per-frame confidence and ranking jitter"""
+    items = []
+    for name, conf in SCENES[scene]:
+        conf = min(99.9, max(60.0, conf + rng.uniform(-3, 3)))
+        count = 3 if scene == "busy street" else 1
+        instances = [{"BoundingBox": {"Left": 0.1 + 0.3 * k, "Top": 0.3, "Width": 0.2, "Height": 0.3},
+                      "Confidence": conf} for k in range(count)] if name in ("Person", "Car", "Chair", "Door") else []
+        items.append({"Name": name, "Confidence": conf, "Instances": instances})
+    # Occasionally a weak extra label flickers in
+    if rng.random() < 0.3:
+        items.append({"Name": rng.choice(["Shadow", "Wall", "Sign"]), "Confidence": 61.0, "Instances": []})
+    items.sort(key=lambda l: -l["Confidence"])
+    text = {"TextDetections": []}
+    if scene == "corridor":
+        text["TextDetections"].append({"DetectedText": "EXIT", "Type": "LINE", "Confidence": 96.0})
+    return {"Labels": items}, text
+
+
+def replay_walk(frames=60, seed=7):
+    """A walk: corridor, then lobby, then a crosswalk, revisiting the corridor"""
+    rng = random.Random(seed)
+    route = ["corridor"] * 20 + ["lobby"] * 15 + ["crosswalk"] * 15 + ["corridor"] * 10
+    return [jittered_frame(scene, rng) for scene in route[:frames]]
+
+
+def noisy_frame(scene, rng, jitter=8, min_confidence=60):
+    """Like jittered_frame, but labels near the cut-off drop out and boxes wander"""
+    items = []
+    for name, conf in SCENES[scene]:
+        conf += rng.uniform(-jitter, jitter)
+        if conf < min_confidence:
+            continue
+        instances = []
+        if name in ("Person", "Car", "Chair", "Door"):
+            for k in range(3 if scene == "busy street" else 1):
+                instances.append({"Confidence": conf, "BoundingBox": {
+                    "Left": 0.1 + 0.3 * k + rng.uniform(-0.05, 0.05),
+                    "Top": 0.3 + rng.uniform(-0.05, 0.05), "Width": 0.2, "Height": 0.3}})
+        items.append({"Name": name, "Confidence": min(conf, 99.9), "Instances": instances})
+    for extra in ("Shadow", "Wall", "Sign", "Floor", "Light"):
+        if rng.random() < 0.25:
+            items.append({"Name": extra, "Confidence": rng.uniform(60, 68), "Instances": []})
+    items.sort(key=lambda l: -l["Confidence"])
+    return {"Labels": items}
+
+
+def legacy_has_scene_changed(current_labels, last_scene_labels):
+    """The original detector, kept for comparison: >30% of top-10 label names differ"""
+    if not last_scene_labels:
+        return True
+    current_set, last_set = set(current_labels), set(last_scene_labels)
+    change_count = len(current_set - last_set) + len(last_set - current_set)
+    return change_count / max(len(current_set), len(last_set), 1) * 100 > 30
+
+
+def score_triggers(route, triggers, window):
+    """(true, false, missed) triggers against the route's scene transitions"""
+    transitions = [i for i in range(1, len(route)) if route[i] != route[i - 1]]
+    claimed, false = set(), 0
+    for i in triggers:
+        if i == 0:
+            continue  # the first frame always describes
+        match = [t for t in transitions if t <= i < t + window and t not in claimed]
+        if match:
+            claimed.add(match[0])
+        else:
+            false += 1
+    return len(claimed), false, len(transitions) - len(claimed)
+
+
+@benchmark
+def bench_scene_change(walks=20):
+    """Replayed walks with label jitter: old set-overlap detector vs. smoothed engine"""
+    route = (["corridor"] * 20 + ["lobby"] * 15 + ["crosswalk"] * 15
+             + ["busy street"] * 15 + ["corridor"] * 10)
+    detector = index.scene_change.SceneChangeDetector()
+    window = detector.persist_frames + 1
+    totals = {"old": [0, 0, 0, 0], "smoothed": [0, 0, 0, 0]}
+    scores = []
+    for seed in range(walks):
+        rng = random.Random(seed)
+        frames = [noisy_frame(scene, rng) for scene in route]
+
+        # Old: baseline labels are refreshed whenever a description is generated
+        triggers, baseline = [], None
+        for i, labels in enumerate(frames):
+            current = [l['Name'] for l in labels['Labels'][:10]]
+            if legacy_has_scene_changed(current, baseline):
+                triggers.append(i)
+                baseline = current
+        results = [len(triggers)] + list(score_triggers(route, triggers, window))
+        totals["old"] = [a + b for a, b in zip(totals["old"], results)]
+
+        triggers, scene = [], {}
+        for i, labels in enumerate(frames):
+            score, changed = detector.update(scene, labels)
+            scores.append(score)
+            if changed:
+                triggers.append(i)
+        results = [len(triggers)] + list(score_triggers(route, triggers, window))
+        totals["smoothed"] = [a + b for a, b in zip(totals["smoothed"], results)]
+
+    transitions = sum(1 for i in range(1, len(route)) if route[i] != route[i - 1]) * walks
+    print(f"  {walks} walks x {len(route)} frames, {transitions} real scene changes")
+    for label, (calls, true, false, missed) in totals.items():
+        print(f"  {label:<9} {calls:4d} Bedrock calls   {true:3d} detected   {false:4d} false triggers "
+              f"({false / (walks * len(route)):.1%} of frames)   {missed:3d} missed")
+    start = time.perf_counter()
+    for labels in frames:
+        detector.update({}, labels)
+    print(f"  engine cost: {(time.perf_counter() - start) * 1e6 / len(frames):.0f} us per frame")
+
+
+def approach_scene(rng, t, start_distance=15.0, speed=4.0):
+    """Boxes at time t: a cyclist riding straight at the camera, a person standing
+    still, and a car crossing on the right; heights follow h = 1.5 / distance"""
+    def box(left, height, width):
+        height *= 1 + rng.uniform(-0.03, 0.03)
+        return {"Left": left + rng.uniform(-0.01, 0.01), "Top": 0.9 - height,
+                "Width": width, "Height": min(height, 1.0)}
+    distance = start_distance - speed * t
+    labels = {"Labels": [
+        {"Name": name, "Confidence": conf, "Instances": [{"Confidence": conf, "BoundingBox": bb}]}
+        for name, conf, bb in (("Bicycle", 95.0, box(0.45, 1.5 / distance, 0.1)),
+                               ("Person", 93.0, box(0.15, 0.25, 0.08)),
+                               ("Car", 91.0, box(0.6 + 0.02 * t, 0.2, 0.25)))
+    ]}
+    return labels, distance / speed
+
+
+@benchmark
+def bench_object_tracker(runs=50, interval_s=0.5, frames=7):
+    """TTC accuracy and false 'approaching' flags on a synthetic approach, plus alert lead time"""
+    errors, false_flags, stationary_frames, lead_times = [], 0, 0, []
+    per_frame = []
+    for seed in range(runs):
+        rng = random.Random(seed)
+        state = {}
+        alerted = None
+        for k in range(frames):
+            t = k * interval_s
+            labels, true_ttc = approach_scene(rng, t)
+            start = time.perf_counter()
+            det = index.hazards.Detections(labels)
+            boxes = det.boxes()
+            tracks = index.track_obstacles(state, det, boxes, 1000.0 + t)
+            alert = index.detect_approach_alert(boxes, tracks)
+            per_frame.append((time.perf_counter() - start) * 1e6)
+            cyclist = tracks[0]
+            if cyclist["ttc"] is not None and k >= 2:
+                errors.append(abs(cyclist["ttc"] - true_ttc) / true_ttc)
+            for other in (tracks[1], tracks[2]):
+                stationary_frames += 1
+                false_flags += other["approaching"]
+            if alerted is None and alert["level"] != "none":
+                alerted = true_ttc
+        lead_times.append(alerted or 0.0)
+
+    print(f"  {runs} runs x {frames} frames at {interval_s:.1f} s intervals, cyclist at 4 m/s from 15 m")
+    print(f"  cyclist TTC error (from 3rd frame): mean {statistics.mean(errors):.1%}, "
+          f"max {max(errors):.1%}")
+    print(f"  stationary/crossing objects flagged approaching: {false_flags}/{stationary_frames}")
+    print(f"  approach alert fired with {statistics.mean(lead_times):.1f} s to spare on average "
+          f"(threshold {index.TTC_ALERT_S:.0f} s; single-frame check had none)")
+    print(f"  tracker + alert cost: {statistics.mean(per_frame):.0f} us per frame")
+
+
+def paced_walk_labels(t, rng, approach_at=20.0, approach_s=6.5):
+    """What the camera sees t seconds into a one-minute walk: a quiet corridor,
+    a cyclist riding straight at the user, then a lobby and a crosswalk"""
+    if approach_at <= t < approach_at + approach_s:
+        labels, ttc = approach_scene(rng, t - approach_at, start_distance=30.0)
+        return {"Labels": labels["Labels"][:1]}, ttc  # just the cyclist
+    scene = "corridor" if t < approach_at else "lobby" if t < 40 else "crosswalk"
+    return jittered_frame(scene, rng)[0], None
+
+
+@benchmark
+def bench_capture_pacing(duration_s=60.0, fixed_ms=2000, offsets=(20.0, 20.4, 20.8, 21.2, 21.6)):
+    """Invocations and hazard reaction on a replayed walk: fixed polling vs. nextCaptureMs"""
+    index.bedrock = None
+    index.DEDUP_HAMMING_THRESHOLD = 0  # every frame reaches Rekognition
+    frames = [make_frame(seed) for seed in range(4)]
+
+    for label in ("fixed %d ms" % fixed_ms, "nextCaptureMs"):
+        counts, spares, intervals = [], [], []
+        # The cyclist shows up at a few different points in the polling cycle
+        for approach_at in offsets:
+            rng = random.Random(11)
+            clock = {"t": 0.0, "ttc": None}
+
+            def labels():
+                out, clock["ttc"] = paced_walk_labels(clock["t"], rng, approach_at)
+                return out
+
+            index.rekognition = StubRekognition(label_delay=0.02, text_delay=0.02, labels=labels)
+            index.sessions = index.session_store.SessionStore(index.session_store.MemoryBackend())
+            calls, spare = 0, 0.0
+            while clock["t"] < duration_s:
+                ev = frame_event(frames[calls % len(frames)], continuous=True, sessionId="walker",
+                                 capturedAt=int((1_700_000_000 + clock["t"]) * 1000))
+                with contextlib.redirect_stdout(sys.stderr if VERBOSE else DEVNULL):
+                    resp = index.handler(ev, None)
+                data = json.loads(resp["body"])
+                calls += 1
+                if not spare and clock["ttc"] is not None and data["alert"]["level"] != "none":
+                    spare = clock["ttc"]
+                intervals.append(data["nextCaptureMs"])
+                clock["t"] += (fixed_ms if label.startswith("fixed") else data["nextCaptureMs"]) / 1000
+            counts.append(calls)
+            spares.append(spare)
+
+        print(f"  {label:<28} {statistics.mean(counts):5.1f} invocations per {duration_s:.0f} s walk   "
+              f"approach alert {statistics.mean(spares):.1f} s before impact "
+              f"(worst {min(spares):.1f} s)")
+    print(f"  {'':<28} hint range {min(intervals)}-{max(intervals)} ms "
+          f"(floor {index.CAPTURE_MIN_MS}, base {index.CAPTURE_BASE_MS}, idle {index.CAPTURE_IDLE_MS})")
+
+
+def legacy_extract_boxes(res):
+    """The original per-dict pipeline, kept for comparison"""
+    out = []
+    for label in res.get("Labels", []):
+        for instance in label.get("Instances", []):
+            bb = instance.get("BoundingBox")
+            if bb:
+                out.append({"label": label["Name"], "confidence": round(instance.get("Confidence", 0), 2),
+                            "box": bb})
+    return out
+
+
+def legacy_obstacles(boxes, tracks=None):
+    obstacles = []
+    tracks = tracks or {}
+    for i, box in enumerate(boxes):
+        label = box.get("label", "").lower()
+        if label not in ["person", "people", "human", "car", "bicycle", "pole",
+                         "post", "tree", "bench", "dog", "cat", "vehicle"]:
+            continue
+        bbox = box.get("box", {})
+        center_x = bbox.get("Left", 0) + (bbox.get("Width", 0) / 2.0)
+        height = bbox.get("Height", 0)
+        if height > 0.5:
+            distance = 1.0
+        elif height > 0.35:
+            distance = 2.0
+        elif height > 0.25:
+            distance = 3.0
+        elif height > 0.15:
+            distance = 5.0
+        else:
+            distance = 10.0
+        track = tracks.get(i) or {}
+        obstacles.append({"type": "person" if label in ["person", "people", "human"] else label,
+                          "distance": distance, "position": round(center_x, 2),
+                          "confidence": box.get("confidence", 0), "trackId": track.get("trackId"),
+                          "approaching": track.get("approaching", False), "ttc": track.get("ttc")})
+    obstacles.sort(key=lambda x: x["distance"])
+    return obstacles
+
+
+def legacy_scores(boxes):
+    """Per-box position, distance bucket and prominence, one dict at a time"""
+    out = []
+    for box in boxes:
+        bb = box["box"]
+        center_x = bb["Left"] + bb["Width"] / 2.0
+        h = bb["Height"]
+        distance = 1.0 if h > 0.5 else 2.0 if h > 0.35 else 3.0 if h > 0.25 else 5.0 if h > 0.15 else 10.0
+        out.append((center_x, distance, (1.0 - abs(center_x - 0.5) * 2.0) * 0.6 + min(h, 1.0) * 0.4))
+    return out
+
+
+def legacy_pedestrian_alert(boxes):
+    """The original alert with its key case fixed (it read lowercase keys and never fired)"""
+    people = [b for b in boxes if b["label"].lower() in ("person", "people", "human")]
+    if not people:
+        return {"level": "none", "message": "", "count": 0}
+
+    def score(p):
+        bx = p["box"]
+        centered = 1.0 - abs(bx["Left"] + bx["Width"] / 2.0 - 0.5) * 2.0
+        return centered * 0.6 + min(bx["Height"], 1.0) * 0.4
+
+    nearest = sorted(people, key=score, reverse=True)[0]
+    bx = nearest["box"]
+    center_x = bx["Left"] + bx["Width"] / 2.0
+    if 0.35 <= center_x <= 0.65 and bx["Height"] >= 0.25:
+        proximity = "very close" if bx["Height"] >= 0.35 else "near"
+        return {"level": "warning", "message": f"Warning: pedestrian {proximity} ahead.",
+                "count": len(people), "nearestBox": nearest}
+    return {"level": "none", "message": "", "count": 0}
+
+
+def crowded_labels(instances, seed=0):
+    """A detect_labels response with this many boxes spread over obstacle and other labels"""
+    rng = random.Random(seed)
+    names = ["Person", "Car", "Bicycle", "Tree", "Pole", "Window", "Adult", "Bench", "Sign", "Dog"]
+    labels = {name: [] for name in names}
+    for _ in range(instances):
+        w, h = rng.uniform(0.02, 0.3), rng.uniform(0.05, 0.7)
+        labels[rng.choice(names)].append({"Confidence": rng.uniform(55, 99), "BoundingBox": {
+            "Left": rng.uniform(0, 1 - w), "Top": rng.uniform(0, 1 - h), "Width": w, "Height": h}})
+    return {"Labels": [{"Name": n, "Confidence": 90.0, "Instances": inst} for n, inst in labels.items()]}
+
+
+@benchmark
+def bench_hazard_engine():
+    """Boxes, obstacles and pedestrian alert per frame: per-dict loops vs. NumPy columns"""
+    hazards = index.hazards
+    for n in (5, 50, 200, 800):
+        labels = crowded_labels(n)
+
+        def legacy(res):
+            boxes = legacy_extract_boxes(res)
+            return legacy_obstacles(boxes), legacy_pedestrian_alert(boxes)
+
+        def engine(res):
+            det = hazards.Detections(res)
+            det.boxes()
+            return hazards.obstacles(det), hazards.pedestrian_alert(det)
+
+        old, new = legacy(labels), engine(labels)
+        # Distances differ by design (calibrated metres vs. buckets), and with them the order
+        key = lambda o: (o["position"], o["type"], o["confidence"])
+        strip = sorted(({k: v for k, v in o.items() if k not in ("sector", "distance")} for o in new[0]), key=key)
+        same = strip == sorted(({k: v for k, v in o.items() if k != "distance"} for o in old[0]), key=key) and old[1]["level"] == new[1]["level"] and old[1]["message"] == new[1]["message"]
+        repeat = max(20, 4000 // n)
+        legacy_ms, _ = measure(legacy, labels, repeat=repeat)
+        engine_ms, _ = measure(engine, labels, repeat=repeat)
+
+        # Scoring alone, given already-built boxes / columns; this leaves out building
+        # the NumPy columns, which is where the engine spends its time
+        boxes, det = legacy_extract_boxes(labels), hazards.Detections(labels)
+        legacy_score_ms, _ = measure(lambda b: (legacy_scores(b), legacy_pedestrian_alert(b)), boxes, repeat=repeat)
+        engine_score_ms, _ = measure(lambda d: (d.obstacle_indices(), hazards.pedestrian_alert(d)), det, repeat=repeat)
+        print(f"  {n:4d} boxes  end to end: legacy {legacy_ms * 1000:7.1f} us  engine {engine_ms * 1000:7.1f} us"
+              f" ({engine_ms / legacy_ms:.2f}x)   scoring only: legacy {legacy_score_ms * 1000:7.1f} us"
+              f"  engine {engine_score_ms * 1000:6.1f} us   same output: {same}")
+
+
+# Real-world height ranges (m) per class; people include some children
+FIXTURE_HEIGHTS = {
+    "Person": (1.5, 1.9), "Car": (1.4, 1.6), "Vehicle": (1.5, 2.5), "Bicycle": (1.0, 1.2),
+    "Pole": (2.5, 4.0), "Post": (0.8, 1.2), "Tree": (3.0, 8.0), "Bench": (0.75, 0.95),
+    "Dog": (0.3, 0.8), "Cat": (0.2, 0.3),
+}
+
+
+def distance_fixtures(per_class=60, seed=3):
+    """Labelled boxes: true distance plus the box a pinhole camera with some FOV
+    spread and detector noise would report; boxes cut off by the frame are skipped"""
+    rng = random.Random(seed)
+    fixtures = []
+    for name, (lo, hi) in FIXTURE_HEIGHTS.items():
+        while sum(f[0] == name for f in fixtures) < per_class:
+            height = rng.uniform(1.0, 1.4) if name == "Person" and rng.random() < 0.1 else rng.uniform(lo, hi)
+            distance = rng.uniform(1.0, 15.0)
+            vfov = math.radians(rng.gauss(60, 3))
+            fraction = height / (2 * distance * math.tan(vfov / 2)) * (1 + rng.gauss(0, 0.05))
+            if fraction < 0.95:
+                fixtures.append((name, distance, {"Left": 0.4, "Top": 0.95 - fraction,
+                                                  "Width": 0.1, "Height": fraction}))
+    return fixtures
+
+
+@benchmark
+def bench_distance_estimation():
+    """Obstacle distance on labelled fixtures: shared height buckets vs. per-class pinhole tables"""
+    fixtures = distance_fixtures()
+    labels = {"Labels": [{"Name": name, "Confidence": 90.0,
+                          "Instances": [{"Confidence": 90.0, "BoundingBox": bb}]}
+                         for name, _, bb in fixtures]}
+    truth = [d for _, d, _ in fixtures]
+    # One box at a time so the old code's sort doesn't reorder them
+    buckets = [legacy_obstacles([b])[0]["distance"] for b in legacy_extract_boxes(labels)]
+    det = index.hazards.Detections(labels)
+    calibrated = det.distance.tolist()
+
+    print(f"  {len(fixtures)} labelled boxes, {len(FIXTURE_HEIGHTS)} classes, true distance 1-15 m")
+    for label, estimates in (("height buckets", buckets), ("per-class table", calibrated)):
+        rel = [abs(e - t) / t for e, t in zip(estimates, truth)]
+        print(f"  {label:<16} MAE {statistics.mean(abs(e - t) for e, t in zip(estimates, truth)):5.2f} m   "
+              f"median error {statistics.median(rel):6.1%}   within 25%: {sum(r <= 0.25 for r in rel) / len(rel):6.1%}")
+    for name in ("Person", "Car", "Dog"):
+        rows = [(e, t) for (n, t, _), e in zip(fixtures, calibrated) if n == name]
+        old = [(e, t) for (n, t, _), e in zip(fixtures, buckets) if n == name]
+        print(f"    {name:<8} median error: buckets {statistics.median(abs(e - t) / t for e, t in old):6.1%}"
+              f"  table {statistics.median(abs(e - t) / t for e, t in rows):6.1%}")
+    lookup_ms, _ = measure(index.hazards.Detections, labels, repeat=50)
+    print(f"  parse + table lookup: {lookup_ms * 1000 / len(fixtures):.2f} us per box")
+
+
+@benchmark
+def bench_description_cache():
+    """Bedrock calls for on-demand descriptions along a replayed walk"""
+    walk = replay_walk()
+    for label, size in (("cache off", 0), ("cache on", 128)):
+        index.scene_descriptions = index.description_cache.DescriptionCache(max_entries=size)
+        index.bedrock = stub = StubBedrock(delay=0.2)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(DEVNULL):
+            for labels, text in walk:
+                index.describe_scene(labels, text, "")
+        elapsed = time.perf_counter() - start
+        summary = index.scene_descriptions.summary()
+        print(f"  {label:<10} {stub.calls:3d}/{len(walk)} Bedrock calls   {elapsed:6.1f} s   "
+              f"hit rate {summary['hitRate']:.2f}, saved {summary['bedrockCallsSaved']}")
+
+
+@benchmark
+def bench_description_router():
+    """Latency and token mix per description path on a replayed walk"""
+    rng = random.Random(11)
+    route = (["wall"] * 6 + ["corridor"] * 10 + ["lobby"] * 8 + ["crosswalk"] * 8
+             + ["busy street"] * 8)
+    walk = [jittered_frame(scene, rng) for scene in route]
+    sonnet, haiku = index.SONNET_MODEL_ID, index.HAIKU_MODEL_ID
+
+    def haiku_delay(kwargs):
+        return 0.45 if has_image(kwargs) else 0.15
+
+    for label, rules_max, text_max in (("always multimodal", -1, -1),
+                                       ("routed", index.ROUTER_RULES_MAX_SCORE, index.ROUTER_TEXT_MAX_SCORE)):
+        index.ROUTER_RULES_MAX_SCORE, index.ROUTER_TEXT_MAX_SCORE = rules_max, text_max
+        index.bedrock = StubBedrock(model_delays={sonnet: 0.9, haiku: haiku_delay})
+        index.token_usage.clear()
+        per_path = {}
+        with contextlib.redirect_stdout(DEVNULL):
+            for labels, text in walk:
+                path, _ = index.route_description(labels, text)
+                start = time.perf_counter()
+                if path == "rules":
+                    index.rule_based_description(labels)
+                elif path == "text":
+                    index.describe_scene_text(labels, text)
+                else:
+                    index.describe_scene(labels, text, "")
+                per_path.setdefault(path, []).append((time.perf_counter() - start) * 1000)
+
+        total = sum(sum(v) for v in per_path.values())
+        print(f"  {label}: {total / len(walk):6.1f} ms mean per description")
+        for path, samples in sorted(per_path.items()):
+            print(f"    {path:<12} {len(samples):3d} frames  mean {statistics.mean(samples):7.1f} ms")
+        for model, usage in sorted(index.token_usage.items()):
+            print(f"    {model:<40} {usage['calls']:3d} calls  {usage['input']:6d} in / "
+                  f"{usage['output']:5d} out tokens")
+
+
+@benchmark
+def bench_model_image(frames=5):
+    """Bytes, image tokens and Bedrock latency per frame: original vs. downscaled"""
+    if Image is None:
+        print("  skipped: Pillow not installed")
+        return
+    labels, text = sample_labels(), {"TextDetections": []}
+    sonnet = index.SONNET_MODEL_ID
+
+    def delay(kwargs):
+        # Upload at ~4 MB/s plus prefill time proportional to input tokens
+        body = kwargs.get("body", "")
+        return 0.3 + len(body) / 4e6 + estimate_input_tokens(body) * 0.0002
+
+    for fmt in ("JPEG", "PNG"):
+        images = [make_frame(seed, size=(1280, 720), fmt=fmt) for seed in range(frames)]
+        for label, prepare in (("original", lambda f: (f.original_base64(), index.imaging.media_type(f.data))),
+                               ("downscaled", lambda f: f.for_model())):
+            index.bedrock = StubBedrock(model_delays={sonnet: delay})
+            index.token_usage.clear()
+            sent, prep_ms, call_ms = [], [], []
+            with contextlib.redirect_stdout(DEVNULL):
+                for img in images:
+                    frame = index.imaging.FrameImage(img)
+                    start = time.perf_counter()
+                    img_b64, media_type = prepare(frame)
+                    prep_ms.append((time.perf_counter() - start) * 1000)
+                    sent.append(len(img_b64))
+                    start = time.perf_counter()
+                    index.describe_scene(labels, text, img_b64, media_type)
+                    call_ms.append((time.perf_counter() - start) * 1000)
+            usage = index.token_usage[sonnet.split('.')[-1]]
+            print(f"  {fmt:<4} {label:<10} {statistics.mean(sent) / 1024:7.1f} KiB b64   "
+                  f"{usage['input'] // frames:5d} input tokens   prepare {statistics.mean(prep_ms):5.1f} ms   "
+                  f"Bedrock {statistics.mean(call_ms):6.1f} ms")
+
+
+@benchmark
+def bench_maps_fanout(requests_per_case=5, latency=0.15):
+    """handle_maps against a local Maps stand-in: one worker (sequential) vs. the pool, and the deadline"""
+    # A warning frame near hospitals with a destination address and navigation on:
+    # reverse geocode, geocode -> route, three nearby searches, hospitals -> emergency route
+    args = (37.775, -122.419, None, None, "1 Market St", True, True, True, "warning")
+    cases = [
+        ("1 worker (sequential)", 1, 10.0, {}),
+        ("%d workers" % index.MAPS_WORKERS, index.MAPS_WORKERS, 10.0, {}),
+        ("1 s deadline, slow routes", index.MAPS_WORKERS, 1.0, {"directions": 2.0}),
+    ]
+    for label, workers, deadline, latencies in cases:
+        stand_in = MapsStandIn(latency=latency, latencies=latencies)
+        index.maps = index.maps_client.MapsClient("bench", base=stand_in.base)
+        index.maps_pool = ThreadPoolExecutor(max_workers=workers)
+        index.MAPS_DEADLINE_S = deadline
+        samples, m = [], {}
+        with contextlib.redirect_stdout(sys.stderr if VERBOSE else DEVNULL):
+            for _ in range(requests_per_case):
+                start = time.perf_counter()
+                m = index.handle_maps(*args)
+                samples.append((time.perf_counter() - start) * 1000)
+        summarize(label, samples)
+        sections = sorted(k for k in m if k not in ("location", "map_url"))
+        print(f"  {'':<28} sections: {', '.join(sections)}")
+        index.maps_pool.shutdown(wait=True)
+        stand_in.close()
+    index.maps_pool = ThreadPoolExecutor(max_workers=index.MAPS_WORKERS)
+    print(f"  {'':<28} {latency * 1000:.0f} ms per Maps call; emergency route waits on hospitals, "
+          f"route on geocode")
+
+
+def legacy_geocode(base, addr):
+    """The old call shape: bare requests.get, and the body parsed twice"""
+    import requests
+    r = requests.get(f"{base}/geocode/json", params={"address": addr, "key": "bench"}, timeout=5)
+    if r.ok and r.json().get("results"):
+        loc = r.json()["results"][0]["geometry"]["location"]
+        return loc["lat"], loc["lng"]
+    return None
+
+
+@benchmark
+def bench_maps_client(calls=40, latency=0.02, handshake=0.06):
+    """Per-call latency and connections opened: bare requests.get vs. the pooled client"""
+    stand_in = MapsStandIn(latency=latency, handshake=handshake)
+    client = index.maps_client.MapsClient("bench", base=stand_in.base)
+    cases = (("bare requests.get", lambda: legacy_geocode(stand_in.base, "1 Market St")),
+             ("pooled MapsClient", lambda: client.get("geocode/json", {"address": "1 Market St"})))
+    for label, call in cases:
+        opened = stand_in.connections
+        samples = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            assert call()
+            samples.append((time.perf_counter() - start) * 1000)
+        summarize(label, samples)
+        print(f"  {'':<28} {stand_in.connections - opened} connections for {calls} calls")
+
+    # Two 503s, then success: retried with jittered backoff instead of failing the frame
+    stand_in.fail_first = {"geocode": 2}
+    data = client.get("geocode/json", {"address": "1 Market St"})
+    print(f"  {'after 2 x 503':<28} {'ok' if data else 'failed'}   {client.summary()}")
+    stand_in.close()
+    print(f"  {'':<28} simulated {handshake * 1000:.0f} ms handshake per connection, "
+          f"{latency * 1000:.0f} ms per call")
+
+
+def gps_walk(frames=300, interval_s=2.0, speed=1.4, noise_m=4.0, seed=5, start=(37.7749, -122.4194)):
+    """(lat, lng) fixes for a walk through San Francisco, turning every 100 frames, with GPS noise"""
+    rng = random.Random(seed)
+    (lat, lng), heading = start, 0.0
+    fixes = []
+    for k in range(frames):
+        if k and k % 100 == 0:
+            heading += math.pi / 2
+        step = speed * interval_s
+        lat += step * math.cos(heading) / 111_320
+        lng += step * math.sin(heading) / (111_320 * math.cos(math.radians(lat)))
+        fixes.append((lat + rng.gauss(0, noise_m) / 111_320,
+                      lng + rng.gauss(0, noise_m) / (111_320 * math.cos(math.radians(lat)))))
+    return fixes
+
+
+@benchmark
+def bench_geocode_cache(frames=300):
+    """Google geocoding calls over a 10-minute walk: no cache vs. geohash precisions, plus a warm container"""
+    stand_in = MapsStandIn(latency=0.0)
+    index.maps = index.maps_client.MapsClient("bench", base=stand_in.base)
+    fixes = gps_walk(frames)
+    spellings = ["1 Market St", "1 market street", "1 Market St.", " 1 MARKET  STREET "]
+    db_path = os.path.join("/tmp", "bench-geocode-%d.sqlite" % os.getpid())
+
+    def replay(cache):
+        index.geocodes = cache
+        before = dict(stand_in.requests)
+        with contextlib.redirect_stdout(DEVNULL):
+            for k, (lat, lng) in enumerate(fixes):
+                index.reverse_geocode(lat, lng)
+                index.geocode(spellings[k % len(spellings)])
+        return stand_in.requests.get("geocode", 0) - before.get("geocode", 0)
+
+    print(f"  {frames} frames, 2 s apart at 1.4 m/s, +-4 m GPS noise; reverse + forward lookup per frame")
+    calls = replay(index.geocode_cache.GeocodeCache(max_entries=0))
+    print(f"  {'no cache':<28} {calls:4d} Google geocode calls")
+    for precision in (7, 8, 9):
+        cache = index.geocode_cache.GeocodeCache(precision=precision)
+        calls = replay(cache)
+        info = cache.summary()
+        print(f"  {'geohash precision %d' % precision:<28} {calls:4d} Google geocode calls   "
+              f"reverse hit rate {info['reverseHitRate']:.1%}   forward {info['forwardHitRate']:.1%}")
+
+    try:
+        replay(index.geocode_cache.GeocodeCache(db_path=db_path))
+        # A new container instance that inherits /tmp starts with an empty memory tier
+        cache = index.geocode_cache.GeocodeCache(db_path=db_path)
+        calls = replay(cache)
+        print(f"  {'warm container (sqlite)':<28} {calls:4d} Google geocode calls   "
+              f"disk hits {cache.summary()['diskHits']}")
+    finally:
+        os.remove(db_path)
+        stand_in.close()
+
+
+@benchmark
+def bench_poi_index(frames=300, sessions=3):
+    """Places API calls per session on replayed GPS walks, and whether answers match a fresh search"""
+    stand_in = MapsStandIn(latency=0.0)
+    index.maps = index.maps_client.MapsClient("bench", base=stand_in.base)
+    # Each session walks its own neighbourhood, about 2.5 km from the last
+    walks = [gps_walk(frames, seed=k, start=(37.7749 + 0.02 * k, -122.4194 - 0.015 * k))
+             for k in range(sessions)]
+
+    results = {}
+    for label, poi_index in (("no index", index.poi_index.PoiIndex(ttl_s=0)),
+                             ("PoiIndex", index.poi_index.from_env())):
+        index.pois = poi_index
+        before = stand_in.requests.get("nearbysearch", 0)
+        answers = []
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(DEVNULL):
+            for fixes in walks:
+                for lat, lng in fixes:
+                    answers.append([[p["name"] for p in index.nearby(lat, lng, kind, radius=radius)[:3]]
+                                    for _, kind, radius in index.NEARBY_SEARCHES])
+        elapsed = (time.perf_counter() - start) * 1000
+        calls = stand_in.requests.get("nearbysearch", 0) - before
+        results[label] = answers
+        print(f"  {label:<28} {calls / sessions:6.1f} Places calls per session "
+              f"({frames} frames x {len(index.NEARBY_SEARCHES)} kinds)   "
+              f"{elapsed / len(answers):.2f} ms per frame")
+    same = sum(a == b for a, b in zip(results["no index"], results["PoiIndex"]))
+    print(f"  {'':<28} top-3 answers identical to a fresh search on {same}/{len(results['PoiIndex'])} frames   "
+          f"{index.pois.summary()}")
+    stand_in.close()
+
+
+@contextlib.contextmanager
+def mock_time(t):
+    """time.time() returns t inside the block"""
+    real = time.time
+    time.time = lambda: t
+    try:
+        yield
+    finally:
+        time.time = real
+
+
+def walk_path(legs, start=(37.7749, -122.4194), step_m=2.8, noise_m=4.0, seed=9):
+    """Noisy fixes every step_m along legs of (metres north, metres east)"""
+    rng = random.Random(seed)
+    m_lat = 111320.0
+    m_lng = 111320.0 * math.cos(math.radians(start[0]))
+    lat, lng = start
+    fixes = []
+    for north, east in legs:
+        length = math.hypot(north, east)
+        for _ in range(int(length / step_m)):
+            lat += north / length * step_m / m_lat
+            lng += east / length * step_m / m_lng
+            fixes.append((lat + rng.gauss(0, noise_m) / m_lat, lng + rng.gauss(0, noise_m) / m_lng))
+    return fixes
+
+
+@benchmark
+def bench_route_session(directions_latency=0.2):
+    """Navigation frames along a walk with one wrong turn: directions every frame vs. the route session"""
+    # 250 m north, a 60 m wrong turn west, then 250 m north and 360 m east to the destination
+    start = (37.7749, -122.4194)
+    fixes = walk_path([(250, 0), (0, -60), (250, 0), (0, 360)], start=start)
+    dest = fixes[-1]
+    stand_in = MapsStandIn(latency=0.005, latencies={"directions": directions_latency})
+    index.maps = index.maps_client.MapsClient("bench", base=stand_in.base)
+    print(f"  {len(fixes)} frames, 2 s apart; Directions takes {directions_latency * 1000:.0f} ms")
+
+    for label, state in (("directions every frame", None), ("route session", {})):
+        before = stand_in.requests.get("directions", 0)
+        samples, agree, compared, errors = [], 0, 0, []
+        with contextlib.redirect_stdout(DEVNULL):
+            clock = time.time()
+            for k, (lat, lng) in enumerate(fixes):
+                t0 = time.perf_counter()
+                with mock_time(clock + 2 * k):
+                    m = index.handle_maps(lat, lng, dest[0], dest[1], None, False, True, True, "none", state)
+                samples.append((time.perf_counter() - t0) * 1000)
+                nav = m.get("navigation")
+                # What fresh directions from this fix would say
+                fresh = index.summarize_route(grid_route((lat, lng), dest))
+                if not (nav and fresh["steps"]):
+                    continue  # standing at the destination
+                compared += 1
+                now_doing = nav.get("current_instruction", nav["next_instruction"])
+                # Legs under 15 m in the fresh route are GPS noise, not a real step
+                real = [st for st in fresh["steps"] if int(st["distance"].split()[0]) >= 15] or fresh["steps"]
+                agree += now_doing.split(" on ")[-1] == real[0]["instruction"].split(" on ")[-1]
+                if "remaining_m" in nav:
+                    errors.append(abs(nav["remaining_m"] - sum(
+                        int(st["distance"].split()[0]) for st in fresh["steps"])))
+        calls = stand_in.requests.get("directions", 0) - before
+        summarize(label, samples)
+        extra = f"   remaining-distance error p50 {statistics.median(errors):.0f} m" if errors else ""
+        print(f"  {'':<28} {calls} Directions calls   current step matches fresh directions "
+              f"on {agree}/{compared} frames{extra}")
+    stand_in.close()
+
+    # Directions that start 60 m from the user (inside a park, say) while they stand still
+    offset = 60 / 111320.0
+    stand_in = MapsStandIn(latency=0.005, route=lambda o, d: grid_route((o[0] + offset, o[1]), d))
+    index.maps = index.maps_client.MapsClient("bench", base=stand_in.base)
+    state, now = {}, time.time()
+    with contextlib.redirect_stdout(DEVNULL):
+        for k in range(10):
+            with mock_time(now + 2 * k):
+                index.handle_maps(start[0], start[1], dest[0], dest[1], None, False, True, True, "none", state)
+    print(f"  route starting 60 m away, 10 stationary frames: {stand_in.requests.get('directions', 0)} "
+          f"Directions calls")
+    stand_in.close()
+
+
+def legacy_decode_polyline(points):
+    """Per-character Python decoder, as route_session first shipped it"""
+    coords, i, lat, lng = [], 0, 0, 0
+    while i < len(points):
+        for axis in (0, 1):
+            shift, result = 0, 0
+            while True:
+                b = ord(points[i]) - 63
+                i += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            delta = ~(result >> 1) if result & 1 else result >> 1
+            if axis == 0:
+                lat += delta
+            else:
+                lng += delta
+        coords.append((lat / 1e5, lng / 1e5))
+    return coords
+
+
+def legacy_project(coords, lat, lng):
+    """Segment-by-segment Python projection, as route_session first shipped it"""
+    cos0 = math.cos(math.radians(lat))
+    xy = [((p[1] - lng) * 111320.0 * cos0, (p[0] - lat) * 111320.0) for p in coords]
+    best, total = (0, 0.0, float("inf")), 0.0
+    for i, ((ax, ay), (bx, by)) in enumerate(zip(xy, xy[1:])):
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        t = 0.0 if not length2 else min(1.0, max(0.0, -(ax * dx + ay * dy) / length2))
+        off = math.hypot(ax + t * dx, ay + t * dy)
+        if off < best[2]:
+            best = (i, total + t * math.sqrt(length2), off)
+        total += math.sqrt(length2)
+    return best
+
+
+def wandering_route(points, seed=4):
+    """A long walking-route-like polyline: ~10 m steps with gentle turns"""
+    rng = random.Random(seed)
+    lat, lng, heading = 37.7749, -122.4194, 0.0
+    coords = []
+    for _ in range(points):
+        heading += rng.uniform(-0.3, 0.3)
+        lat += 10 * math.cos(heading) / 111320
+        lng += 10 * math.sin(heading) / (111320 * math.cos(math.radians(lat)))
+        coords.append((lat, lng))
+    return coords
+
+
+@benchmark
+def bench_geometry(points=10000):
+    """Scalar Python vs. geometry (NumPy) on 10k-point inputs"""
+    import numpy as np
+    coords = wandering_route(points)
+    lats, lngs = [c[0] for c in coords], [c[1] for c in coords]
+    encoded = legacy_encode_polyline(coords)
+    side = int(math.sqrt(points))
+
+    def row(name, scalar, vectorized, error):
+        repeat = 5
+        s_ms = measure(lambda _: scalar(), None, repeat)[0]
+        v_ms = measure(lambda _: vectorized(), None, repeat)[0]
+        print(f"  {name:<28} scalar {s_ms:8.2f} ms   geometry {v_ms:7.2f} ms   "
+              f"{s_ms / v_ms:5.1f}x   max diff {error}")
+
+    scalar = [geometry.distance_m(37.7749, -122.4194, a, b) for a, b in coords]
+    row("one-to-many haversine",
+        lambda: [geometry.distance_m(37.7749, -122.4194, a, b) for a, b in coords],
+        lambda: geometry.haversine(37.7749, -122.4194, lats, lngs),
+        f"{np.abs(geometry.haversine(37.7749, -122.4194, lats, lngs) - scalar).max():.1e} m")
+    few = coords[:side]
+    row(f"many-to-many {side}x{side}",
+        lambda: [[geometry.distance_m(a, b, c, d) for c, d in few] for a, b in few],
+        lambda: geometry.haversine_matrix(lats[:side], lngs[:side], lats[:side], lngs[:side]),
+        "-")
+    row("decode polyline",
+        lambda: legacy_decode_polyline(encoded),
+        lambda: geometry.decode_polyline(encoded),
+        f"{np.abs(geometry.decode_polyline(encoded) - np.array(legacy_decode_polyline(encoded))).max():.0e} deg")
+    row("encode polyline",
+        lambda: legacy_encode_polyline(coords),
+        lambda: geometry.encode_polyline(coords),
+        "identical" if geometry.encode_polyline(coords) == encoded else "DIFFERENT")
+    cum = list(itertools.accumulate([0.0] + [geometry.distance_m(*a, *b) for a, b in zip(coords, coords[1:])]))
+    row("cumulative distance",
+        lambda: list(itertools.accumulate([0.0] + [geometry.distance_m(*a, *b)
+                                                   for a, b in zip(coords, coords[1:])])),
+        lambda: geometry.cumulative_distance(coords),
+        f"{np.abs(geometry.cumulative_distance(coords) - cum).max():.1e} m")
+    fix = (coords[points // 2][0] + 0.0001, coords[points // 2][1])
+    cum_np = geometry.cumulative_distance(coords)
+    row("project onto polyline",
+        lambda: legacy_project(coords, *fix),
+        lambda: geometry.project(coords, fix[0], fix[1], cum_np),
+        f"{abs(geometry.project(coords, fix[0], fix[1])[2] - legacy_project(coords, *fix)[2]):.1e} m off-route")
+
+
+STREETS = ["Market St", "Mission St", "Valencia St", "Golden Gate Park Path", "Embarcadero",
+           "Folsom St", "Hayes St", "Panhandle Path", "Octavia Blvd", "Lake Merced Trail"]
+
+
+def city_route(origin, destination, seed=None):
+    """Synthetic Directions route shaped like Google's for a long walk: random
+    straight blocks mixed with curving park paths, whose overview polyline has a
+    vertex every few metres. Not a recorded response"""
+    rng = random.Random(seed if seed is not None else hash((round(origin[0], 4), round(origin[1], 4))))
+    m_lat = 111320.0
+    m_lng = 111320.0 * math.cos(math.radians(origin[0]))
+    lat, lng = origin
+    steps, path = [], [tuple(origin)]
+    while True:
+        north, east = (destination[0] - lat) * m_lat, (destination[1] - lng) * m_lng
+        left = math.hypot(north, east)
+        length = left if left < 400 else rng.uniform(150, 350)
+        heading = math.atan2(east, north) + (0 if left < 400 else rng.uniform(-0.9, 0.9))
+        curving = left >= 400 and rng.random() < 0.5
+        n = int(length / 4) if curving else 1
+        bend = rng.uniform(-0.01, 0.01) if curving else 0.0
+        pts = [(lat, lng)]
+        for i in range(n):
+            h = heading + bend * (i - n / 2)
+            lat += length / n * math.cos(h) / m_lat
+            lng += length / n * math.sin(h) / m_lng
+            # Surveyed path vertices wobble by a metre or so
+            jitter = rng.gauss(0, 0.8) if curving and i < n - 1 else 0.0
+            pts.append((lat + jitter / m_lat, lng + jitter / m_lng))
+        if left < 400:
+            pts[-1] = lat, lng = destination[0], destination[1]
+        path += pts[1:]
+        turn = "Head <b>north</b>" if not steps else f"Turn <b>{rng.choice(['left', 'right'])}</b>"
+        street = STREETS[len(steps) % len(STREETS)]
+        note = '<div style="font-size:0.9em">Pass by the bus stop (on the right)</div>' if rng.random() < 0.3 else ""
+        steps.append({"html_instructions": f"{turn} onto <b>{street}</b>{note}",
+                      "polyline": {"points": geometry.encode_polyline(pts)},
+                      "distance": {"text": f"{length:.0f} m", "value": round(length)},
+                      "duration": {"text": f"{max(1, length / 80):.0f} mins", "value": round(length / 1.3)},
+                      "maneuver": "straight" if not steps[:-1] else rng.choice(["turn-left", "turn-right"])})
+        if left < 400:
+            break
+    total = sum(st["distance"]["value"] for st in steps)
+    return {"legs": [{"distance": {"text": f"{total / 1000:.1f} km", "value": total},
+                      "duration": {"text": f"{total / 80:.0f} mins", "value": round(total / 1.3)},
+                      "steps": steps, "start_address": "1 Market St, San Francisco, CA 94105, USA",
+                      "end_address": "Sutro Heights Park, San Francisco, CA 94121, USA"}],
+            "overview_polyline": {"points": geometry.encode_polyline(path)}}
+
+
+@benchmark
+def bench_route_payload(every_m=12.0, warning_every=4):
+    """Maps response size and JSON time along a synthetic walking route: full routes every frame vs. compact"""
+    import numpy as np
+    start, dest = (37.7749, -122.4194), (37.7790, -122.4700)
+    stand_in = MapsStandIn(latency=0.0, route=city_route)
+    index.maps = index.maps_client.MapsClient("bench", base=stand_in.base)
+    raw = city_route(start, dest)
+    path = geometry.decode_polyline(raw["overview_polyline"]["points"])
+    cum = geometry.cumulative_distance(path)
+    # Fixes every every_m metres along the route, a few metres to one side
+    marks = np.arange(0.0, cum[-1], every_m)
+    fixes = np.column_stack([np.interp(marks, cum, path[:, 0]), np.interp(marks, cum, path[:, 1])]) + 2e-5
+    simplified = geometry.simplify(path, DEFAULTS["ROUTE_SIMPLIFY_M"])
+    worst = max(geometry.project(simplified, a, b)[2] for a, b in path)
+    print(f"  {cum[-1] / 1000:.1f} km synthetic route (city_route), {len(raw['legs'][0]['steps'])} steps; {len(fixes)} navigation frames, "
+          f"every {warning_every}th a warning (emergency route)")
+    print(f"  overview polyline {len(path)} -> {len(simplified)} vertices at {DEFAULTS['ROUTE_SIMPLIFY_M']:.0f} m "
+          f"tolerance (max deviation {worst:.1f} m), {len(raw['overview_polyline']['points'])} -> "
+          f"{len(geometry.encode_polyline(simplified))} chars")
+
+    def full(route, sent, step_index=None):
+        return route
+
+    compact = index.route_session.payload
+    guidance = {}
+    for label, simplify_m, payload in (("full route every frame", 0.0, full),
+                                       ("simplified + compact", DEFAULTS["ROUTE_SIMPLIFY_M"], compact)):
+        index.ROUTE_SIMPLIFY_M = simplify_m
+        index.route_session.payload = payload
+        state, sizes, dumps_ms, nav = {}, [], [], []
+        before = stand_in.requests.get("directions", 0)
+        with contextlib.redirect_stdout(DEVNULL):
+            for k, (lat, lng) in enumerate(fixes.tolist()):
+                alert = "warning" if k % warning_every == warning_every - 1 else "none"
+                m = index.handle_maps(lat, lng, dest[0], dest[1], None, False, True, True, alert, state)
+                t0 = time.perf_counter()
+                body = json.dumps(m)
+                dumps_ms.append((time.perf_counter() - t0) * 1000)
+                sizes.append(len(body))
+                nav.append(m.get("navigation", {}).get("current_instruction"))
+        index.route_session.payload = compact
+        guidance[label] = nav
+        calls = stand_in.requests.get("directions", 0) - before
+        print(f"  {label:<24} first {sizes[0] / 1024:6.1f} KB   mean {statistics.mean(sizes) / 1024:6.1f} KB   "
+              f"total {sum(sizes) / 1024:8.0f} KB   json.dumps mean {statistics.mean(dumps_ms):.3f} ms   "
+              f"{calls} Directions calls")
+    same = sum(a == b for a, b in zip(*guidance.values()))
+    print(f"  {'':<24} navigation instructions identical on {same}/{len(fixes)} frames")
+    stand_in.close()
+
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    for name in names:
+        fn = BENCHMARKS[name]
+        print(f"\n== {name}: {fn.__doc__}")
+        reset()
+        fn()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,115 @@
+"""
+Semantic cache of scene descriptions
+Frames of the same corridor or crosswalk produce nearly the same labels and
+text, so a recent description is reused when the scene signature is close
+enough (Jaccard similarity) instead of sending the image to Bedrock again.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+TOP_LABELS = 10
+MAX_COUNT = 5  # instance counts above this are all "many"
+
+
+def confidence_bucket(confidence):
+    """Coarse confidence band, so small jitter doesn't change the signature"""
+    if confidence >= 90:
+        return "high"
+    if confidence >= 75:
+        return "mid"
+    return "low"
+
+
+def normalize_text(value):
+    return re.sub(r'[^a-z0-9 ]', '', value.lower()).strip()
+
+
+def signature(labels, text):
+    """Frozen set of tokens describing the scene: labels, counts and visible text"""
+    tokens = set()
+    for label in labels.get('Labels', [])[:TOP_LABELS]:
+        name = label['Name'].lower()
+        tokens.add(f"label:{name}:{confidence_bucket(label.get('Confidence', 0))}")
+        count = len(label.get('Instances', []))
+        if count:
+            tokens.add(f"count:{name}:{min(count, MAX_COUNT)}")
+    for t in text.get('TextDetections', []):
+        if t.get('Type') == 'LINE' and t.get('Confidence', 0) > 70:
+            line = normalize_text(t.get('DetectedText', ''))
+            if line:
+                tokens.add(f"text:{line}")
+    return frozenset(tokens)
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class DescriptionCache:
+    """Bounded, age-limited map from scene signatures to descriptions"""
+
+    def __init__(self, max_entries=128, ttl_s=120, min_similarity=0.8):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.min_similarity = min_similarity
+        self.entries = OrderedDict()  # signature -> (description, created)
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "exactHits": 0, "misses": 0}
+
+    def lookup(self, sig):
+        """Most similar fresh description at or above the threshold, or None"""
+        if self.max_entries <= 0:
+            return None
+        now = time.time()
+        with self.lock:
+            best, best_score = None, 0.0
+            for key, (description, created) in list(self.entries.items()):
+                if now - created > self.ttl_s:
+                    del self.entries[key]
+                    continue
+                score = 1.0 if key == sig else jaccard(sig, key)
+                if score > best_score:
+                    best, best_score = key, score
+
+            if best is None or best_score < self.min_similarity:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(best)
+            self.stats["hits"] += 1
+            if best_score == 1.0:
+                self.stats["exactHits"] += 1
+            return self.entries[best][0]
+
+    def store(self, sig, description):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[sig] = (description, time.time())
+            self.entries.move_to_end(sig)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def summary(self):
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                bedrockCallsSaved=self.stats["hits"],
+                hitRate=round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                entries=len(self.entries)
+            )
+
+
+def from_env():
+    """Build the cache configured by DESCRIPTION_CACHE_* environment variables"""
+    return DescriptionCache(
+        max_entries=int(os.environ.get('DESCRIPTION_CACHE_SIZE', '128')),
+        ttl_s=float(os.environ.get('DESCRIPTION_CACHE_TTL_S', '120')),
+        min_similarity=float(os.environ.get('DESCRIPTION_CACHE_SIMILARITY', '0.8'))
+    )
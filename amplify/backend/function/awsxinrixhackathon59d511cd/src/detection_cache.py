@@ -0,0 +1,154 @@
+"""
+Content-addressed cache of Rekognition responses
+Keyed by a digest of the image bytes plus the call parameters, so retries,
+duplicate submissions and a static camera never pay for the same call twice.
+A small in-memory LRU sits in front of an optional size-bounded directory
+under /tmp, which persists for the life of the container.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def digest(img_bytes):
+    """Fast 128-bit digest of the decoded image bytes"""
+    return hashlib.blake2b(img_bytes, digest_size=16).hexdigest()
+
+
+def make_key(operation, image_digest, params):
+    """Cache key for one Rekognition operation on one image"""
+    parts = [operation, image_digest]
+    for name in sorted(params):
+        value = params[name]
+        if isinstance(value, (list, tuple)):
+            value = ",".join(sorted(value))
+        parts.append(f"{name}={value}")
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+
+class DetectionCache:
+    """Two-tier (memory, then disk) LRU cache of JSON-serializable results"""
+
+    def __init__(self, max_entries=256, disk_dir=None, disk_max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.memory = OrderedDict()
+        self.disk = OrderedDict()  # key -> file size, oldest first
+        self.disk_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {"memoryHits": 0, "diskHits": 0, "misses": 0, "stores": 0}
+
+        if disk_dir:
+            try:
+                os.makedirs(disk_dir, exist_ok=True)
+                self._load_disk_index()
+            except OSError as e:
+                print(f"Detection cache disk tier disabled: {e}")
+                self.disk_dir = None
+
+    def get(self, key):
+        """Cached result for key, or None"""
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats["memoryHits"] += 1
+                return self.memory[key]
+            in_disk = key in self.disk
+
+        result = self._read_disk(key) if in_disk else None
+
+        with self.lock:
+            if result is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["diskHits"] += 1
+            self._remember(key, result)
+            if key in self.disk:
+                self.disk.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        """Store result under key in both tiers"""
+        with self.lock:
+            self.stats["stores"] += 1
+            self._remember(key, result)
+        if self.disk_dir:
+            self._write_disk(key, result)
+
+    def summary(self):
+        """Counters plus current tier sizes"""
+        with self.lock:
+            lookups = self.stats["memoryHits"] + self.stats["diskHits"] + self.stats["misses"]
+            hits = lookups - self.stats["misses"]
+            return dict(
+                self.stats,
+                hitRate=round(hits / lookups, 3) if lookups else 0.0,
+                memoryEntries=len(self.memory),
+                diskEntries=len(self.disk),
+                diskBytes=self.disk_bytes
+            )
+
+    def _remember(self, key, result):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key + ".json")
+
+    def _load_disk_index(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".json"):
+                continue
+            st = os.stat(os.path.join(self.disk_dir, name))
+            entries.append((st.st_mtime, name[:-5], st.st_size))
+        for _, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_bytes += size
+
+    def _read_disk(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            with self.lock:
+                self.disk_bytes -= self.disk.pop(key, 0)
+            return None
+
+    def _write_disk(self, key, result):
+        data = json.dumps(result, separators=(',', ':'), default=str)
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Detection cache write failed (non-fatal): {e}")
+            return
+
+        with self.lock:
+            self.disk_bytes += len(data) - self.disk.pop(key, 0)
+            self.disk[key] = len(data)
+            while self.disk_bytes > self.disk_max_bytes and len(self.disk) > 1:
+                old_key, old_size = self.disk.popitem(last=False)
+                self.disk_bytes -= old_size
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+
+def from_env():
+    """Build the cache configured by REKOGNITION_CACHE_* environment variables"""
+    return DetectionCache(
+        max_entries=int(os.environ.get('REKOGNITION_CACHE_ENTRIES', '256')),
+        disk_dir=os.environ.get('REKOGNITION_CACHE_DIR', '/tmp/rekognition-cache') or None,
+        disk_max_bytes=int(os.environ.get('REKOGNITION_CACHE_DISK_BYTES', str(64 * 1024 * 1024)))
+    )
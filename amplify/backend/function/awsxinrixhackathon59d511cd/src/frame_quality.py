@@ -0,0 +1,111 @@
+"""
+Frame-quality gate for the vision Lambda
+Scores a small grayscale decode of each frame for brightness, sharpness and
+detail, so frames from a covered lens, a dark pocket or a shaking hand are
+turned away before they cost a Rekognition or Bedrock call.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+import imaging
+
+# Longest edge of the decode the gate looks at
+GATE_EDGE = int(os.environ.get('QUALITY_GATE_EDGE', '320'))
+
+HINTS = {
+    "dark": "It's too dark to see. Try turning toward a light.",
+    "covered": "The camera seems to be covered. Check that nothing is blocking the lens.",
+    "blurry": "The picture is blurry. Try holding the phone steady.",
+}
+
+
+class QualityGate:
+    """Thresholds plus counters of how many frames were rejected and why"""
+
+    def __init__(self, min_luma=30.0, min_entropy=3.0, min_sharpness=20.0, enabled=True):
+        self.min_luma = min_luma            # mean 0-255 luminance
+        self.min_entropy = min_entropy      # bits, of the 256-bin histogram
+        self.min_sharpness = min_sharpness  # variance of the Laplacian
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.stats = {"checked": 0, "passed": 0, "skipped": 0,
+                      "rejected": {reason: 0 for reason in HINTS}}
+
+    def check(self, img_bytes):
+        """{"ok", "reason", "hint", metrics...} for a frame; ok when the gate can't run"""
+        if not self.enabled or imaging.Image is None:
+            return self._count({"ok": True, "skipped": True})
+        try:
+            metrics = measure(img_bytes)
+        except Exception as e:
+            print(f"Quality gate skipped (non-fatal): {e}")
+            return self._count({"ok": True, "skipped": True})
+
+        # Dark is checked first: a pocket is dark and flat, and "too dark" is the better hint
+        reason = None
+        if metrics["luma"] < self.min_luma:
+            reason = "dark"
+        elif metrics["entropy"] < self.min_entropy:
+            reason = "covered"
+        elif metrics["sharpness"] < self.min_sharpness:
+            reason = "blurry"
+
+        verdict = dict(metrics, ok=reason is None)
+        if reason:
+            verdict["reason"], verdict["hint"] = reason, HINTS[reason]
+        return self._count(verdict)
+
+    def summary(self):
+        with self.lock:
+            rejected = sum(self.stats["rejected"].values())
+            checked = self.stats["checked"]
+            return dict(
+                self.stats,
+                rejected=dict(self.stats["rejected"]),
+                rejectRate=round(rejected / checked, 3) if checked else 0.0
+            )
+
+    def _count(self, verdict):
+        with self.lock:
+            self.stats["checked"] += 1
+            if verdict.get("skipped"):
+                self.stats["skipped"] += 1
+            if verdict["ok"]:
+                self.stats["passed"] += 1
+            else:
+                self.stats["rejected"][verdict["reason"]] += 1
+        return verdict
+
+
+def measure(img_bytes, max_edge=GATE_EDGE):
+    """Mean luminance, histogram entropy and Laplacian variance of a small decode"""
+    im = imaging.open_downscaled(img_bytes, (max_edge, max_edge))
+    if max(im.size) > max_edge:
+        im.thumbnail((max_edge, max_edge), imaging.Image.BILINEAR)
+    gray = np.asarray(im, dtype=np.uint8)
+
+    hist = np.bincount(gray.ravel(), minlength=256)
+    p = hist[hist > 0] / gray.size
+    entropy = float(-(p * np.log2(p)).sum())
+
+    a = gray.astype(np.float32)
+    laplacian = (a[:-2, 1:-1] + a[2:, 1:-1] + a[1:-1, :-2] + a[1:-1, 2:]
+                 - 4 * a[1:-1, 1:-1])
+    return {
+        "luma": round(float(a.mean()), 1),
+        "entropy": round(entropy, 2),
+        "sharpness": round(float(laplacian.var()), 1),
+    }
+
+
+def from_env():
+    """Build the gate configured by QUALITY_* environment variables"""
+    return QualityGate(
+        min_luma=float(os.environ.get('QUALITY_MIN_LUMA', '30')),
+        min_entropy=float(os.environ.get('QUALITY_MIN_ENTROPY', '3.0')),
+        min_sharpness=float(os.environ.get('QUALITY_MIN_SHARPNESS', '20')),
+        enabled=os.environ.get('QUALITY_GATE', '1') != '0'
+    )
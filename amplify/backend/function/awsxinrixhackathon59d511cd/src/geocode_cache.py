@@ -0,0 +1,157 @@
+"""
+Cache of Google geocoding results
+A walking user moves a few metres between frames, so reverse lookups are
+keyed by the geohash cell they fall in; forward lookups are keyed by the
+normalized destination address. Entries age out a fixed TTL after they
+were fetched. Storage reuses session_store: a memory store answers most
+lookups, and misses fall through to a sqlite store under /tmp, so a
+restarted handler in the same container keeps its geocodes.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import session_store
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Spellings that mean the same street; applied word by word after lowercasing
+ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "boulevard": "blvd", "road": "rd", "drive": "dr",
+    "lane": "ln", "place": "pl", "court": "ct", "square": "sq", "highway": "hwy",
+    "north": "n", "south": "s", "east": "e", "west": "w",
+}
+
+
+def geohash(lat, lng, precision=8):
+    """Standard base-32 geohash; 8 characters is a cell of about 38 x 19 m"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    out, bits, ch, even = [], 0, 0, True
+    while len(out) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        ch <<= 1
+        if value >= mid:
+            ch |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(out)
+
+
+def normalize_address(addr):
+    """Lowercase, punctuation-free, abbreviated form of an address"""
+    words = re.sub(r"[^a-z0-9 ]", " ", addr.lower()).split()
+    return " ".join(ABBREVIATIONS.get(w, w) for w in words)
+
+
+class GeocodeCache:
+    """Geocoding results in two session_store tiers: process memory, then a sqlite file"""
+
+    def __init__(self, max_entries=512, ttl_s=86400, precision=8, db_path=None, db_max_entries=20000):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.precision = precision
+        # Entry-count caps only; the byte cap is left to the store's default
+        self.memory = session_store.SessionStore(session_store.MemoryBackend(), ttl_s=ttl_s,
+                                                 max_entries=max_entries)
+        self.disk = None
+        if db_path and max_entries > 0:
+            try:
+                backend = session_store.SqliteBackend(db_path, table="geocodes")
+                self.disk = session_store.SessionStore(backend, ttl_s=ttl_s, max_entries=db_max_entries)
+            except sqlite3.Error as e:
+                print(f"Geocode cache disk tier disabled: {e}")
+        self.lock = threading.Lock()  # counters only; each tier has its own lock
+        self.stats = {"reverseHits": 0, "reverseMisses": 0, "forwardHits": 0,
+                      "forwardMisses": 0, "diskHits": 0, "stores": 0}
+
+    def reverse_key(self, lat, lng):
+        return "r:" + geohash(float(lat), float(lng), self.precision)
+
+    def forward_key(self, addr):
+        return "f:" + normalize_address(addr)
+
+    def get_reverse(self, lat, lng):
+        """Cached address for the cell containing (lat, lng), or None"""
+        return self._get(self.reverse_key(lat, lng), "reverse")
+
+    def put_reverse(self, lat, lng, address):
+        self._put(self.reverse_key(lat, lng), address)
+
+    def get_forward(self, addr):
+        """Cached (lat, lng) for an address, or None"""
+        value = self._get(self.forward_key(addr), "forward")
+        return tuple(value) if value else None
+
+    def put_forward(self, addr, location):
+        self._put(self.forward_key(addr), list(location))
+
+    def summary(self):
+        """Counters and hit rates per lookup direction"""
+        with self.lock:
+            out = dict(self.stats, entries=len(self.memory))
+        for kind in ("reverse", "forward"):
+            lookups = out[kind + "Hits"] + out[kind + "Misses"]
+            out[kind + "HitRate"] = round(out[kind + "Hits"] / lookups, 3) if lookups else 0.0
+        return out
+
+    def _get(self, key, kind):
+        if self.max_entries <= 0:
+            return None
+        # The stores slide their TTL on every read; a geocode ages from when it was fetched
+        now = time.time()
+        entry = self.memory.get(key)
+        disk_hit = False
+        if not self._fresh(entry, now) and self.disk is not None:
+            entry = self._read_disk(key)
+            disk_hit = self._fresh(entry, now)
+            if disk_hit:
+                self.memory.put(key, entry)
+        hit = self._fresh(entry, now)
+        with self.lock:
+            self.stats[kind + ("Hits" if hit else "Misses")] += 1
+            self.stats["diskHits"] += disk_hit
+        return entry["value"] if hit else None
+
+    def _put(self, key, value):
+        if self.max_entries <= 0 or value is None:
+            return
+        entry = {"value": value, "created": time.time()}
+        with self.lock:
+            self.stats["stores"] += 1
+        self.memory.put(key, entry)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, entry)
+            except sqlite3.Error as e:
+                print(f"Geocode cache write failed (non-fatal): {e}")
+
+    def _fresh(self, entry, now):
+        return bool(entry) and now - entry["created"] <= self.ttl_s
+
+    def _read_disk(self, key):
+        try:
+            return self.disk.get(key)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Geocode cache read failed (non-fatal): {e}")
+            return None
+
+
+def from_env():
+    """Build the cache configured by GEOCODE_CACHE_* environment variables"""
+    return GeocodeCache(
+        max_entries=int(os.environ.get('GEOCODE_CACHE_ENTRIES', '512')),
+        ttl_s=float(os.environ.get('GEOCODE_CACHE_TTL_S', '86400')),
+        precision=int(os.environ.get('GEOCODE_CACHE_PRECISION', '8')),
+        db_path=os.environ.get('GEOCODE_CACHE_DB', '/tmp/geocode-cache.sqlite') or None,
+        db_max_entries=int(os.environ.get('GEOCODE_CACHE_DB_ENTRIES', '20000'))
+    )
@@ -0,0 +1,137 @@
+"""
+Geographic helpers for the maps code
+Great-circle distances batched over NumPy arrays, Google encoded-polyline
+decoding and encoding without a per-character Python loop, projection of
+a point onto a polyline for route progress and off-route checks, and
+Douglas-Peucker simplification of the polylines sent to clients.
+"""
+
+from math import atan2, cos, radians, sin, sqrt
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+M_PER_DEG = 111320.0
+MAX_CHUNKS = 7  # 5-bit groups in one polyline value (enough for 32-bit deltas)
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in metres between two points"""
+    dlat = radians(lat2 - lat1)
+    dlng = radians(lng2 - lng1)
+    h = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlng / 2) ** 2
+    return EARTH_RADIUS_M * 2 * atan2(sqrt(h), sqrt(1 - h))
+
+
+def haversine(lat, lng, lats, lngs):
+    """Metres from one point to each of many (one-to-many)"""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lngs, dtype=np.float64))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def haversine_matrix(lats1, lngs1, lats2, lngs2):
+    """Metres between every pair, shape (len(lats1), len(lats2)) (many-to-many)"""
+    lat1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, None]
+    lng1 = np.radians(np.asarray(lngs1, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(lats2, dtype=np.float64))[None, :]
+    lng2 = np.radians(np.asarray(lngs2, dtype=np.float64))[None, :]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def decode_polyline(points):
+    """(n, 2) array of [lat, lng] from a Google encoded polyline string"""
+    if not points:
+        return np.empty((0, 2))
+    chars = np.frombuffer(points.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    ends = np.flatnonzero(chars < 0x20)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # Each value is little-endian 5-bit groups; shift every group by its place in its value
+    place = np.arange(len(chars)) - np.repeat(starts, ends - starts + 1)
+    values = np.add.reduceat((chars & 0x1F) << (5 * place), starts)
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+    return np.cumsum(deltas[:len(deltas) // 2 * 2].reshape(-1, 2), axis=0) / 1e5
+
+
+def encode_polyline(coords):
+    """Google encoded polyline for an (n, 2) sequence of [lat, lng]"""
+    coords = np.round(np.asarray(coords, dtype=np.float64).reshape(-1, 2) * 1e5).astype(np.int64)
+    if not len(coords):
+        return ""
+    deltas = np.diff(coords, axis=0, prepend=0).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    groups = (values[:, None] >> (5 * np.arange(MAX_CHUNKS))) & 0x1F
+    # Groups after the highest non-zero one are dropped; every value keeps at least one
+    used = np.maximum(1, MAX_CHUNKS - np.argmax((groups[:, ::-1] != 0), axis=1))
+    used[values == 0] = 1
+    keep = np.arange(MAX_CHUNKS)[None, :] < used[:, None]
+    more = np.arange(MAX_CHUNKS)[None, :] < (used - 1)[:, None]
+    chars = (groups | (more * 0x20)) + 63
+    return chars[keep].astype(np.uint8).tobytes().decode("ascii")
+
+
+def to_xy(coords, lat0, lng0):
+    """(n, 2) metres east and north of (lat0, lng0); fine over a few kilometres"""
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    return np.column_stack(((coords[:, 1] - lng0) * M_PER_DEG * cos(radians(lat0)),
+                            (coords[:, 0] - lat0) * M_PER_DEG))
+
+
+def cumulative_distance(coords):
+    """Metres along a polyline at each of its vertices, starting at 0"""
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(coords) < 2:
+        return np.zeros(len(coords))
+    steps = haversine_pairs(coords[:-1], coords[1:])
+    return np.concatenate(([0.0], np.cumsum(steps)))
+
+
+def haversine_pairs(a, b):
+    """Metres between a[i] and b[i] for two (n, 2) arrays of [lat, lng]"""
+    lat1, lng1 = np.radians(a[:, 0]), np.radians(a[:, 1])
+    lat2, lng2 = np.radians(b[:, 0]), np.radians(b[:, 1])
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def project(coords, lat, lng, cum=None):
+    """(segment index, metres along, metres off) of the polyline point closest to (lat, lng)"""
+    xy = to_xy(coords, lat, lng)  # the point itself is the origin
+    if len(xy) < 2:
+        return 0, 0.0, float(np.hypot(*xy[0])) if len(xy) else 0.0
+    a, d = xy[:-1], np.diff(xy, axis=0)
+    length2 = np.einsum("ij,ij->i", d, d)
+    t = np.clip(-np.einsum("ij,ij->i", a, d) / np.where(length2 > 0, length2, 1.0), 0.0, 1.0)
+    closest = a + t[:, None] * d
+    off = np.hypot(closest[:, 0], closest[:, 1])
+    i = int(np.argmin(off))
+    cum = cumulative_distance(coords) if cum is None else np.asarray(cum, dtype=np.float64)
+    return i, float(cum[i] + t[i] * (cum[i + 1] - cum[i])), float(off[i])
+
+
+def simplify(coords, tolerance_m):
+    """Douglas-Peucker: the vertices of a polyline needed to stay within tolerance_m of it"""
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(coords) < 3 or tolerance_m <= 0:
+        return coords
+    xy = to_xy(coords, coords[0, 0], coords[0, 1])
+    keep = np.zeros(len(xy), dtype=bool)
+    keep[[0, -1]] = True
+    spans = [(0, len(xy) - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        # Distance to the chord as a segment, so routes that double back aren't flattened
+        a, d = xy[first], xy[last] - xy[first]
+        inner = xy[first + 1:last] - a
+        length2 = float(d @ d)
+        t = np.clip(inner @ d / length2, 0.0, 1.0) if length2 > 0 else np.zeros(len(inner))
+        off = np.hypot(*(inner - t[:, None] * d).T)
+        i = int(np.argmax(off))
+        if off[i] > tolerance_m:
+            keep[first + 1 + i] = True
+            spans += [(first, first + 1 + i), (first + 1 + i, last)]
+    return coords[keep]
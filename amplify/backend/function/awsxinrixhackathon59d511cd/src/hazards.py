@@ -0,0 +1,162 @@
+"""
+Hazard and obstacle scoring for the vision Lambda
+Flattens a detect_labels response into NumPy columns in one pass, then
+computes position, distance, sector and the pedestrian alert for every
+box at once.
+"""
+
+import os
+from math import radians, tan
+
+import numpy as np
+
+# Obstacle classes, and the Rekognition labels (lowercased) that map to them
+TAXONOMY = {
+    "person": ("person", "people", "human"),
+    "car": ("car",),
+    "vehicle": ("vehicle",),
+    "bicycle": ("bicycle",),
+    "pole": ("pole",),
+    "post": ("post",),
+    "tree": ("tree",),
+    "bench": ("bench",),
+    "dog": ("dog",),
+    "cat": ("cat",),
+}
+CLASSES = list(TAXONOMY)
+CLASS_INDEX = {label: i for i, cls in enumerate(CLASSES) for label in TAXONOMY[cls]}
+OBSTACLE_LABELS = frozenset(CLASS_INDEX)
+PERSON = CLASSES.index("person")
+
+# Typical real-world height of each class, in metres
+HEIGHT_PRIORS_M = {
+    "person": 1.7, "car": 1.5, "vehicle": 1.8, "bicycle": 1.1, "pole": 3.0,
+    "post": 1.0, "tree": 5.0, "bench": 0.85, "dog": 0.5, "cat": 0.25,
+}
+DEFAULT_HEIGHT_M = 1.0  # anything outside the taxonomy
+
+# Vertical field of view of the client camera (phone main cameras are ~55-65 degrees)
+CAMERA_VFOV_DEG = float(os.environ.get('CAMERA_VFOV_DEG', '60'))
+HEIGHT_STEPS = 1024
+MIN_DISTANCE_M, MAX_DISTANCE_M = 0.3, 30.0
+
+# The middle band of the frame counts as "in the user's path"
+PATH_LEFT, PATH_RIGHT = 0.35, 0.65
+SECTORS = ["left", "ahead", "right"]
+NEAR_HEIGHT, VERY_CLOSE_HEIGHT = 0.25, 0.35
+
+NO_ALERT = {"level": "none", "message": "", "count": 0}
+
+
+def distance_table(vfov_deg=CAMERA_VFOV_DEG, steps=HEIGHT_STEPS):
+    """Metres indexed by [class id, box height bin]; the last row is for unknown classes"""
+    priors = np.array([HEIGHT_PRIORS_M[c] for c in CLASSES] + [DEFAULT_HEIGHT_M])
+    # Pinhole camera: an object of height H at distance Z spans
+    # H / (2 Z tan(vfov / 2)) of the frame height; solve for Z at each bin centre
+    fractions = (np.arange(steps) + 0.5) / steps
+    table = priors[:, None] / (2 * tan(radians(vfov_deg) / 2) * fractions[None, :])
+    return np.clip(table, MIN_DISTANCE_M, MAX_DISTANCE_M).round(1)
+
+
+# Built once per container; class id -1 (not an obstacle) reads the last row
+DISTANCE_TABLE = distance_table()
+
+
+class Detections:
+    """Column arrays for every instance box in a detect_labels response"""
+
+    def __init__(self, labels):
+        # The client's box dicts are built in the same pass as the columns;
+        # together they are most of the cost for a busy frame
+        items, flat = [], []
+        index = CLASS_INDEX.get
+        for label in labels.get("Labels", []):
+            name = label["Name"]
+            cls = index(name.lower(), -1)
+            for instance in label.get("Instances", []):
+                bb = instance.get("BoundingBox")
+                if bb:
+                    confidence = instance.get("Confidence", 0)
+                    items.append({"label": name, "confidence": round(confidence, 2), "box": bb})
+                    flat += (cls, confidence, bb.get("Left", 0), bb.get("Top", 0),
+                             bb.get("Width", 0), bb.get("Height", 0))
+
+        self.items = items
+        table = np.fromiter(flat, dtype=np.float64, count=len(flat)).reshape(-1, 6)
+        self.cls = table[:, 0].astype(np.int16)
+        self.confidence, self.left, self.top, self.width, self.height = table[:, 1:].T
+        self.center_x = self.left + self.width / 2.0
+        bins = np.minimum((self.height * HEIGHT_STEPS).astype(np.int32), HEIGHT_STEPS - 1)
+        self.distance = DISTANCE_TABLE[self.cls, np.maximum(bins, 0)]
+        self.sector = np.digitize(self.center_x, [PATH_LEFT, PATH_RIGHT])
+
+    def __len__(self):
+        return len(self.items)
+
+    def box(self, i):
+        """extract_boxes-style dict for one instance: label, rounded confidence, raw box"""
+        return self.items[i]
+
+    def boxes(self):
+        return list(self.items)
+
+    def obstacle_indices(self):
+        return np.flatnonzero(self.cls >= 0)
+
+
+def obstacles(det, tracks=None):
+    """Obstacle dicts for the client, closest first"""
+    tracks = tracks or {}
+    idx = det.obstacle_indices()
+    idx = idx[np.argsort(det.distance[idx], kind="stable")]
+    # Columns go back to Python scalars in bulk; per-element NumPy indexing is slow
+    columns = zip(idx.tolist(), det.cls[idx].tolist(), det.distance[idx].tolist(),
+                  det.center_x[idx].tolist(), det.sector[idx].tolist())
+    items = det.items
+    untracked = {}
+    out = []
+    for i, cls, distance, center_x, sector in columns:
+        track = tracks.get(i, untracked)
+        out.append({
+            "type": CLASSES[cls],
+            "distance": distance,
+            "position": round(center_x, 2),
+            "sector": SECTORS[sector],
+            "confidence": items[i]["confidence"],
+            "trackId": track.get("trackId"),
+            "approaching": track.get("approaching", False),
+            "ttc": track.get("ttc")
+        })
+    return out
+
+
+def obstacle_ahead(det, within_m):
+    """Whether any obstacle in the user's path is within within_m metres"""
+    idx = det.obstacle_indices()
+    ahead = det.sector[idx] == SECTORS.index("ahead")
+    return bool((ahead & (det.distance[idx] <= within_m)).any())
+
+
+def pedestrian_alert(det):
+    """Warning when the most prominent person is in the user's path and near"""
+    people = np.flatnonzero(det.cls == PERSON)
+    if not len(people):
+        return dict(NO_ALERT)
+
+    # Prominence favours centred people, then tall (close) ones;
+    # centredness is 1 in the middle of the frame, 0 at either edge
+    centeredness = 1.0 - np.abs(det.center_x[people] - 0.5) * 2.0
+    prominence = centeredness * 0.6 + np.minimum(det.height[people], 1.0) * 0.4
+    nearest = int(people[np.argmax(prominence)])
+    height = float(det.height[nearest])
+    in_path = PATH_LEFT <= float(det.center_x[nearest]) <= PATH_RIGHT
+    if not (in_path and height >= NEAR_HEIGHT):
+        return dict(NO_ALERT)
+
+    proximity = "very close" if height >= VERY_CLOSE_HEIGHT else "near"
+    return {
+        "level": "warning",
+        "message": f"Warning: pedestrian {proximity} ahead.",
+        "count": int(len(people)),
+        "nearestBox": det.box(nearest)
+    }
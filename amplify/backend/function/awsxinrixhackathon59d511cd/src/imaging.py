@@ -0,0 +1,157 @@
+"""
+Image helpers for the vision Lambda
+Cheap, local analysis of frame bytes that runs before any AWS call
+"""
+
+import base64
+import os
+import struct
+import threading
+import time
+from io import BytesIO
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+HASH_SIZE = 8
+
+# Bedrock bills (and waits on) image tokens, roughly width * height / 750,
+# so frames are shrunk to this longest edge before they go to the model
+MODEL_IMAGE_MAX_EDGE = int(os.environ.get('MODEL_IMAGE_MAX_EDGE', '768'))
+MODEL_IMAGE_QUALITY = int(os.environ.get('MODEL_IMAGE_QUALITY', '80'))
+
+# Rekognition rejects inline images over 5 MB
+REKOGNITION_MAX_BYTES = 5 * 1024 * 1024
+
+
+def open_downscaled(img_bytes, size):
+    """Open an image as grayscale, letting the JPEG decoder skip detail we don't need"""
+    im = Image.open(BytesIO(img_bytes))
+    # draft() makes libjpeg decode at 1/2, 1/4 or 1/8 scale; a no-op for PNG
+    im.draft('L', size)
+    return im.convert('L')
+
+
+def dhash(img_bytes, hash_size=HASH_SIZE):
+    """Difference hash of the frame as an int, or None when Pillow is unavailable"""
+    if Image is None:
+        return None
+
+    im = open_downscaled(img_bytes, (hash_size * 4, hash_size * 4))
+    im = im.resize((hash_size + 1, hash_size), Image.BILINEAR)
+    px = list(im.getdata())
+
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (px[offset + col] < px[offset + col + 1])
+    return bits
+
+
+def hamming(a, b):
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+def media_type(img_bytes):
+    """MIME type from the file's magic bytes"""
+    return "image/png" if img_bytes[:4] == b'\x89PNG' else "image/jpeg"
+
+
+# Start-of-frame markers carry the dimensions; C4 (DHT), C8 (JPG) and CC (DAC) don't
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers with no length field after them
+STANDALONE_MARKERS = frozenset([0x01, 0xD8] + list(range(0xD0, 0xD8)))
+
+
+def image_size(img_bytes):
+    """(width, height) from the PNG IHDR or JPEG SOF header, or None if not found"""
+    if img_bytes[:8] == b'\x89PNG\r\n\x1a\n' and img_bytes[12:16] == b'IHDR':
+        return struct.unpack('>II', img_bytes[16:24])
+    if img_bytes[:2] != b'\xff\xd8':
+        return None
+
+    i, n = 2, len(img_bytes)
+    while i + 4 <= n:
+        if img_bytes[i] != 0xFF:
+            return None
+        marker = img_bytes[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in STANDALONE_MARKERS:
+            i += 2
+            continue
+        if marker in (0xD9, 0xDA):  # end of image / start of scan, no SOF before it
+            return None
+        if marker in SOF_MARKERS:
+            if i + 9 > n:
+                return None
+            height, width = struct.unpack('>HH', img_bytes[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack('>H', img_bytes[i + 2:i + 4])[0]
+    return None
+
+
+def reencode(img_bytes, max_edge, quality):
+    """Shrink to max_edge on the longest side and re-encode as JPEG"""
+    im = Image.open(BytesIO(img_bytes))
+    im.draft('RGB', (max_edge, max_edge))
+    im = ImageOps.exif_transpose(im).convert('RGB')
+    if max(im.size) > max_edge:
+        im.thumbnail((max_edge, max_edge), Image.BICUBIC)
+    out = BytesIO()
+    im.save(out, format='JPEG', quality=quality)
+    return out.getvalue(), im.size
+
+
+class FrameImage:
+    """A decoded frame plus the encodings built from it, each made at most once"""
+
+    def __init__(self, data, img_b64=None, captured_at=None):
+        self.data = data
+        self.img_b64 = img_b64
+        # Seconds since the epoch; the tracker measures motion between frames with it
+        self.captured_at = captured_at if captured_at is not None else time.time()
+        self.lock = threading.Lock()
+        self.model_image = None
+        self.rekognition_bytes = None
+        self.size = image_size(data)
+
+    def for_rekognition(self):
+        """Bytes for Rekognition: the original, unless it's over the size limit"""
+        if len(self.data) <= REKOGNITION_MAX_BYTES or Image is None:
+            return self.data
+        with self.lock:
+            if self.rekognition_bytes is None:
+                self.rekognition_bytes = reencode(self.data, 4096, 90)[0]
+            return self.rekognition_bytes
+
+    def for_model(self):
+        """(base64, media type) for Bedrock: downscaled JPEG, or the original as a fallback"""
+        with self.lock:
+            if self.model_image is None:
+                self.model_image = self._build_model_image()
+            return self.model_image
+
+    def _build_model_image(self):
+        if Image is not None:
+            try:
+                small, size = reencode(self.data, MODEL_IMAGE_MAX_EDGE, MODEL_IMAGE_QUALITY)
+                # A small JPEG can come out bigger after re-encoding; keep the original then
+                if len(small) < len(self.data) or media_type(self.data) != "image/jpeg":
+                    print(f"Model image: {len(self.data)} -> {len(small)} bytes at {size[0]}x{size[1]}")
+                    return base64.b64encode(small).decode('ascii'), "image/jpeg"
+            except Exception as e:
+                print(f"Model image re-encode failed, sending original: {e}")
+        return self.original_base64(), media_type(self.data)
+
+    def original_base64(self):
+        """Plain base64 of the original frame (no data-URL prefix)"""
+        if not self.img_b64:
+            return base64.b64encode(self.data).decode('ascii')
+        start = self.img_b64.find('base64,', 0, 64)
+        return self.img_b64[start + 7:] if start != -1 else self.img_b64
@@ -1,9 +1,26 @@
 import json
 import boto3
-import base64
+import binascii
 import os
+import re
+import time
 import traceback
-from math import radians, sin, cos, sqrt, atan2
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import description_cache
+import detection_cache
+import frame_quality
+import geocode_cache
+import geometry
+import hazards
+import imaging
+import maps_client
+import poi_index
+import resilience
+import route_session
+import scene_change
+import session_store
+import tracker
 
 # Initialize AWS clients with error handling
 try:
@@ -15,49 +32,180 @@ except Exception as e:
     bedrock = None
 
 GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY', '')
+# Pooled keep-alive session shared by every Maps call in this container
+maps = maps_client.from_env()
+
+# Reverse lookups by geohash cell, forward lookups by normalized address
+geocodes = geocode_cache.from_env()
+
+# Places already fetched, so a walking user's nearby searches are mostly local
+pois = poi_index.from_env()
+
+# Navigation frames follow the session's stored route; directions are only
+# fetched again when the user strays from it or it expires
+route_tracker = route_session.from_env()
+# Route polylines sent to clients drop vertices within this many metres of the line
+ROUTE_SIMPLIFY_M = float(os.environ.get('ROUTE_SIMPLIFY_M', '5'))
+
+# Independent Maps calls run side by side; whatever hasn't returned by the
+# deadline is left out of the response rather than holding it up.
+MAPS_WORKERS = int(os.environ.get('MAPS_WORKERS', '8'))
+MAPS_DEADLINE_S = float(os.environ.get('MAPS_DEADLINE_S', '3'))
+maps_pool = ThreadPoolExecutor(max_workers=MAPS_WORKERS)
+NEARBY_SEARCHES = [
+    ("hospitals", "hospital", 3000),
+    ("police_stations", "police", 3000),
+    ("transit_stations", "transit_station", 1000),
+]
+
+# Shared worker pool so detect_labels and detect_text run side by side.
+# Created once per container and reused across warm invocations.
+REKOGNITION_WORKERS = int(os.environ.get('REKOGNITION_WORKERS', '8'))
+rekognition_pool = ThreadPoolExecutor(max_workers=REKOGNITION_WORKERS)
+
+# Frames of a batch request are analyzed on their own bounded pool; it must
+# stay separate from rekognition_pool since each frame task waits on that one.
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', '4'))
+BATCH_MAX_FRAMES = int(os.environ.get('BATCH_MAX_FRAMES', '10'))
+
+# Query-string and form values arrive as strings; these get the types the
+# JSON body carries, every other parameter stays a string
+NUMERIC_PARAMS = {'latitude', 'longitude', 'destination_latitude', 'destination_longitude', 'capturedAt'}
+BOOL_PARAMS = {'tell', 'continuous', 'warnOnly', 'findNearby', 'getRoute', 'navigationMode',
+               'stream', 'fullRoute'}
+frame_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS)
+
+# Byte-identical frames reuse earlier Rekognition responses (memory + /tmp tiers)
+rekognition_cache = detection_cache.from_env()
+
+# What each request mode asks Rekognition for. Image dimensions come from the
+# file header (imaging.image_size), so IMAGE_PROPERTIES is never requested.
+#   hazard:     continuous obstacle checks; boxes only, no text
+#   navigation: continuous turn-by-turn; no text, but the same labels as hazard
+#               mode, since these frames also feed obstacle alerts and the tracker,
+#               and scene_change scores the top TOP_LABELS of them
+#   narration:  on-demand descriptions; full label list plus visible text
+REKOGNITION_MODES = {
+    "hazard": {"labels": {"MaxLabels": 20, "MinConfidence": 60}, "text": False},
+    "navigation": {"labels": {"MaxLabels": scene_change.TOP_LABELS, "MinConfidence": 60}, "text": False},
+    "narration": {"labels": {"MaxLabels": 20, "MinConfidence": 60}, "text": True},
+}
+
+# Dark, covered and blurred frames get a retake hint instead of an AWS call
+quality_gate = frame_quality.from_env()
+NO_ALERT = hazards.NO_ALERT
+
+# Smoothed per-session scene-change scoring (state lives under state["scene"])
+scene_detector = scene_change.from_env()
+
+# Cross-frame tracks of obstacles (state lives under state["tracking"])
+object_tracker = tracker.from_env()
+# Warn about a centred, approaching object this many seconds before it arrives
+TTC_ALERT_S = float(os.environ.get('TTC_ALERT_S', '4'))
+
+# nextCaptureMs bounds: fastest when a hazard is close, slowest in a calm, static scene
+CAPTURE_MIN_MS = int(os.environ.get('CAPTURE_MIN_MS', '500'))
+CAPTURE_BASE_MS = int(os.environ.get('CAPTURE_BASE_MS', '2000'))
+CAPTURE_IDLE_MS = int(os.environ.get('CAPTURE_IDLE_MS', '4000'))
+
+# Near-duplicate frames (Hamming distance below the threshold) reuse the
+# previous Rekognition result. 0 disables deduplication.
+DEDUP_HAMMING_THRESHOLD = int(os.environ.get('DEDUP_HAMMING_THRESHOLD', '6'))
+DEDUP_MAX_AGE_S = float(os.environ.get('DEDUP_MAX_AGE_S', '10'))
+
+ALERT_SEVERITY = {"none": 0, "warning": 2}
+
+SONNET_MODEL_ID = 'anthropic.claude-sonnet-4-20250514'
+HAIKU_MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
+
+# Per-model circuit breakers: while Sonnet keeps failing (or is very slow),
+# requests go straight to Haiku until a half-open probe sees it recover
+model_breakers = {
+    model_id: resilience.CircuitBreaker(
+        name,
+        failure_threshold=int(os.environ.get('BEDROCK_BREAKER_FAILURES', '3')),
+        window=int(os.environ.get('BEDROCK_BREAKER_WINDOW', '10')),
+        reset_timeout_s=float(os.environ.get('BEDROCK_BREAKER_RESET_S', '30')),
+        slow_call_ms=float(os.environ.get('BEDROCK_SLOW_CALL_MS', '8000'))
+    )
+    for model_id, name in ((SONNET_MODEL_ID, "sonnet"), (HAIKU_MODEL_ID, "haiku"))
+}
+
+# Hedged mode: if Sonnet hasn't answered within this budget, race Haiku. 0 disables.
+BEDROCK_HEDGE_AFTER_MS = float(os.environ.get('BEDROCK_HEDGE_AFTER_MS', '0'))
+bedrock_pool = ThreadPoolExecutor(max_workers=4)
+hedge_stats = {"hedged": 0, "primaryWins": 0, "backupWins": 0}
+
+# Description router: scenes scoring at or below ROUTER_RULES_MAX_SCORE get the
+# rule-based text, up to ROUTER_TEXT_MAX_SCORE a text-only Haiku prompt,
+# anything busier the multimodal Sonnet call
+ROUTER_RULES_MAX_SCORE = float(os.environ.get('ROUTER_RULES_MAX_SCORE', '3'))
+ROUTER_TEXT_MAX_SCORE = float(os.environ.get('ROUTER_TEXT_MAX_SCORE', '10'))
+# An obstacle ahead within this many metres bumps the scene score even without an alert
+ROUTER_HAZARD_NEAR_M = float(os.environ.get('ROUTER_HAZARD_NEAR_M', '3'))
+router_stats = {"rules": 0, "text": 0, "multimodal": 0}
+token_usage = {}
+
+# Recent Bedrock descriptions, reused for scenes with a near-identical signature
+scene_descriptions = description_cache.from_env()
 
-# Cache globals
-last_desc, last_hash = "", None
-last_scene_labels = []
-frame_counter = 0
+# Sentence boundary in streamed model output
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Per-session scene memory (description cache, frame hash, last labels)
+sessions = session_store.from_env()
+request_counter = 0
 
 
 def handler(event, context):
     """Main Lambda handler with comprehensive error handling"""
-    global last_desc, last_hash, last_scene_labels, frame_counter
+    global request_counter
     
-    frame_counter += 1
-    print(f"=== REQUEST #{frame_counter} ===")
+    request_counter += 1
+    print(f"=== REQUEST #{request_counter} ===")
+    started = time.perf_counter()
     
     try:
         # Handle CORS preflight
         if event.get("httpMethod") == "OPTIONS":
             return cors_response(200, {"message": "CORS preflight success"})
+        
+        # Cache and session counters for sizing
+        if event.get("httpMethod") == "GET":
+            return cors_response(200, {"stats": collect_stats()})
 
-        # Parse body
+        # Parse body: JSON with a base64 data URL, or a binary image / multipart upload
         try:
-            if isinstance(event.get('body'), str):
-                body = json.loads(event['body'])
-            else:
-                body = event.get('body', {})
+            body, img_bytes, img_b64 = parse_event(event)
         except json.JSONDecodeError as e:
             print(f"JSON decode error: {e}")
             return cors_response(400, {'error': 'Invalid JSON in request body'})
+        except ValueError as e:
+            print(f"Image decode error: {e}")
+            return cors_response(400, {'error': f'Image decode failed: {str(e)}'})
         
         print(f"Parsed body keys: {body.keys()}")
         
-        # Validate image data
-        img_b64 = body.get('image')
-        if not img_b64:
+        # Scene memory is scoped to the client's session
+        session_id = str(body.get('sessionId') or 'anonymous')
+        state = sessions.get(session_id)
+        
+        if isinstance(body.get('frames'), list):
+            data = handle_batch(body, state, started)
+            if "error" in data:
+                return cors_response(400, data)
+            sessions.put(session_id, state)
+            print(f"Stats: {json.dumps(collect_stats())}")
+            if body.get('stream', False):
+                return progressive_response(200, data)
+            return cors_response(200, data)
+        
+        if img_bytes is None:
             return cors_response(400, {'error': 'No image data provided'})
+        print(f"Image decoded successfully. Size: {len(img_bytes)} bytes")
         
-        # Clean and decode base64
-        try:
-            img_bytes = clean_and_decode_image(img_b64)
-            print(f"Image decoded successfully. Size: {len(img_bytes)} bytes")
-        except Exception as e:
-            print(f"Image decode error: {e}")
-            return cors_response(400, {'error': f'Image decode failed: {str(e)}'})
+        state["frames"] = state.get("frames", 0) + 1
+        print(f"Session {session_id} - frame #{state['frames']}")
         
         # Extract parameters
         is_continuous = body.get('continuous', False)
@@ -68,8 +216,6 @@ def handler(event, context):
         user_lat = body.get('latitude')
         user_lng = body.get('longitude')
         dest_addr = body.get('destination_address')
-        dest_lat = body.get('destination_latitude')
-        dest_lng = body.get('destination_longitude')
         find_nearby = body.get('findNearby', False)
         get_route = body.get('getRoute', False)
         navigation_mode = body.get('navigationMode', False)  # New: turn-by-turn mode
@@ -79,240 +225,752 @@ def handler(event, context):
         print(f"Navigation - mode: {navigation_mode}, nearby: {find_nearby}, route: {get_route}")
         
         # Vision analysis
-        labels = {}
-        text = {'TextDetections': []}
-        boxes = []
-        alert = {"level": "none", "message": ""}
-        scene_changed = False
+        frame = imaging.FrameImage(img_bytes, img_b64, captured_at(body))
+        result = analyze_frames([frame], state, rekognition_mode(body))[0]
+        if "error" in result:
+            return cors_response(400, result["error"])
         
-        if rekognition:
+        if result.get("retake"):
+            ai_text, should_speak = quality_hint(body, state, result["quality"])
+            data = {"aiDescription": ai_text, "shouldSpeak": should_speak}
+            data.update(frame_response(result))
+            data["nextCaptureMs"] = next_capture_ms(state, data, result, started)
+            sessions.put(session_id, state)
+            print(f"Frame rejected by quality gate: {result['quality']['reason']}")
+            return cors_response(200, data)
+        
+        # AI narration logic
+        ai_text, should_speak = narrate(
+            body, state, result, result["alert"], result["sceneChanged"], frame
+        )
+        
+        # Build response data
+        data = {"aiDescription": ai_text, "shouldSpeak": should_speak}
+        data.update(frame_response(result))
+        add_narration_details(data, result)
+        
+        # Maps & routing
+        add_maps(data, body, result["alert"]["level"], state)
+        
+        data["nextCaptureMs"] = next_capture_ms(state, data, result, started)
+        sessions.put(session_id, state)
+        
+        print(f"Stats: {json.dumps(collect_stats())}")
+        print("Request processed successfully")
+        if body.get('stream', False):
+            return progressive_response(200, data)
+        return cors_response(200, data)
+    
+    except Exception as e:
+        print(f"UNHANDLED EXCEPTION in handler: {e}")
+        print(traceback.format_exc())
+        return cors_response(500, {
+            "error": str(e),
+            "type": type(e).__name__,
+            "traceback": traceback.format_exc()
+        })
+
+
+def handle_batch(body, state, started):
+    """Analyze an ordered list of frames and return per-frame results plus one alert"""
+    frames = body['frames']
+    if not frames:
+        return {'error': 'No frames provided'}
+    if len(frames) > BATCH_MAX_FRAMES:
+        return {'error': f'Too many frames: {len(frames)} (max {BATCH_MAX_FRAMES})'}
+    print(f"Batch of {len(frames)} frames")
+    
+    # Decode up front; a bad frame fails alone, not the whole batch
+    decoded = []
+    for i, frame in enumerate(frames):
+        img_b64 = frame.get('image') if isinstance(frame, dict) else frame
+        try:
+            decoded.append(imaging.FrameImage(
+                clean_and_decode_image(img_b64 or ''), img_b64,
+                captured_at(frame) if isinstance(frame, dict) else None
+            ))
+        except Exception as e:
+            print(f"Batch frame {i} decode error: {e}")
+            decoded.append(None)
+    
+    valid = [i for i, frame in enumerate(decoded) if frame is not None]
+    analyzed = analyze_frames([decoded[i] for i in valid], state, rekognition_mode(body)) if valid else []
+    results = [{"error": {"error": "Image decode failed"}} for _ in frames]
+    for i, result in zip(valid, analyzed):
+        results[i] = result
+    state["frames"] = state.get("frames", 0) + len(valid)
+    
+    # Most severe alert wins; among equals the latest frame is the most current
+    alert = dict(NO_ALERT)
+    last_ok = last_retake = None
+    for i, result in enumerate(results):
+        if "error" in result:
+            continue
+        if result.get("retake"):
+            last_retake = i
+            continue
+        last_ok = i
+        if ALERT_SEVERITY.get(result["alert"]["level"], 0) >= ALERT_SEVERITY.get(alert["level"], 0):
+            if result["alert"]["level"] != "none":
+                alert = dict(result["alert"], frameIndex=i)
+    
+    data = {
+        "frames": [
+            {"error": r["error"]["error"]} if "error" in r else frame_response(r)
+            for r in results
+        ],
+        "alert": alert,
+        "aiDescription": None,
+        "shouldSpeak": False
+    }
+    
+    # Narrate once, for the newest frame, with the batch's combined view
+    if last_ok is not None:
+        latest = results[last_ok]
+        scene_changed = any(r.get("sceneChanged") for r in results)
+        data["aiDescription"], data["shouldSpeak"] = narrate(
+            body, state, latest, alert, scene_changed, decoded[last_ok]
+        )
+        add_narration_details(data, latest)
+    elif last_retake is not None:
+        data["aiDescription"], data["shouldSpeak"] = quality_hint(
+            body, state, results[last_retake]["quality"]
+        )
+    
+    # Pace the next batch on the newest usable frame and the batch's alert
+    latest = last_ok if last_ok is not None else last_retake
+    if latest is not None:
+        data["nextCaptureMs"] = next_capture_ms(
+            state, dict(data["frames"][latest], alert=alert), results[latest], started
+        )
+    
+    add_maps(data, body, alert["level"], state)
+    return data
+
+
+def rekognition_mode(body):
+    """Which REKOGNITION_MODES entry a request needs"""
+    if body.get('tell', False):
+        return "narration"
+    if body.get('navigationMode', False) and body.get('continuous', False):
+        return "navigation"
+    return "hazard"
+
+
+def analyze_frames(frames, state, mode="narration"):
+    """Vision pipeline for an ordered list of decoded frames from one session"""
+    # Gate and hash everything first so rejects and near-duplicates are
+    # planned before any AWS call
+    if len(frames) == 1:
+        checks = [inspect_frame(frames[0].data)]
+    else:
+        checks = list(frame_pool.map(inspect_frame, [f.data for f in frames]))
+    
+    # Each frame either reuses an earlier result (the session's cached
+    # detection is -1), is its own source and goes to Rekognition, or was
+    # rejected by the quality gate (None)
+    cached = cached_detection(state, mode)
+    ref_hash = state.get("frameHash") if cached else None
+    ref_index = -1
+    sources, distances = [], []
+    for i, (quality, _, frame_hash, _) in enumerate(checks):
+        if not quality["ok"]:
+            sources.append(None)
+            distances.append(None)
+            continue
+        distance = duplicate_distance(frame_hash, ref_hash)
+        if distance is not None:
+            sources.append(ref_index)
+        else:
+            sources.append(i)
+            ref_hash, ref_index = frame_hash, i
+        distances.append(distance)
+    
+    futures = {}
+    if rekognition:
+        to_run = [i for i, src in enumerate(sources) if src == i]
+        if len(to_run) == 1:
+            futures[to_run[0]] = None
+        else:
+            for i in to_run:
+                futures[i] = frame_pool.submit(run_rekognition, frames[i].for_rekognition(), mode)
+    else:
+        print("WARNING: Rekognition client not initialized")
+    
+    results = []
+    for i, frame in enumerate(frames):
+        src = sources[i]
+        quality, quality_ms, frame_hash, hash_ms = checks[i]
+        result = {
+            "timings": {"qualityMs": quality_ms, "hashMs": hash_ms}, "sceneChanged": False,
+            "deduplicated": src is not None and src != i, "imageSize": frame.size or (0, 0),
+            "quality": quality
+        }
+        
+        if src is None:
+            result.update(retake=True, labels={}, text={'TextDetections': []},
+                          detections=hazards.Detections({}), boxes=[], alert=dict(NO_ALERT))
+            results.append(result)
+            continue
+        state.pop("qualityIssue", None)
+        
+        saved = None
+        if src == -1:
+            print(f"Near-duplicate frame (distance {distances[i]}) - reusing detection result")
+            labels, text = cached['labels'], cached['text']
+        elif src != i:
+            if "error" in results[src]:
+                results.append(dict(results[src], deduplicated=True, imageSize=result["imageSize"],
+                                    quality=quality, timings=result["timings"]))
+                continue
+            labels, text = results[src]['labels'], results[src]['text']
+        elif i in futures:
             try:
-                print("Calling Rekognition detect_labels...")
-                labels = rekognition.detect_labels(
-                    Image={'Bytes': img_bytes},
-                    MaxLabels=20,
-                    MinConfidence=60,
-                    Features=['GENERAL_LABELS', 'IMAGE_PROPERTIES']
-                )
+                print("Calling Rekognition detect_labels + detect_text...")
+                future = futures[i]
+                labels, text, rek_timings = future.result() if future else run_rekognition(frame.for_rekognition(), mode)
+                result["timings"].update(rek_timings)
                 print(f"Labels detected: {len(labels.get('Labels', []))}")
-                
-                # Scene change detection
-                current_labels = [l['Name'] for l in labels.get('Labels', [])[:10]]
-                scene_changed = has_scene_changed(current_labels)
-                
             except Exception as e:
                 print(f"Rekognition detect_labels error: {e}")
                 print(traceback.format_exc())
-                return cors_response(400, {
+                result["error"] = {
                     'error': f'Rekognition error: {str(e)}',
                     'type': type(e).__name__,
                     'details': traceback.format_exc()
-                })
+                }
+                results.append(result)
+                continue
             
-            try:
-                print("Calling Rekognition detect_text...")
-                text = rekognition.detect_text(Image={'Bytes': img_bytes})
-            except Exception as e:
-                print(f"Rekognition detect_text warning (non-fatal): {e}")
+            # Scene change detection, in frame order
+            score, changed = scene_detector.update(state.setdefault("scene", {}), labels)
+            result["sceneChangeScore"], result["sceneChanged"] = score, changed
+            print(f"Scene change score {score} (pending {state['scene']['pending']}, changed: {changed})")
             
-            boxes = extract_boxes(labels)
-            alert = detect_pedestrian_alert(boxes)
+            if frame_hash is not None:
+                state["frameHash"] = frame_hash
+                saved = state["detection"] = {"labels": labels, "text": text, "at": time.time(), "mode": mode}
         else:
-            print("WARNING: Rekognition client not initialized")
+            labels, text = {}, {'TextDetections': []}
         
-        # AI narration logic
-        ai_text = None
-        should_speak = False
+        result["labels"], result["text"] = labels, text
+        # One parse of the response feeds boxes, obstacles, tracking and alerts
+        det = result["detections"] = hazards.Detections(labels)
+        result["boxes"] = det.boxes()
+        if src == -1:
+            # Replayed boxes under a new timestamp would read as zero growth,
+            # so a duplicate reuses the tracks of the frame it repeats
+            result["tracks"] = replay_tracks(cached.get("tracks", []), cached.get("trackedAt"), frame.captured_at)
+        elif src != i:
+            result["tracks"] = replay_tracks(results[src]["tracks"].items(), frames[src].captured_at,
+                                             frame.captured_at)
+        else:
+            result["tracks"] = track_obstacles(state, det, result["boxes"], frame.captured_at)
+            if saved is not None:
+                saved.update(tracks=list(result["tracks"].items()), trackedAt=frame.captured_at)
+        result["alert"] = hazards.pedestrian_alert(det)
+        if result["alert"]["level"] == "none":
+            result["alert"] = detect_approach_alert(result["boxes"], result["tracks"])
+        results.append(result)
+    return results
+
+
+def captured_at(params):
+    """Client capture time (capturedAt, ms since the epoch) in seconds, or None"""
+    try:
+        return float(params['capturedAt']) / 1000
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def track_obstacles(state, det, boxes, now):
+    """Run the session's tracker over the obstacle boxes; {box index: track summary}"""
+    tracked = det.obstacle_indices().tolist()
+    summaries = object_tracker.update(
+        state.setdefault("tracking", {}), [boxes[i] for i in tracked], now
+    )
+    return dict(zip(tracked, summaries))
+
+
+def replay_tracks(tracks, tracked_at, now):
+    """{box index: track summary} from (index, summary) pairs, time-to-collision counted down to now"""
+    elapsed = max(0.0, now - tracked_at) if tracked_at is not None else 0.0
+    replayed = {}
+    for i, summary in tracks:
+        if summary["ttc"] is not None:
+            summary = dict(summary, ttc=max(0.1, round(summary["ttc"] - elapsed, 1)))
+        replayed[i] = summary
+    return replayed
+
+
+def inspect_frame(img_bytes):
+    """(quality verdict, ms, perceptual hash, ms); rejected frames aren't hashed"""
+    start = time.perf_counter()
+    quality = quality_gate.check(img_bytes)
+    quality_ms = round((time.perf_counter() - start) * 1000, 1)
+    if not quality["ok"]:
+        return quality, quality_ms, None, 0.0
+    return (quality, quality_ms) + hash_frame(img_bytes)
+
+
+def quality_hint(body, state, quality):
+    """Retake hint for a rejected frame; spoken on demand or when the problem changes"""
+    should_speak = body.get('tell', False) or state.get("qualityIssue") != quality["reason"]
+    state["qualityIssue"] = quality["reason"]
+    return quality["hint"], should_speak
+
+
+def hash_frame(img_bytes):
+    """Perceptual hash of a frame and the time it took; (None, ms) on failure"""
+    start = time.perf_counter()
+    try:
+        frame_hash = imaging.dhash(img_bytes)
+    except Exception as e:
+        print(f"Frame hash warning (non-fatal): {e}")
+        frame_hash = None
+    return frame_hash, round((time.perf_counter() - start) * 1000, 1)
+
+
+def narrate(body, state, result, alert, scene_changed, frame):
+    """Pick what to say for a frame; returns (ai_text, should_speak)"""
+    labels, text = result["labels"], result["text"]
+    is_continuous = body.get('continuous', False)
+    ai_text = None
+    should_speak = False
+    
+    if alert['level'] != 'none':
+        # Priority: Safety alerts
+        ai_text = alert['message']
+        should_speak = True
+        print(f"[ALERT] {ai_text}")
         
-        if alert['level'] != 'none':
-            # Priority: Safety alerts
-            ai_text = alert['message']
-            should_speak = True
-            print(f"[ALERT] {ai_text}")
-            
-        elif tell:
-            # On-demand narration
-            if (not is_continuous) or scene_changed or not last_desc:
-                print("Generating full AI description...")
-                ai_text = describe_scene(labels, text, img_b64)
-                last_desc = ai_text
-                last_scene_labels = [l['Name'] for l in labels.get('Labels', [])[:10]]
-                last_hash = str(labels)
+    elif body.get('tell', False):
+        # On-demand narration
+        if (not is_continuous) or scene_changed or not state.get("desc"):
+            path, score = route_description(labels, text, scene_hazard(result))
+            router_stats[path] += 1
+            print(f"Generating AI description via {path} path (complexity {score})...")
+            if path == "rules":
+                ai_text = rule_based_description(labels)
+            elif path == "text":
+                ai_text = describe_scene_text(labels, text)
+            elif body.get('stream', False):
+                # Sentence-by-sentence from Bedrock; the response itself is still
+                # returned in one piece (see progressive_response)
+                ai_text, result["descriptionChunks"] = collect_sentences(
+                    describe_scene_stream(labels, text, *frame.for_model())
+                )
             else:
-                ai_text = last_desc
-            should_speak = True
-            
-        elif navigation_mode and is_continuous:
-            # Navigation mode: minimal updates, only on scene change
-            if scene_changed:
-                print("Scene changed during navigation - brief update")
-                ai_text = describe_scene_brief(labels)
-                last_desc = ai_text
-                should_speak = True
+                ai_text = describe_scene(labels, text, *frame.for_model())
+            result["descriptionPath"] = path
+            state["desc"] = ai_text
+        else:
+            ai_text = state["desc"]
+        should_speak = True
         
-        # Build response data
+    elif body.get('navigationMode', False) and is_continuous:
+        # Navigation mode: minimal updates, only on scene change
+        if scene_changed:
+            print("Scene changed during navigation - brief update")
+            ai_text = describe_scene_brief(labels)
+            state["desc"] = ai_text
+            should_speak = True
+    
+    return ai_text, should_speak
+
+
+def next_capture_ms(state, data, result, started):
+    """How long the client should wait before sending the next frame"""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    latency = state["latencyMs"] = round(0.7 * state.get("latencyMs", elapsed_ms) + 0.3 * elapsed_ms, 1)
+
+    if result.get("retake"):
+        # A pocket or a covered lens won't clear up within a second
+        dark = result["quality"]["reason"] in ("dark", "covered")
+        interval = CAPTURE_IDLE_MS if dark else CAPTURE_BASE_MS
+    elif data["alert"]["level"] != "none":
+        interval = CAPTURE_MIN_MS
+    else:
+        # A static scene drifts toward the idle rate; change pulls it back to the base rate
+        change = min(1.0, result.get("sceneChangeScore", 0.0) / scene_detector.enter)
+        interval = CAPTURE_IDLE_MS - (CAPTURE_IDLE_MS - CAPTURE_BASE_MS) * change
+        new_tracks = {t["id"] for t in state.get("tracking", {}).get("tracks", []) if t["hits"] == 1}
+        for o in data["obstacles"]:
+            if o["ttc"] is not None:
+                # Several looks before it arrives, and one before it crosses the alert threshold
+                interval = min(interval, o["ttc"] * 1000 / 4, (o["ttc"] - TTC_ALERT_S) * 1000)
+            if o["sector"] == "ahead":
+                interval = min(interval, CAPTURE_BASE_MS * o["distance"] / 5)
+                if o["trackId"] in new_tracks:
+                    # A quick second look measures whether it's coming closer
+                    interval = min(interval, CAPTURE_BASE_MS / 2)
+
+    # Never ask for frames faster than we answer them
+    interval = max(CAPTURE_MIN_MS, latency, min(interval, CAPTURE_IDLE_MS))
+    return int(round(interval, -2))
+
+
+def add_narration_details(data, result):
+    """Copy how the description was produced into the response"""
+    if "descriptionPath" in result:
+        data["descriptionPath"] = result["descriptionPath"]
+    if "descriptionChunks" in result:
+        data["aiDescriptionChunks"] = result["descriptionChunks"]
+
+
+def collect_sentences(sentences):
+    """Drain a sentence generator; returns (full text, [{text, atMs}]), atMs measured server-side"""
+    start = time.perf_counter()
+    chunks = []
+    for sentence in sentences:
+        chunks.append({"text": sentence, "atMs": round((time.perf_counter() - start) * 1000, 1)})
+    if chunks:
+        print(f"First sentence after {chunks[0]['atMs']} ms, {len(chunks)} sentences")
+    return " ".join(c["text"] for c in chunks), chunks
+
+
+def frame_response(result):
+    """Client-facing fields for one analyzed frame"""
+    width, height = result["imageSize"]
+    data = {
+        "alert": result["alert"],
+        "boundingBoxes": result["boxes"],
         # Convert bounding boxes to obstacles format for frontend
-        obstacles = convert_boxes_to_obstacles(boxes)
-
-        data = {
-            "aiDescription": ai_text,
-            "alert": alert,
-            "boundingBoxes": boxes,
-            "obstacles": obstacles,
-            "shouldSpeak": should_speak,
-            "sceneChanged": scene_changed,
-            "imageWidth": labels.get('ImageProperties', {}).get('Width', 0),
-            "imageHeight": labels.get('ImageProperties', {}).get('Height', 0)
-        }
+        "obstacles": hazards.obstacles(result["detections"], result.get("tracks")),
+        "sceneChanged": result["sceneChanged"],
+        "sceneChangeScore": result.get("sceneChangeScore", 0.0),
+        "deduplicated": result["deduplicated"],
+        "imageWidth": width,
+        "imageHeight": height,
+        "quality": result["quality"],
+        "timings": result["timings"]
+    }
+    if result.get("retake"):
+        data["retake"] = True
+    return data
+
+
+def add_maps(data, body, alert_level, state=None):
+    """Attach maps & routing data when the request asks for it"""
+    user_lat = body.get('latitude')
+    user_lng = body.get('longitude')
+    dest_addr = body.get('destination_address')
+    dest_lat = body.get('destination_latitude')
+    dest_lng = body.get('destination_longitude')
+    find_nearby = body.get('findNearby', False)
+    get_route = body.get('getRoute', False)
+    navigation_mode = body.get('navigationMode', False)
+    if body.get('fullRoute') and state is not None:
+        # The client lost its copy: send every route in full again
+        state.pop("routesSent", None)
+    
+    if GOOGLE_MAPS_API_KEY and user_lat and user_lng:
+        if dest_addr or dest_lat or find_nearby or get_route or navigation_mode:
+            print("Processing maps data...")
+            try:
+                data["maps"] = handle_maps(
+                    user_lat, user_lng, dest_lat, dest_lng, dest_addr,
+                    find_nearby, get_route, navigation_mode, alert_level, state
+                )
+            except Exception as e:
+                print(f"Maps processing error (non-fatal): {e}")
+                data["maps"] = {"error": str(e)}
+
+
+def parse_event(event):
+    """Return (params, img_bytes, img_b64) for JSON, binary and multipart requests"""
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    content_type = headers.get('content-type', '')
+    raw = event.get('body')
+    
+    if content_type.startswith('image/') or content_type.startswith('multipart/form-data'):
+        # Binary path: params travel in the query string (and form fields)
+        params = {k: coerce_param(k, v) for k, v in (event.get('queryStringParameters') or {}).items()}
+        if not raw:
+            return params, None, None
         
-        # Maps & routing
-        if GOOGLE_MAPS_API_KEY and user_lat and user_lng:
-            if dest_addr or dest_lat or find_nearby or get_route or navigation_mode:
-                print("Processing maps data...")
-                try:
-                    data["maps"] = handle_maps(
-                        user_lat, user_lng, dest_lat, dest_lng, dest_addr,
-                        find_nearby, get_route, navigation_mode, alert["level"]
-                    )
-                except Exception as e:
-                    print(f"Maps processing error (non-fatal): {e}")
-                    data["maps"] = {"error": str(e)}
+        if content_type.startswith('image/') and event.get('isBase64Encoded'):
+            # The body is exactly the image's base64, which Bedrock can take as-is
+            return params, clean_and_decode_image(raw), raw
         
-        print("Request processed successfully")
-        return cors_response(200, data)
+        if event.get('isBase64Encoded'):
+            data = binascii.a2b_base64(raw)
+        else:
+            data = raw.encode('latin-1') if isinstance(raw, str) else raw
+        if content_type.startswith('image/'):
+            return params, validate_image(data), None
+        
+        fields = parse_multipart(data, content_type)
+        image = fields.pop('image', None)
+        for name, value in fields.items():
+            params[name] = coerce_param(name, value.decode('utf-8', 'replace'))
+        return params, validate_image(image) if image else None, None
     
-    except Exception as e:
-        print(f"UNHANDLED EXCEPTION in handler: {e}")
-        print(traceback.format_exc())
-        return cors_response(500, {
-            "error": str(e),
-            "type": type(e).__name__,
-            "traceback": traceback.format_exc()
-        })
+    if isinstance(raw, str):
+        params = json.loads(raw)
+    else:
+        params = raw or {}
+    
+    img_b64 = params.get('image')
+    if not img_b64:
+        return params, None, None
+    return params, clean_and_decode_image(img_b64), img_b64
+
+
+def coerce_param(name, value):
+    """Turn a query-string / form value back into the type the JSON body carries"""
+    if name in BOOL_PARAMS and value in ('true', 'false'):
+        return value == 'true'
+    if name in NUMERIC_PARAMS:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return value
+    return value
+
+
+def parse_multipart(data, content_type):
+    """Split a multipart/form-data body into {field name: bytes}"""
+    boundary = None
+    for part in content_type.split(';')[1:]:
+        key, _, value = part.strip().partition('=')
+        if key.lower() == 'boundary':
+            boundary = value.strip('"')
+    if not boundary:
+        raise ValueError("Multipart body without boundary")
+    
+    delimiter = b'--' + boundary.encode()
+    fields = {}
+    pos = data.find(delimiter)
+    while pos != -1:
+        start = pos + len(delimiter)
+        if data[start:start + 2] == b'--':
+            break
+        header_end = data.find(b'\r\n\r\n', start)
+        end = data.find(delimiter, start)
+        if header_end == -1 or end == -1:
+            break
+        
+        name = None
+        for line in data[start:header_end].split(b'\r\n'):
+            if line.lower().startswith(b'content-disposition:'):
+                for item in line.split(b';')[1:]:
+                    key, _, value = item.strip().partition(b'=')
+                    if key == b'name':
+                        name = value.strip(b'"').decode()
+        if name:
+            # Part content ends with CRLF before the next delimiter
+            fields[name] = data[header_end + 4:end - 2]
+        pos = end
+    return fields
 
 
 def clean_and_decode_image(img_b64):
-    """Clean and decode base64 image data"""
-    if 'base64,' in img_b64:
-        img_b64 = img_b64.split('base64,')[1]
+    """Decode base64 or data-URL image data in one pass, checking magic bytes first"""
+    if not isinstance(img_b64, str):
+        raise ValueError(f"expected a base64 string, got {type(img_b64).__name__}")
+    start = img_b64.find('base64,', 0, 64)
+    start = start + 7 if start != -1 else 0
+    while start < len(img_b64) and img_b64[start] in ' \r\n\t':
+        start += 1
     
-    img_b64 = img_b64.strip().replace('\n', '').replace('\r', '').replace(' ', '')
-    img_bytes = base64.b64decode(img_b64)
+    # The first 8 base64 characters decode to the first 6 bytes of the file
+    try:
+        head = binascii.a2b_base64(img_b64[start:start + 8])
+    except binascii.Error:
+        head = b''
+    check_magic(head)
     
+    # a2b_base64 skips newlines and spaces itself, so no cleanup copies are needed
+    return validate_image(binascii.a2b_base64(memoryview(img_b64.encode('ascii'))[start:]))
+
+
+def check_magic(head):
+    """Reject anything that does not start like a JPEG or PNG"""
+    if not (head[:2] == b'\xff\xd8' or head[:4] == b'\x89PNG'):
+        raise ValueError("Image data doesn't appear to be valid JPEG or PNG")
+
+
+def validate_image(img_bytes):
+    """Sanity-check decoded image bytes"""
     if len(img_bytes) < 100:
         raise ValueError(f"Image data too small: {len(img_bytes)} bytes")
-    
-    if not (img_bytes[:2] == b'\xff\xd8' or img_bytes[:4] == b'\x89PNG'):
-        raise ValueError("Image data doesn't appear to be valid JPEG or PNG")
-    
+    check_magic(img_bytes[:4])
     return img_bytes
 
 
-def has_scene_changed(current_labels):
-    """Detect if scene has significantly changed"""
-    global last_scene_labels
+def timed_call(fn, **kwargs):
+    """Call fn and return (result, elapsed_ms); exceptions carry the elapsed time"""
+    start = time.perf_counter()
+    try:
+        return fn(**kwargs), (time.perf_counter() - start) * 1000
+    except Exception as e:
+        e.elapsed_ms = (time.perf_counter() - start) * 1000
+        raise
+
+
+def cached_rekognition_call(operation, img_bytes, image_digest, **params):
+    """Call a Rekognition operation through the result cache; returns (result, cache_hit)"""
+    key = detection_cache.make_key(operation, image_digest, params)
+    result = rekognition_cache.get(key)
+    if result is not None:
+        return result, True
     
-    if not last_scene_labels:
-        return True
+    result = getattr(rekognition, operation)(Image={'Bytes': img_bytes}, **params)
+    result = {k: v for k, v in result.items() if k != 'ResponseMetadata'}
+    rekognition_cache.put(key, result)
+    return result, False
+
+
+def run_rekognition(img_bytes, mode="narration"):
+    """Fan detect_labels and detect_text out in parallel on the same image"""
+    start = time.perf_counter()
+    config = REKOGNITION_MODES[mode]
+    image_digest = detection_cache.digest(img_bytes)
+    label_future = rekognition_pool.submit(
+        timed_call, cached_rekognition_call,
+        operation='detect_labels', img_bytes=img_bytes, image_digest=image_digest,
+        Features=['GENERAL_LABELS'], **config["labels"]
+    )
+    text_future = None
+    if config["text"]:
+        text_future = rekognition_pool.submit(
+            timed_call, cached_rekognition_call,
+            operation='detect_text', img_bytes=img_bytes, image_digest=image_digest
+        )
     
-    current_set = set(current_labels)
-    last_set = set(last_scene_labels)
-    added = current_set - last_set
-    removed = last_set - current_set
-    change_count = len(added) + len(removed)
-    total = max(len(current_set), len(last_set), 1)
-    change_percentage = (change_count / total) * 100
+    # Label detection is required; let the error propagate to the handler
+    (labels, labels_hit), labels_ms = label_future.result()
+    timings = {"detectLabelsMs": round(labels_ms, 1), "detectLabelsCached": labels_hit}
     
-    print(f"Scene change: {change_percentage:.1f}% (added: {added}, removed: {removed})")
-    return change_percentage > 30
+    # Text detection is best-effort; a failure here must not sink the frame
+    text = {'TextDetections': []}
+    if text_future is not None:
+        text_hit = False
+        try:
+            (text, text_hit), text_ms = text_future.result()
+        except Exception as e:
+            text_ms = getattr(e, 'elapsed_ms', 0)
+            print(f"Rekognition detect_text warning (non-fatal): {e}")
+        timings["detectTextMs"] = round(text_ms, 1)
+        timings["detectTextCached"] = text_hit
+    timings["rekognitionMs"] = round((time.perf_counter() - start) * 1000, 1)
+    
+    print(f"Rekognition timings: {timings}")
+    return labels, text, timings
+
+
+def cached_detection(state, mode="narration"):
+    """The session's last detection result, if still fresh enough to reuse"""
+    detection = state.get("detection")
+    if not detection or DEDUP_HAMMING_THRESHOLD <= 0:
+        return None
+    if time.time() - detection["at"] > DEDUP_MAX_AGE_S:
+        return None
+    if not mode_covers(detection.get("mode", "narration"), mode):
+        return None
+    return detection
+
 
+def mode_covers(have, want):
+    """Whether a detection made for mode `have` has everything mode `want` asks for"""
+    have, want = REKOGNITION_MODES[have], REKOGNITION_MODES[want]
+    return (have["labels"]["MaxLabels"] >= want["labels"]["MaxLabels"]
+            and have["labels"]["MinConfidence"] <= want["labels"]["MinConfidence"]
+            and (have["text"] or not want["text"]))
 
-def handle_maps(lat, lng, dest_lat, dest_lng, dest_addr, find_nearby, get_route, navigation_mode, alert_level):
+
+def duplicate_distance(frame_hash, ref_hash):
+    """Hamming distance when frame_hash is a near-duplicate of ref_hash, else None"""
+    if frame_hash is None or ref_hash is None or DEDUP_HAMMING_THRESHOLD <= 0:
+        return None
+    distance = imaging.hamming(frame_hash, ref_hash)
+    return distance if distance < DEDUP_HAMMING_THRESHOLD else None
+
+
+def handle_maps(lat, lng, dest_lat, dest_lng, dest_addr, find_nearby, get_route, navigation_mode, alert_level,
+                state=None):
     """Handle all maps-related operations"""
     m = {"location": {"latitude": lat, "longitude": lng}}
+    deadline = time.monotonic() + MAPS_DEADLINE_S
+    
+    if not maps.available:
+        m["error"] = "requests library not available"
+        return m
     
     try:
-        import requests
+        # Everything that only needs the user's position starts at once
+        jobs = {"address": maps_pool.submit(reverse_geocode, lat, lng)}
+        geocoding = bool(dest_addr and not (dest_lat and dest_lng))
+        if geocoding:
+            jobs["destination"] = maps_pool.submit(geocode, dest_addr)
+        if find_nearby or alert_level != 'none':
+            for key, kind, radius in NEARBY_SEARCHES:
+                jobs[key] = maps_pool.submit(nearby, lat, lng, kind, radius=radius)
         
-        # Reverse geocode current location
-        try:
-            addr = reverse_geocode(lat, lng, requests)
-            if addr:
-                m["location"]["address"] = addr
-        except Exception as e:
-            print(f"Reverse geocode error: {e}")
+        # Dependent calls start the moment their input arrives
+        if (get_route or navigation_mode) and (geocoding or (dest_lat and dest_lng)):
+            stored = (state or {}).get("route")
+            if geocoding:
+                jobs["route"] = then(jobs["destination"],
+                                     lambda geo: geo and plan_route(lat, lng, geo[0], geo[1], stored))
+            else:
+                jobs["route"] = maps_pool.submit(plan_route, lat, lng, dest_lat, dest_lng, stored)
+        sent = state.setdefault("routesSent", {}) if state is not None else {}
+        if alert_level == "warning" and "hospitals" in jobs:
+            known = (state or {}).get("emergencyRoute")
+            known = known if known and known["id"] in sent else None
+            jobs["emergency_route"] = then(jobs["hospitals"], lambda hospitals: hospitals and emergency_route(
+                lat, lng, hospitals[0], known
+            ))
         
-        # Geocode destination if address provided
-        if dest_addr and not (dest_lat and dest_lng):
-            try:
-                geo = geocode(dest_addr, requests)
-                if geo:
-                    dest_lat, dest_lng = geo
-                    m["destination"] = {
-                        "latitude": dest_lat,
-                        "longitude": dest_lng,
-                        "address": dest_addr
-                    }
-            except Exception as e:
-                print(f"Geocode error: {e}")
+        results, late = gather_until(jobs, deadline)
+        if late:
+            print(f"Maps calls past the {MAPS_DEADLINE_S:.1f}s deadline: {', '.join(late)}")
+            m["timedOut"] = late
         
-        # Find nearby places
-        if find_nearby or alert_level != 'none':
-            try:
-                nearby_data = {}
-                
-                hospitals = nearby(lat, lng, "hospital", requests, radius=3000)
-                if hospitals:
-                    nearby_data["hospitals"] = hospitals[:3]
-                
-                police = nearby(lat, lng, "police", requests, radius=3000)
-                if police:
-                    nearby_data["police_stations"] = police[:3]
-                
-                transit = nearby(lat, lng, "transit_station", requests, radius=1000)
-                if transit:
-                    nearby_data["transit_stations"] = transit[:3]
-                
-                if nearby_data:
-                    m["nearby"] = nearby_data
-                    
-            except Exception as e:
-                print(f"Nearby search error: {e}")
+        if results.get("address"):
+            m["location"]["address"] = results["address"]
         
-        # Get route directions
-        if (get_route or navigation_mode) and dest_lat and dest_lng:
-            try:
-                route = directions(lat, lng, dest_lat, dest_lng, requests)
-                if route:
-                    m["route"] = route
-                    
-                    # Add next step guidance for navigation mode
-                    if navigation_mode and route.get("steps"):
-                        next_step = route["steps"][0]
-                        m["navigation"] = {
-                            "next_instruction": next_step["instruction"],
-                            "distance_to_next": next_step["distance"],
-                            "total_remaining": route["total_distance"],
-                            "eta": route["total_duration"]
-                        }
-                        
-            except Exception as e:
-                print(f"Directions error: {e}")
+        if results.get("destination"):
+            dest_lat, dest_lng = results["destination"]
+            m["destination"] = {
+                "latitude": dest_lat,
+                "longitude": dest_lng,
+                "address": dest_addr
+            }
+        
+        nearby_data = {key: results[key][:3] for key, _, _ in NEARBY_SEARCHES if results.get(key)}
+        if nearby_data:
+            m["nearby"] = nearby_data
+        
+        if results.get("route"):
+            route, progress, stored = results["route"]
+            m["route"] = route_session.payload(route, sent, (progress or {}).get("step_index"))
+            if state is not None:
+                state["route"] = stored
+            
+            # Add next step guidance for navigation mode
+            if navigation_mode and route.get("steps"):
+                m["navigation"] = navigation_guidance(route, progress)
         
         # Emergency route for warnings
-        if alert_level == "warning" and m.get("nearby", {}).get("hospitals"):
-            try:
-                h = m["nearby"]["hospitals"][0]
-                r = directions(lat, lng, h["location"]["lat"], h["location"]["lng"], requests)
-                if r:
-                    m["emergency_route"] = {
-                        "destination": h["name"],
-                        "address": h["address"],
-                        "distance": h["distance"],
-                        "directions": r
-                    }
-            except Exception as e:
-                print(f"Emergency route error: {e}")
+        if results.get("emergency_route"):
+            h = results["hospitals"][0]
+            route = results["emergency_route"]
+            m["emergency_route"] = {
+                "destination": h["name"],
+                "address": h["address"],
+                "distance": h["distance"],
+                "directions": route_session.payload(route, sent)
+            }
+            if state is not None and "steps" in route:
+                state["emergencyRoute"] = {
+                    "id": route["id"],
+                    "to": [h["location"]["lat"], h["location"]["lng"]],
+                    "polyline": route["polyline"],
+                    "fetchedAt": time.time()
+                }
         
         # Static map URL
         try:
@@ -320,8 +978,6 @@ def handle_maps(lat, lng, dest_lat, dest_lng, dest_addr, find_nearby, get_route,
         except Exception as e:
             print(f"Static map error: {e}")
             
-    except ImportError:
-        m["error"] = "requests library not available"
     except Exception as e:
         m["error"] = str(e)
         print(f"Maps handler error: {e}")
@@ -329,110 +985,214 @@ def handle_maps(lat, lng, dest_lat, dest_lng, dest_addr, find_nearby, get_route,
     return m
 
 
-def geocode(addr, requests):
+def then(future, fn):
+    """Future for fn(future's result), submitted to maps_pool as soon as future finishes"""
+    out = Future()
+    
+    def relay(inner):
+        if inner.exception() is not None:
+            out.set_exception(inner.exception())
+        else:
+            out.set_result(inner.result())
+    
+    def start(done):
+        # A cancelled upstream call, or a caller that gave up, ends the chain
+        if done.cancelled() or not out.set_running_or_notify_cancel():
+            return
+        if done.exception() is not None:
+            out.set_exception(done.exception())
+        else:
+            maps_pool.submit(fn, done.result()).add_done_callback(relay)
+    
+    future.add_done_callback(start)
+    return out
+
+
+def gather_until(jobs, deadline):
+    """({name: result} for jobs finished by deadline, [names still running])"""
+    done, _ = wait(list(jobs.values()), timeout=max(0.0, deadline - time.monotonic()))
+    results, late = {}, []
+    for name, future in jobs.items():
+        if future not in done:
+            future.cancel()  # only stops calls that never got a worker
+            late.append(name)
+        elif future.exception() is not None:
+            print(f"Maps {name} error: {future.exception()}")
+        else:
+            results[name] = future.result()
+    return results, late
+
+
+def geocode(addr):
     """Geocode an address to coordinates"""
-    try:
-        r = requests.get(
-            "https://maps.googleapis.com/maps/api/geocode/json",
-            params={"address": addr, "key": GOOGLE_MAPS_API_KEY},
-            timeout=5
-        )
-        if r.ok and r.json().get("results"):
-            loc = r.json()["results"][0]["geometry"]["location"]
-            return loc["lat"], loc["lng"]
-    except Exception as e:
-        print(f"Geocode request error: {e}")
+    cached = geocodes.get_forward(addr)
+    if cached:
+        return cached
+    data = maps.get("geocode/json", {"address": addr})
+    if data and data.get("results"):
+        loc = data["results"][0]["geometry"]["location"]
+        geocodes.put_forward(addr, (loc["lat"], loc["lng"]))
+        return loc["lat"], loc["lng"]
     return None
 
 
-def reverse_geocode(lat, lng, requests):
+def reverse_geocode(lat, lng):
     """Reverse geocode coordinates to address"""
-    try:
-        r = requests.get(
-            "https://maps.googleapis.com/maps/api/geocode/json",
-            params={"latlng": f"{lat},{lng}", "key": GOOGLE_MAPS_API_KEY},
-            timeout=5
-        )
-        if r.ok and r.json().get("results"):
-            return r.json()["results"][0]["formatted_address"]
-    except Exception as e:
-        print(f"Reverse geocode request error: {e}")
+    cached = geocodes.get_reverse(lat, lng)
+    if cached:
+        return cached
+    data = maps.get("geocode/json", {"latlng": f"{lat},{lng}"})
+    if data and data.get("results"):
+        address = data["results"][0]["formatted_address"]
+        geocodes.put_reverse(lat, lng, address)
+        return address
     return None
 
 
-def nearby(lat, lng, kind, requests, radius=2000):
+def nearby(lat, lng, kind, radius=2000):
     """Find nearby places"""
-    out = []
+    cached = pois.lookup(kind, lat, lng, radius)
+    if cached is not None:
+        return cached
+    
+    # Closest first, so everything up to the farthest result is known to the index
+    data = maps.get("place/nearbysearch/json", {
+        "location": f"{lat},{lng}",
+        "rankby": "distance",
+        "type": kind
+    })
+    places = []
     try:
-        r = requests.get(
-            "https://maps.googleapis.com/maps/api/place/nearbysearch/json",
-            params={
-                "location": f"{lat},{lng}",
-                "radius": radius,
-                "type": kind,
-                "key": GOOGLE_MAPS_API_KEY
-            },
-            timeout=5
-        )
-        if r.ok:
-            for p in r.json().get("results", [])[:5]:
-                loc = p["geometry"]["location"]
-                out.append({
-                    "name": p["name"],
-                    "address": p.get("vicinity"),
-                    "rating": p.get("rating"),
-                    "open_now": p.get("opening_hours", {}).get("open_now"),
-                    "location": loc,
-                    "distance": dist(lat, lng, loc["lat"], loc["lng"])
-                })
-            out.sort(key=lambda x: x["distance"])
-    except Exception as e:
-        print(f"Nearby search request error for {kind}: {e}")
-    return out
+        for p in (data or {}).get("results", []):
+            places.append({
+                "name": p["name"],
+                "address": p.get("vicinity"),
+                "rating": p.get("rating"),
+                "open_now": p.get("opening_hours", {}).get("open_now"),
+                "location": p["geometry"]["location"]
+            })
+    except (KeyError, TypeError) as e:
+        print(f"Nearby search parse error for {kind}: {e}")
+        return []
+    # Only a search Google actually ran says what is (or isn't) around
+    if data is not None and data.get("status") in maps_client.OK_API_STATUSES:
+        pois.add(kind, lat, lng, places)
+    return poi_index.rank(places, lat, lng, radius)
+
+
+def plan_route(lat, lng, dest_lat, dest_lng, stored):
+    """(route, progress, route state): the stored route when still on it, else fresh directions"""
+    now = time.time()
+    if route_tracker.usable(stored, (dest_lat, dest_lng), now):
+        stored = dict(stored)  # the handler may give up on this job; don't touch session state
+        progress = route_tracker.progress(stored, lat, lng, now)
+        if progress is not None:
+            return stored["summary"], dict(progress, source="local"), stored
+        print("Off route; fetching new directions")
+    
+    raw = fetch_directions(lat, lng, dest_lat, dest_lng)
+    route = summarize_route(raw)
+    if route is None:
+        return None
+    try:
+        stored = route_session.from_directions(raw, (dest_lat, dest_lng), now, (lat, lng))
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        print(f"Route geometry error: {e}")
+        return route, None, None
+    stored["summary"] = route
+    return route, dict(route_tracker.progress(stored, lat, lng, now) or {}, source="directions"), stored
+
+
+def navigation_guidance(route, progress):
+    """Next-instruction summary for navigation mode"""
+    steps = route["steps"]
+    if not progress or "step_index" not in progress:
+        # No usable geometry: fall back to the first step of the fresh route
+        return {
+            "next_instruction": steps[0]["instruction"],
+            "distance_to_next": steps[0]["distance"],
+            "total_remaining": route["total_distance"],
+            "eta": route["total_duration"]
+        }
+    i = min(progress["step_index"], len(steps) - 1)
+    upcoming = steps[i + 1]["instruction"] if i + 1 < len(steps) else "Arrive at your destination"
+    return dict(
+        progress,
+        current_instruction=steps[i]["instruction"],
+        next_instruction=upcoming
+    )
+
+
+def emergency_route(lat, lng, hospital, known):
+    """Directions to hospital, or just the id of the route already sent there while still on it"""
+    loc = hospital["location"]
+    fresh = known and time.time() - known["fetchedAt"] <= route_tracker.max_age_s
+    if fresh and known["to"] == [loc["lat"], loc["lng"]]:
+        path = geometry.decode_polyline(known["polyline"])
+        if geometry.project(path, float(lat), float(lng))[2] <= route_tracker.off_route_m + ROUTE_SIMPLIFY_M:
+            return {"id": known["id"]}
+    return directions(lat, lng, loc["lat"], loc["lng"])
 
 
-def directions(lat1, lng1, lat2, lng2, requests):
+def fetch_directions(lat1, lng1, lat2, lng2):
+    """First route of a walking Directions response, or None"""
+    data = maps.get("directions/json", {
+        "origin": f"{lat1},{lng1}",
+        "destination": f"{lat2},{lng2}",
+        "mode": "walking"
+    })
+    if not (data and data.get("routes")):
+        return None
+    return data["routes"][0]
+
+
+def directions(lat1, lng1, lat2, lng2):
     """Get walking directions"""
+    return summarize_route(fetch_directions(lat1, lng1, lat2, lng2))
+
+
+def summarize_route(route):
+    """Client-facing steps and totals of one Directions route"""
+    if route is None:
+        return None
     try:
-        r = requests.get(
-            "https://maps.googleapis.com/maps/api/directions/json",
-            params={
-                "origin": f"{lat1},{lng1}",
-                "destination": f"{lat2},{lng2}",
-                "mode": "walking",
-                "key": GOOGLE_MAPS_API_KEY
-            },
-            timeout=5
-        )
-        if r.ok and r.json().get("routes"):
-            leg = r.json()["routes"][0]["legs"][0]
-            steps = []
-            for s in leg["steps"]:
-                txt = s["html_instructions"].replace("<b>", "").replace("</b>", "")
-                txt = txt.replace('<div style="font-size:0.9em">', ' ').replace('</div>', '')
-                steps.append({
-                    "instruction": txt,
-                    "distance": s["distance"]["text"],
-                    "duration": s["duration"]["text"],
-                    "maneuver": s.get("maneuver", "straight")
-                })
-            return {
-                "total_distance": leg["distance"]["text"],
-                "total_duration": leg["duration"]["text"],
-                "steps": steps,
-                "start_address": leg.get("start_address"),
-                "end_address": leg.get("end_address"),
-                "polyline": r.json()["routes"][0]["overview_polyline"]["points"]
-            }
-    except Exception as e:
-        print(f"Directions request error: {e}")
+        leg = route["legs"][0]
+        steps = []
+        for s in leg["steps"]:
+            txt = s["html_instructions"].replace("<b>", "").replace("</b>", "")
+            txt = txt.replace('<div style="font-size:0.9em">', ' ').replace('</div>', '')
+            steps.append({
+                "instruction": txt,
+                "distance": s["distance"]["text"],
+                "duration": s["duration"]["text"],
+                "maneuver": s.get("maneuver", "straight")
+            })
+        summary = {
+            "total_distance": leg["distance"]["text"],
+            "total_duration": leg["duration"]["text"],
+            "steps": steps,
+            "start_address": leg.get("start_address"),
+            "end_address": leg.get("end_address"),
+            "polyline": simplified_polyline(route["overview_polyline"]["points"])
+        }
+        summary["id"] = route_session.route_id(summary)
+        return summary
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        print(f"Directions parse error: {e}")
     return None
 
 
+def simplified_polyline(points):
+    """Encoded polyline without the vertices within ROUTE_SIMPLIFY_M of the line"""
+    if ROUTE_SIMPLIFY_M <= 0:
+        return points
+    return geometry.encode_polyline(geometry.simplify(geometry.decode_polyline(points), ROUTE_SIMPLIFY_M))
+
+
 def static_map(lat, lng, dlat=None, dlng=None):
     """Generate static map URL"""
     url = (
-        f"https://maps.googleapis.com/maps/api/staticmap?"
+        f"{maps.base}/staticmap?"
         f"center={lat},{lng}&zoom=16&size=600x400&"
         f"markers=color:blue|label:U|{lat},{lng}"
     )
@@ -441,128 +1201,39 @@ def static_map(lat, lng, dlat=None, dlng=None):
             f"&markers=color:red|label:D|{dlat},{dlng}&"
             f"path=color:0x0000ff80|weight:5|{lat},{lng}|{dlat},{dlng}"
         )
-    url += f"&key={GOOGLE_MAPS_API_KEY}"
+    url += f"&key={maps.key}"
     return url
 
 
-def dist(a1, b1, a2, b2):
-    """Calculate distance between two coordinates in meters"""
-    R = 6371000
-    dlat = radians(a2 - a1)
-    dlng = radians(b2 - b1)
-    h = (sin(dlat / 2) ** 2 + 
-         cos(radians(a1)) * cos(radians(a2)) * sin(dlng / 2) ** 2)
-    return R * 2 * atan2(sqrt(h), sqrt(1 - h))
-
-
-def extract_boxes(res):
-    """Extract bounding boxes from Rekognition response"""
-    out = []
-    try:
-        for label in res.get("Labels", []):
-            for instance in label.get("Instances", []):
-                bb = instance.get("BoundingBox")
-                if bb:
-                    out.append({
-                        "label": label["Name"],
-                        "confidence": round(instance.get("Confidence", 0), 2),
-                        "box": bb
-                    })
-    except Exception as e:
-        print(f"Error extracting boxes: {e}")
-    return out
-
-
-def convert_boxes_to_obstacles(boxes):
-    """Convert bounding boxes to obstacle format with distance and position"""
-    obstacles = []
-
-    for box in boxes:
-        label = box.get("label", "").lower()
-
-        # Only include relevant obstacles
-        if label not in ["person", "people", "human", "car", "bicycle", "pole",
-                        "post", "tree", "bench", "dog", "cat", "vehicle"]:
+def detect_approach_alert(boxes, tracks):
+    """Warn about the soonest tracked person, car or bicycle heading for the user"""
+    soonest = None
+    for i, track in tracks.items():
+        if track["ttc"] is None or track["ttc"] > TTC_ALERT_S:
             continue
+        bb = boxes[i]["box"]
+        center_x = bb.get("Left", 0) + bb.get("Width", 0) / 2.0
+        if not 0.25 <= center_x <= 0.75:
+            continue  # on course to pass beside the user
+        if soonest is None or track["ttc"] < tracks[soonest]["ttc"]:
+            soonest = i
+    if soonest is None:
+        return dict(NO_ALERT)
 
-        bbox = box.get("box", {})
-
-        # Calculate position (0=left, 0.5=center, 1=right)
-        center_x = bbox.get("Left", 0) + (bbox.get("Width", 0) / 2.0)
-
-        # Estimate distance based on box height (rough approximation)
-        # Taller box = closer object
-        height = bbox.get("Height", 0)
-        if height > 0.5:
-            distance = 1.0  # Very close
-        elif height > 0.35:
-            distance = 2.0
-        elif height > 0.25:
-            distance = 3.0
-        elif height > 0.15:
-            distance = 5.0
-        else:
-            distance = 10.0  # Far away
-
-        # Normalize label
-        obstacle_type = "person" if label in ["person", "people", "human"] else label
-
-        obstacles.append({
-            "type": obstacle_type,
-            "distance": distance,
-            "position": round(center_x, 2),
-            "confidence": box.get("confidence", 0)
-        })
-
-    # Sort by distance (closest first)
-    obstacles.sort(key=lambda x: x["distance"])
-
-    return obstacles
-
-
-def detect_pedestrian_alert(boxes):
-    """Detect if pedestrian is in path"""
-    try:
-        people = [b for b in boxes
-                 if b["label"].lower() in ("person", "people", "human")]
-        if not people:
-            return {"level": "none", "message": "", "count": 0}
-
-        def score(p):
-            bx = p["box"]
-            center_x = bx["left"] + bx["width"] / 2.0
-            centered = 1.0 - abs(center_x - 0.5) * 2.0
-            size = bx["height"]
-            return (centered * 0.6) + (min(size, 1.0) * 0.4)
-
-        people_sorted = sorted(people, key=score, reverse=True)
-        nearest = people_sorted[0]
-        bx = nearest["box"]
-        center_x = bx["left"] + bx["width"] / 2.0
-        size_h = bx["height"]
-
-        is_centered = (0.35 <= center_x <= 0.65)
-        very_close = size_h >= 0.35
-        near = size_h >= 0.25
-
-        if is_centered and (very_close or near):
-            proximity = "very close" if very_close else "near"
-            msg = f"Warning: pedestrian {proximity} ahead."
-            return {
-                "level": "warning",
-                "message": msg,
-                "count": len(people),
-                "nearestBox": nearest
-            }
-
-    except Exception as e:
-        print(f"Error detecting pedestrian: {e}")
-
-    return {"level": "none", "message": "", "count": 0}
+    track = tracks[soonest]
+    kind = tracker.object_class(boxes[soonest]["label"])
+    seconds = max(1, round(track["ttc"]))
+    return {
+        "level": "warning",
+        "message": f"Warning: {kind} approaching, about {seconds} second{'s' if seconds != 1 else ''} away.",
+        "count": 1,
+        "trackId": track["trackId"],
+        "ttc": track["ttc"]
+    }
 
 
-def describe_scene(labels, text, img_b64):
-    """Generate full AI description of scene"""
+def scene_groups(labels):
+    """Split labels into people / environment / other objects"""
     people_objs = []
     env_objs = []
     item_objs = []
@@ -579,82 +1250,265 @@ def describe_scene(labels, text, img_b64):
         else:
             item_objs.append(f"{name} ({conf}%)")
     
+    return people_objs, env_objs, item_objs
+
+
+def scene_prompt(labels, text):
+    """Prompt asking Claude to describe the frame for a blind user"""
+    people_objs, env_objs, item_objs = scene_groups(labels)
+    
     text_items = [t.get('DetectedText', '') for t in text.get('TextDetections', [])
                   if t.get('Type') == 'LINE' and t.get('Confidence', 0) > 70]
     
-    prompt = f"""You assist a blind user. Describe only what is visible now, clearly and briefly (<=80 words).
+    return f"""You assist a blind user. Describe only what is visible now, clearly and briefly (<=80 words).
 Prioritize obstacles, people proximity, orientation cues, and readable text.
 People: {', '.join([o.split('(')[0].strip() for o in people_objs]) if people_objs else 'None'}
 Environment: {', '.join([o.split('(')[0].strip() for o in env_objs[:5]]) if env_objs else 'Unknown'}
 Objects: {', '.join([o.split('(')[0].strip() for o in item_objs[:6]]) if item_objs else 'None'}
 Text: {', '.join(text_items[:3]) if text_items else 'None'}
 Format 2–3 sentences. Use spatial terms (left, right, ahead, near)."""
+
+
+def rule_based_description(labels):
+    """Description built from labels alone, without Bedrock"""
+    people_objs, env_objs, item_objs = scene_groups(labels)
+    parts = []
+    if env_objs:
+        parts.append(f"Environment: {', '.join([o.split('(')[0].strip() for o in env_objs[:3]])}")
+    if people_objs:
+        parts.append(f"People: {', '.join([o.split('(')[0].strip() for o in people_objs[:2]])}")
+    if item_objs:
+        parts.append(f"Objects: {', '.join([o.split('(')[0].strip() for o in item_objs[:3]])}")
+    return ". ".join(parts) if parts else "Scene detected"
+
+
+def claude_body(prompt, img_b64=None, media_type="image/jpeg"):
+    """Bedrock messages payload with the prompt and, unless text-only, the frame"""
+    content = []
+    if img_b64 is not None:
+        content.append({
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": media_type,
+                "data": img_b64
+            }
+        })
+    content.append({"type": "text", "text": prompt})
+    return json.dumps({
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 300,
+        "messages": [{"role": "user", "content": content}]
+    })
+
+
+def invoke_claude(model_id, prompt, img_b64=None, media_type="image/jpeg"):
+    """Blocking Bedrock call; returns the full text"""
+    response = bedrock.invoke_model(modelId=model_id, body=claude_body(prompt, img_b64, media_type))
+    result = json.loads(response["body"].read())
+    record_usage(model_id, result.get("usage"))
+    return result["content"][0]["text"]
+
+
+def record_usage(model_id, usage):
+    """Accumulate Bedrock token counts per model"""
+    if not usage:
+        return
+    totals = token_usage.setdefault(model_id.split('.')[-1], {"input": 0, "output": 0, "calls": 0})
+    totals["input"] += usage.get("input_tokens", 0)
+    totals["output"] += usage.get("output_tokens", 0)
+    if "input_tokens" in usage:
+        totals["calls"] += 1
+
+
+def scene_hazard(result):
+    """Whether a frame without an alert still holds a hazard: an obstacle close ahead or one approaching"""
+    if hazards.obstacle_ahead(result["detections"], ROUTER_HAZARD_NEAR_M):
+        return True
+    return any(t["approaching"] for t in result.get("tracks", {}).values())
+
+
+def scene_complexity(labels, text, hazard=False):
+    """Rough score of how much a description has to convey"""
+    label_count = min(len(labels.get('Labels', [])), 15)
+    people = sum(len(l.get('Instances', [])) for l in labels.get('Labels', [])
+                 if l['Name'].lower() in ('person', 'people', 'human'))
+    text_lines = sum(1 for t in text.get('TextDetections', [])
+                     if t.get('Type') == 'LINE' and t.get('Confidence', 0) > 70)
+    score = label_count + 3 * min(people, 5) + 2 * min(text_lines, 3)
+    if hazard:
+        score += 5
+    return score
+
+
+def route_description(labels, text, hazard=False):
+    """Pick the cheapest description path that fits the scene: (path, score)"""
+    score = scene_complexity(labels, text, hazard)
+    if score <= ROUTER_RULES_MAX_SCORE:
+        return "rules", score
+    if score <= ROUTER_TEXT_MAX_SCORE and bedrock:
+        return "text", score
+    return "multimodal", score
+
+
+def scene_text_prompt(labels, text):
+    """Text-only prompt: the scene prompt plus where each detected object sits"""
+    positions = []
+    for label in labels.get('Labels', [])[:15]:
+        for instance in label.get('Instances', [])[:3]:
+            bb = instance.get('BoundingBox', {})
+            center_x = bb.get('Left', 0) + bb.get('Width', 0) / 2.0
+            side = "left" if center_x < 0.33 else "right" if center_x > 0.66 else "ahead"
+            size = "near" if bb.get('Height', 0) > 0.35 else "far"
+            positions.append(f"{label['Name']} {side}, {size}")
+    
+    prompt = scene_prompt(labels, text)
+    prompt += "\nYou cannot see the image; rely only on the detections above."
+    if positions:
+        prompt += f"\nPositions: {'; '.join(positions[:8])}"
+    return prompt
+
+
+def describe_scene_text(labels, text):
+    """Describe the scene with a text-only Haiku prompt (no image tokens)"""
+    try:
+        return model_breakers[HAIKU_MODEL_ID].call(
+            lambda: invoke_claude(HAIKU_MODEL_ID, scene_text_prompt(labels, text)))
+    except Exception as e:
+        print(f"Text-only Haiku description failed: {e}")
+        return rule_based_description(labels)
+
+
+def describe_scene(labels, text, img_b64, media_type="image/jpeg"):
+    """Generate full AI description of scene"""
+    prompt = scene_prompt(labels, text)
     
     if not bedrock:
-        parts = []
-        if env_objs:
-            parts.append(f"Environment: {', '.join([o.split('(')[0].strip() for o in env_objs[:3]])}")
-        if people_objs:
-            parts.append(f"People: {', '.join([o.split('(')[0].strip() for o in people_objs[:2]])}")
-        if item_objs:
-            parts.append(f"Objects: {', '.join([o.split('(')[0].strip() for o in item_objs[:3]])}")
-        return ". ".join(parts) if parts else "Scene detected"
+        return rule_based_description(labels)
+    
+    sig = description_cache.signature(labels, text)
+    cached = scene_descriptions.lookup(sig)
+    if cached:
+        print("Similar scene described recently - reusing description")
+        return cached
     
     try:
-        # Try Sonnet 4 first
-        response = bedrock.invoke_model(
-            modelId='anthropic.claude-sonnet-4-20250514',
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 300,
-                "messages": [{
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/jpeg",
-                                "data": img_b64
-                            }
-                        },
-                        {"type": "text", "text": prompt}
-                    ]
-                }]
-            })
+        description = invoke_with_fallback(prompt, img_b64, media_type)
+        scene_descriptions.store(sig, description)
+        return description
+    except Exception as e:
+        print(f"All Bedrock models failed: {e}")
+        return f"Objects detected: {', '.join([l['Name'] for l in labels.get('Labels', [])[:5]])}"
+
+
+def invoke_with_fallback(prompt, img_b64, media_type="image/jpeg"):
+    """Sonnet first and Haiku as fallback, honoring breakers and the hedge budget"""
+    def sonnet():
+        return model_breakers[SONNET_MODEL_ID].call(
+            lambda: invoke_claude(SONNET_MODEL_ID, prompt, img_b64, media_type))
+    
+    def haiku():
+        return model_breakers[HAIKU_MODEL_ID].call(
+            lambda: invoke_claude(HAIKU_MODEL_ID, prompt, img_b64, media_type))
+    
+    if BEDROCK_HEDGE_AFTER_MS > 0:
+        text, winner, hedged = resilience.hedged_call(
+            bedrock_pool, sonnet, haiku, BEDROCK_HEDGE_AFTER_MS / 1000
         )
-        result = json.loads(response["body"].read())
-        return result["content"][0]["text"]
-        
+        if hedged:
+            hedge_stats["hedged"] += 1
+            hedge_stats["primaryWins" if winner == "primary" else "backupWins"] += 1
+            print(f"Hedged Bedrock call won by {winner}")
+        return text
+    
+    try:
+        # Try Sonnet 4 first
+        return sonnet()
+    except resilience.CircuitOpenError:
+        print("Sonnet 4 circuit open - going straight to Haiku")
     except Exception as sonnet_error:
         print(f"Sonnet 4 failed, falling back to Haiku: {sonnet_error}")
+    return haiku()
+
+
+def stream_claude_sentences(model_id, prompt, img_b64, media_type="image/jpeg"):
+    """Yield complete sentences from a streaming Bedrock call as they arrive"""
+    response = bedrock.invoke_model_with_response_stream(
+        modelId=model_id, body=claude_body(prompt, img_b64, media_type)
+    )
+    pending = ""
+    for event in response["body"]:
+        chunk = event.get("chunk")
+        if not chunk:
+            continue
+        payload = json.loads(chunk["bytes"])
+        if payload.get("type") == "message_start":
+            record_usage(model_id, payload.get("message", {}).get("usage"))
+        elif payload.get("type") == "message_delta":
+            record_usage(model_id, payload.get("usage"))
+        if payload.get("type") != "content_block_delta":
+            continue
+        pending += payload.get("delta", {}).get("text", "")
+        
+        # Everything up to the last sentence break is ready to be spoken
+        parts = SENTENCE_END.split(pending)
+        for sentence in parts[:-1]:
+            if sentence.strip():
+                yield sentence.strip()
+        pending = parts[-1]
+    
+    if pending.strip():
+        yield pending.strip()
+
+
+def describe_scene_stream(labels, text, img_b64, media_type="image/jpeg"):
+    """Like describe_scene, but yields the description sentence by sentence"""
+    prompt = scene_prompt(labels, text)
+    
+    if not bedrock:
+        yield rule_based_description(labels)
+        return
+    
+    sig = description_cache.signature(labels, text)
+    cached = scene_descriptions.lookup(sig)
+    if cached:
+        print("Similar scene described recently - reusing description")
+        for sentence in SENTENCE_END.split(cached):
+            yield sentence
+        return
+    
+    for model_id, name in ((SONNET_MODEL_ID, "Sonnet 4"), (HAIKU_MODEL_ID, "Haiku")):
+        breaker = model_breakers[model_id]
+        if not breaker.allow():
+            print(f"{name} circuit open - skipping")
+            continue
+        
+        start = time.perf_counter()
+        sentences = []
+        recorded = False
         try:
-            response = bedrock.invoke_model(
-                modelId='anthropic.claude-3-haiku-20240307-v1:0',
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 300,
-                    "messages": [{
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": img_b64
-                                }
-                            },
-                            {"type": "text", "text": prompt}
-                        ]
-                    }]
-                })
-            )
-            result = json.loads(response["body"].read())
-            return result["content"][0]["text"]
-        except Exception as haiku_error:
-            print(f"All Bedrock models failed: {haiku_error}")
-            return f"Objects detected: {', '.join([l['Name'] for l in labels.get('Labels', [])[:5]])}"
+            for sentence in stream_claude_sentences(model_id, prompt, img_b64, media_type):
+                sentences.append(sentence)
+                yield sentence
+            recorded = True
+            breaker.record_success((time.perf_counter() - start) * 1000)
+            scene_descriptions.store(sig, " ".join(sentences))
+            return
+        except Exception as e:
+            recorded = True
+            breaker.record_failure()
+            # Once the user has heard part of a description, don't restart it
+            if sentences:
+                print(f"{name} stream broke off (keeping partial description): {e}")
+                return
+            print(f"{name} stream failed: {e}")
+        finally:
+            # Closed early by the consumer (GeneratorExit): no verdict on the model,
+            # but a half-open probe must not stay claimed
+            if not recorded:
+                breaker.release()
+    
+    yield f"Objects detected: {', '.join([l['Name'] for l in labels.get('Labels', [])[:5]])}"
 
 
 def describe_scene_brief(labels):
@@ -663,6 +1517,43 @@ def describe_scene_brief(labels):
     return f"Environment update: {', '.join(objs)}"
 
 
+def collect_stats():
+    """Counters from the per-container caches"""
+    return {
+        "rekognitionCache": rekognition_cache.summary(),
+        "sessions": dict(sessions.stats, active=len(sessions)),
+        "descriptionCache": scene_descriptions.summary(),
+        "qualityGate": quality_gate.summary(),
+        "maps": maps.summary(),
+        "geocodeCache": geocodes.summary(),
+        "poiIndex": pois.summary(),
+        "router": dict(router_stats, tokens=token_usage),
+        "bedrock": dict(
+            hedge_stats,
+            breakers={b.name: b.summary() for b in model_breakers.values()}
+        )
+    }
+
+
+def progressive_response(status_code, data):
+    """NDJSON body: one line per description sentence, then the full result
+
+    Buffered: the body is built once the description is complete, and the
+    Python runtime and API Gateway REST both return it in one piece, so
+    clients get every line at once. atMs says when each sentence reached
+    the Lambda, not the client.
+    """
+    lines = [
+        json.dumps({"type": "sentence", "index": i, "text": c["text"], "atMs": c["atMs"]})
+        for i, c in enumerate(data.get("aiDescriptionChunks", []))
+    ]
+    lines.append(json.dumps(dict(data, type="result")))
+    response = cors_response(status_code, {})
+    response["headers"]["Content-Type"] = "application/x-ndjson"
+    response["body"] = "\n".join(lines) + "\n"
+    return response
+
+
 def cors_response(status_code, body):
     """Generate CORS-enabled response"""
     return {
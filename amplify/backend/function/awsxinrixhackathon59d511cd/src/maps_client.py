@@ -0,0 +1,138 @@
+"""
+Google Maps HTTP client for the vision Lambda
+One pooled requests.Session per container, so warm invocations reuse open
+TCP/TLS connections instead of handshaking for every call. Throttling and
+5xx responses are retried a bounded number of times with jittered backoff,
+and each response body is parsed exactly once. Google reports quota and
+request errors in the body's status with HTTP 200; those count as failures.
+"""
+
+import os
+import random
+import threading
+import time
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+OK_API_STATUSES = frozenset(["OK", "ZERO_RESULTS"])
+RETRY_API_STATUSES = frozenset(["OVER_QUERY_LIMIT", "UNKNOWN_ERROR"])
+LATENCY_SAMPLES = 200
+
+
+class MapsClient:
+    """GET Maps endpoints as parsed JSON over a shared keep-alive connection pool"""
+
+    def __init__(self, key, base="https://maps.googleapis.com/maps/api", pool_size=8,
+                 connect_timeout=1.5, read_timeout=4.0, retries=2, backoff_s=0.2):
+        self.key = key
+        self.base = base.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries      # extra attempts after a 429/5xx or a connection error
+        self.backoff_s = backoff_s  # first retry waits about this long, doubling after
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0}
+        self.latencies = []
+        self.session = None
+        if requests is not None:
+            self.session = requests.Session()
+            # Every Maps worker thread gets its own kept-alive connection
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+    @property
+    def available(self):
+        return self.session is not None
+
+    def get(self, endpoint, params):
+        """Parsed JSON body of GET base/endpoint, or None if the call or the API request failed"""
+        if self.session is None:
+            raise RuntimeError("requests library not available")
+        url = f"{self.base}/{endpoint}"
+        params = dict(params, key=self.key)
+        start = time.perf_counter()
+        data = None
+        for attempt in range(self.retries + 1):
+            retry = attempt < self.retries
+            try:
+                r = self.session.get(url, params=params, timeout=self.timeout)
+                if r.status_code in RETRY_STATUSES and retry:
+                    self._backoff(attempt, r.headers.get("Retry-After"))
+                    continue
+                if not r.ok:
+                    print(f"Maps {endpoint} returned HTTP {r.status_code}")
+                    break
+                body = r.json()
+                if not isinstance(body, dict):
+                    print(f"Maps {endpoint} sent a {type(body).__name__} instead of a JSON object")
+                    break
+                status = body.get("status")
+                if status in RETRY_API_STATUSES and retry:
+                    self._backoff(attempt)
+                    continue
+                if status in OK_API_STATUSES:
+                    data = body
+                else:
+                    print(f"Maps {endpoint} returned status {status}: {body.get('error_message', '')}")
+                break
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not retry:
+                    print(f"Maps {endpoint} request error: {e}")
+                    break
+                self._backoff(attempt)
+            except ValueError as e:
+                print(f"Maps {endpoint} sent invalid JSON: {e}")
+                break
+
+        with self.lock:
+            self.stats["calls"] += 1
+            self.stats["failures"] += data is None
+            self.latencies.append((time.perf_counter() - start) * 1000)
+            del self.latencies[:-LATENCY_SAMPLES]
+        return data
+
+    def _backoff(self, attempt, retry_after=None):
+        with self.lock:
+            self.stats["retries"] += 1
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        delay = random.uniform(0, self.backoff_s * 2 ** attempt)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.timeout[1]))
+        time.sleep(delay)
+
+    def connections_opened(self):
+        """TCP connections opened to the Maps host so far (requests / this = reuse)"""
+        if self.session is None:
+            return 0
+        pools = self.session.get_adapter(self.base).poolmanager.pools
+        return sum(pools[k].num_connections for k in pools.keys())
+
+    def summary(self):
+        """Call counters, connections opened and latency percentiles"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = dict(self.stats)
+        return dict(
+            stats,
+            connectionsOpened=self.connections_opened(),
+            p50Ms=round(latencies[len(latencies) // 2], 1) if latencies else None,
+            p95Ms=round(latencies[int(len(latencies) * 0.95)], 1) if latencies else None
+        )
+
+
+def from_env():
+    """Build the client configured by GOOGLE_MAPS_API_KEY and MAPS_* environment variables"""
+    return MapsClient(
+        key=os.environ.get('GOOGLE_MAPS_API_KEY', ''),
+        base=os.environ.get('MAPS_API_BASE', 'https://maps.googleapis.com/maps/api'),
+        pool_size=int(os.environ.get('MAPS_WORKERS', '8')),
+        connect_timeout=float(os.environ.get('MAPS_CONNECT_TIMEOUT_S', '1.5')),
+        read_timeout=float(os.environ.get('MAPS_READ_TIMEOUT_S', '4')),
+        retries=int(os.environ.get('MAPS_RETRIES', '2')),
+        backoff_s=float(os.environ.get('MAPS_BACKOFF_S', '0.2'))
+    )
@@ -0,0 +1,142 @@
+"""
+Spatial index of places already fetched from Google Places
+Searches are ranked by distance, so each one yields a circle inside which
+every place of that category is known. The circles and places are kept per
+category, places on a geohash grid. A nearby query is answered locally when
+the disc holding its closest results lies inside a fresh searched circle;
+only positions outside every such circle go back to Google.
+"""
+
+import os
+import threading
+import time
+from math import cos, radians
+
+from geocode_cache import geohash
+from geometry import distance_m, haversine
+
+PAGE_SIZE = 20  # Places returns at most this many results per search
+MAX_SEARCH_M = 50000  # rankby=distance looks no further than this
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def cells_around(lat, lng, radius_m, precision):
+    """Geohash cells overlapping the bounding box of a circle"""
+    dlat = radius_m / 111320.0
+    dlng = radius_m / (111320.0 * max(cos(radians(lat)), 0.01))
+    step_lat, step_lng = cell_size(precision)
+    cells = set()
+    y = lat - dlat
+    while True:
+        x = lng - dlng
+        while True:
+            cells.add(geohash(min(y, lat + dlat), min(x, lng + dlng), precision))
+            if x >= lng + dlng:
+                break
+            x += step_lng
+        if y >= lat + dlat:
+            break
+        y += step_lat
+    return cells
+
+
+class PoiIndex:
+    """Per-category searched areas and places on a geohash grid"""
+
+    def __init__(self, ttl_s=900, precision=5, max_areas=64):
+        self.ttl_s = ttl_s          # places (and open_now) go stale after this; 0 disables the index
+        self.precision = precision  # grid cell size; 5 is about 4.9 x 4.9 km
+        self.max_areas = max_areas  # searched circles kept per category
+        self.areas = {}   # kind -> [(lat, lng, radius_m, fetched_at)], newest last
+        self.cells = {}   # (kind, cell) -> {place key: (place, fetched_at)}
+        self.lock = threading.Lock()
+        self.stats = {"localHits": 0, "fetches": 0}
+
+    def lookup(self, kind, lat, lng, radius, limit=5):
+        """Closest cached places within radius, or None when the circle isn't covered"""
+        if self.ttl_s <= 0:
+            return None
+        now = time.time()
+        with self.lock:
+            areas = [a for a in self.areas.get(kind, []) if now - a[3] <= self.ttl_s]
+            self.areas[kind] = areas
+            if not areas:
+                return None
+            places = []
+            for cell in cells_around(lat, lng, radius, self.precision):
+                for place, fetched_at in self.cells.get((kind, cell), {}).values():
+                    if now - fetched_at <= self.ttl_s:
+                        places.append(place)
+            ranked = rank(places, lat, lng, radius, limit)
+            # Only the disc out to the last answer has to be complete
+            needed = ranked[-1]["distance"] if len(ranked) == limit else radius
+            if not any(distance_m(lat, lng, a[0], a[1]) + needed <= a[2] for a in areas):
+                return None
+            self.stats["localHits"] += 1
+        return ranked
+
+    def add(self, kind, lat, lng, places):
+        """Record one distance-ranked search from (lat, lng) and every place it returned"""
+        if self.ttl_s <= 0:
+            return
+        now = time.time()
+        # A full page ends at its farthest result; a short one found everything in range
+        covered = MAX_SEARCH_M
+        if len(places) >= PAGE_SIZE:
+            covered = float(distances(places, lat, lng).max())
+        with self.lock:
+            self.stats["fetches"] += 1
+            areas = self.areas.setdefault(kind, [])
+            areas.append((lat, lng, covered, now))
+            del areas[:-self.max_areas]
+            if self.stats["fetches"] % 50 == 0:
+                self._prune(now)
+            for place in places:
+                loc = place["location"]
+                cell = self.cells.setdefault((kind, geohash(loc["lat"], loc["lng"], self.precision)), {})
+                cell[(place["name"], loc["lat"], loc["lng"])] = (place, now)
+
+    def _prune(self, now):
+        for key in list(self.cells):
+            fresh = {k: v for k, v in self.cells[key].items() if now - v[1] <= self.ttl_s}
+            if fresh:
+                self.cells[key] = fresh
+            else:
+                del self.cells[key]
+
+    def summary(self):
+        with self.lock:
+            lookups = self.stats["localHits"] + self.stats["fetches"]
+            return dict(
+                self.stats,
+                localHitRate=round(self.stats["localHits"] / lookups, 3) if lookups else 0.0,
+                areas=sum(len(a) for a in self.areas.values()),
+                places=sum(len(c) for c in self.cells.values())
+            )
+
+
+def distances(places, lat, lng):
+    """Metres from (lat, lng) to each place, as one array"""
+    return haversine(lat, lng, [p["location"]["lat"] for p in places], [p["location"]["lng"] for p in places])
+
+
+def rank(places, lat, lng, radius, limit=5):
+    """Copies of the places within radius, closest first, with their distance"""
+    if not places:
+        return []
+    d = distances(places, lat, lng)
+    order = [i for i in d.argsort(kind="stable").tolist() if d[i] <= radius][:limit]
+    return [dict(places[i], distance=float(d[i])) for i in order]
+
+
+def from_env():
+    """Build the index configured by POI_* environment variables"""
+    return PoiIndex(
+        ttl_s=float(os.environ.get('POI_CACHE_TTL_S', '900')),
+        precision=int(os.environ.get('POI_GRID_PRECISION', '5'))
+    )
@@ -0,0 +1,131 @@
+"""
+Failure handling for calls to remote models
+A per-model circuit breaker that stops sending traffic to a model that
+keeps failing, and hedged calls that race a backup once the primary is slow.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose breaker is open"""
+
+
+class CircuitBreaker:
+    """Opens after too many recent failures, probes again after a cool-down"""
+
+    def __init__(self, name, failure_threshold=3, window=10, reset_timeout_s=30, slow_call_ms=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        # Calls slower than this count against the model even though they answered
+        self.slow_call_ms = slow_call_ms
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.latencies_ms = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+        self.stats = {"opened": 0, "halfOpened": 0, "closed": 0, "shortCircuited": 0}
+
+    def allow(self):
+        """Whether a call may go to this model right now"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout_s:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                # Exactly one probe at a time decides whether the model recovered
+                self.probe_in_flight = True
+                return True
+            self.stats["shortCircuited"] += 1
+            return False
+
+    def call(self, fn):
+        """Run fn under this breaker, recording its outcome and latency"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success((time.perf_counter() - start) * 1000)
+        return result
+
+    def record_success(self, latency_ms):
+        if self.slow_call_ms and latency_ms > self.slow_call_ms:
+            print(f"Circuit breaker {self.name}: slow call ({latency_ms:.0f} ms)")
+            self.latencies_ms.append(latency_ms)
+            self.record_failure()
+            return
+        with self.lock:
+            self.outcomes.append(True)
+            self.latencies_ms.append(latency_ms)
+            if self.state == HALF_OPEN:
+                self.probe_in_flight = False
+                self.outcomes.clear()
+                self._transition(CLOSED)
+
+    def release(self):
+        """Give back a half-open probe that ended without an outcome (the caller stopped early)"""
+        with self.lock:
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.outcomes.append(False)
+            if self.state == HALF_OPEN:
+                self.probe_in_flight = False
+                self._open()
+            elif self.state == CLOSED and list(self.outcomes).count(False) >= self.failure_threshold:
+                self._open()
+
+    def summary(self):
+        with self.lock:
+            latencies = sorted(self.latencies_ms)
+            return dict(
+                self.stats,
+                state=self.state,
+                recentFailures=list(self.outcomes).count(False),
+                p50Ms=round(latencies[len(latencies) // 2], 1) if latencies else None
+            )
+
+    def _open(self):
+        self.opened_at = time.time()
+        self._transition(OPEN)
+
+    def _transition(self, state):
+        if state != self.state:
+            print(f"Circuit breaker {self.name}: {self.state} -> {state}")
+            self.state = state
+            self.stats[{OPEN: "opened", HALF_OPEN: "halfOpened", CLOSED: "closed"}[state]] += 1
+
+
+def hedged_call(pool, primary, backup, hedge_after_s):
+    """Race backup against primary once primary is slow; returns (result, winner, hedged)"""
+    first = pool.submit(primary)
+    done, _ = wait([first], timeout=hedge_after_s)
+    if done and first.exception() is None:
+        return first.result(), "primary", False
+
+    # Still running means a true hedge; already failed means plain fallback
+    hedged = not done
+    second = pool.submit(backup)
+    pending = {first: "primary", second: "backup"}
+    errors = []
+    while pending:
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for future in done:
+            winner = pending.pop(future)
+            if future.exception() is None:
+                return future.result(), winner, hedged
+            errors.append(future.exception())
+    raise errors[-1]
@@ -0,0 +1,166 @@
+"""
+Per-session walking route for navigation mode
+Keeps the step geometry of the last Directions response in the session, so
+each GPS fix is snapped to the route locally: the current step, distance to
+the next maneuver, remaining distance and ETA all come from the stored
+polyline. New directions are only needed when the user leaves the route,
+changes destination or the route gets old. Clients get each route in full
+once per session; later frames carry only its id and the step index.
+"""
+
+import hashlib
+import json
+import os
+
+import geometry
+
+SENT_ROUTES = 4  # route ids remembered per session as already delivered
+
+
+def format_distance(m):
+    return f"{m / 1000:.1f} km" if m >= 1000 else f"{int(round(m, -1))} m"
+
+
+def format_duration(s):
+    mins = max(1, int(round(s / 60)))
+    return "1 min" if mins == 1 else f"{mins} mins"
+
+
+def route_id(summary):
+    """Short id that changes whenever a summarized route's content does"""
+    content = json.dumps(summary, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(content.encode()).hexdigest()[:12]
+
+
+def payload(route, sent, step_index=None):
+    """route in full the first time this session gets it, then its id and any new step index"""
+    rid = route["id"]
+    if rid not in sent:
+        sent[rid] = step_index
+        for old in list(sent)[:-SENT_ROUTES]:
+            del sent[old]
+        return route
+    out = {"id": rid}
+    if step_index is not None and step_index != sent[rid]:
+        out["step_index"] = step_index
+        sent[rid] = step_index
+    return out
+
+
+def from_directions(route, destination, now, origin=None):
+    """JSON-serializable route state from one Directions API route"""
+    points, steps = [], []
+    for step in route["legs"][0]["steps"]:
+        pts = geometry.decode_polyline(step["polyline"]["points"]).round(6).tolist()
+        if points and pts and pts[0] == points[-1]:
+            pts = pts[1:]
+        points += pts
+        steps.append({"end": max(len(points) - 1, 0), "maneuver": step.get("maneuver", "straight")})
+
+    cum = geometry.cumulative_distance(points).round(1).tolist()
+    for step in steps:
+        step["end"] = cum[step["end"]]
+
+    leg = route["legs"][0]
+    total_m = cum[-1] or 1.0
+    return {
+        "destination": [float(destination[0]), float(destination[1])],
+        "origin": [float(origin[0]), float(origin[1])] if origin else None,
+        "points": points,
+        "cum": cum,
+        "steps": steps,
+        "paceSPerM": leg["duration"]["value"] / total_m if "value" in leg["duration"] else 0.8,
+        "fetchedAt": now,
+        "segment": 0,
+        "offRoute": 0
+    }
+
+
+class RouteTracker:
+    """Snaps fixes to a stored route and reports progress along it"""
+
+    def __init__(self, off_route_m=35.0, off_route_fixes=2, max_age_s=900.0, arrival_m=15.0,
+                 same_destination_m=25.0, window=60, reroute_min_m=35.0, reroute_min_s=10.0):
+        self.off_route_m = off_route_m            # farther than this from the route counts as off it
+        self.off_route_fixes = off_route_fixes    # consecutive off-route fixes before re-routing
+        self.reroute_min_m = reroute_min_m        # ...once the user is this far from where it was fetched
+        self.reroute_min_s = reroute_min_s        # ...and it is at least this old
+        self.max_age_s = max_age_s                # directions older than this are fetched again
+        self.arrival_m = arrival_m
+        self.same_destination_m = same_destination_m
+        self.window = window                      # segments searched ahead of the last snap
+
+    def usable(self, route, destination, now):
+        """Whether route can still serve this destination"""
+        if not route or now - route.get("fetchedAt", 0) > self.max_age_s:
+            return False
+        moved = geometry.distance_m(float(destination[0]), float(destination[1]), *route["destination"])
+        return moved <= self.same_destination_m
+
+    def snap(self, route, lat, lng):
+        """(segment index, metres along the route, metres off it) for the closest point"""
+        points = route["points"]
+        if len(points) < 2:
+            return 0, 0.0, 0.0
+        last = route.get("segment", 0)
+        lo, hi = max(0, last - 5), min(len(points) - 1, last + self.window)
+        segment, along, off = geometry.project(points[lo:hi + 1], lat, lng, route["cum"][lo:hi + 1])
+        best = (lo + segment, along, off)
+        if off > self.off_route_m and (lo > 0 or hi < len(points) - 1):
+            best = min(best, geometry.project(points, lat, lng, route["cum"]), key=lambda b: b[2])
+        return best
+
+    def settled(self, route, lat, lng, now):
+        """Whether the user has moved and waited enough since route was fetched to re-route"""
+        if now - route.get("fetchedAt", 0) < self.reroute_min_s:
+            return False
+        origin = route.get("origin")
+        return not origin or geometry.distance_m(lat, lng, origin[0], origin[1]) >= self.reroute_min_m
+
+    def progress(self, route, lat, lng, now):
+        """Navigation summary for a fix, or None when new directions are needed; updates route"""
+        lat, lng = float(lat), float(lng)
+        segment, along, off = self.snap(route, lat, lng)
+        if off > self.off_route_m:
+            # Directions may start well away from the fix they were fetched for (a
+            # building, a park, GPS error between tall buildings); that alone isn't straying
+            if self.settled(route, lat, lng, now):
+                route["offRoute"] = route.get("offRoute", 0) + 1
+                if route["offRoute"] >= self.off_route_fixes:
+                    return None
+            # A stray fix: keep the last position on the route rather than re-route
+            segment = route.get("segment", 0)
+            along = route["cum"][segment]
+        else:
+            route["offRoute"] = 0
+            route["segment"] = segment
+
+        steps = route["steps"]
+        current = next((i for i, s in enumerate(steps) if s["end"] > along), len(steps) - 1)
+        remaining = max(0.0, route["cum"][-1] - along)
+        to_next = max(0.0, steps[current]["end"] - along)
+        eta = remaining * route["paceSPerM"]
+        return {
+            "step_index": current,
+            "distance_to_next_m": round(to_next),
+            "distance_to_next": format_distance(to_next),
+            "remaining_m": round(remaining),
+            "total_remaining": format_distance(remaining),
+            "eta_s": round(eta),
+            "eta": format_duration(eta),
+            "off_route": off > self.off_route_m,
+            "off_route_m": round(off, 1),
+            "arrived": remaining <= self.arrival_m
+        }
+
+
+def from_env():
+    """Build the tracker configured by NAV_* environment variables"""
+    return RouteTracker(
+        off_route_m=float(os.environ.get('NAV_OFF_ROUTE_M', '35')),
+        off_route_fixes=int(os.environ.get('NAV_OFF_ROUTE_FIXES', '2')),
+        max_age_s=float(os.environ.get('NAV_ROUTE_TTL_S', '900')),
+        arrival_m=float(os.environ.get('NAV_ARRIVAL_M', '15')),
+        reroute_min_m=float(os.environ.get('NAV_REROUTE_MIN_M', '35')),
+        reroute_min_s=float(os.environ.get('NAV_REROUTE_MIN_S', '10'))
+    )
@@ -0,0 +1,117 @@
+"""
+Scene-change detection for the vision Lambda
+Each session keeps an exponential moving average of label confidences and
+object positions. A frame scores how far it is from that baseline, and a
+change is only reported once the score stays high for several frames, so
+Rekognition's frame-to-frame ranking jitter doesn't trigger new descriptions.
+"""
+
+import os
+
+TOP_LABELS = 20
+GRID = 3  # object positions are compared on a GRID x GRID grid
+MIN_WEIGHT = 0.05  # labels whose average confidence decays below this are dropped
+
+
+def observe(labels):
+    """({label: confidence 0-1}, {label: [cx, cy] of its largest instance}) for a frame"""
+    confidences, centers = {}, {}
+    for label in labels.get('Labels', [])[:TOP_LABELS]:
+        name = label['Name']
+        confidences[name] = label.get('Confidence', 0) / 100
+        boxes = [i['BoundingBox'] for i in label.get('Instances', []) if i.get('BoundingBox')]
+        if boxes:
+            bb = max(boxes, key=lambda b: b.get('Width', 0) * b.get('Height', 0))
+            centers[name] = [bb.get('Left', 0) + bb.get('Width', 0) / 2,
+                             bb.get('Top', 0) + bb.get('Height', 0) / 2]
+    return confidences, centers
+
+
+def label_distance(current, baseline):
+    """Weighted Jaccard distance between two confidence maps, 0 (same) to 1"""
+    names = set(current) | set(baseline)
+    total = sum(max(current.get(n, 0), baseline.get(n, 0)) for n in names)
+    if not total:
+        return 0.0
+    return sum(abs(current.get(n, 0) - baseline.get(n, 0)) for n in names) / total
+
+
+def cell(center):
+    return tuple(min(int(v * GRID), GRID - 1) for v in center)
+
+
+def position_distance(current, baseline):
+    """Share of objects seen in both that moved to a different grid cell"""
+    common = set(current) & set(baseline)
+    if not common:
+        return 0.0
+    return sum(cell(current[n]) != cell(baseline[n]) for n in common) / len(common)
+
+
+def blend(current, baseline, alpha):
+    """EMA step over maps of floats or [x, y] pairs; missing entries count as 0"""
+    out = {}
+    for name in set(current) | set(baseline):
+        new, old = current.get(name), baseline.get(name)
+        if isinstance(new or old, list):
+            if new is None or old is None:
+                out[name] = new or old
+            else:
+                out[name] = [round(alpha * a + (1 - alpha) * b, 3) for a, b in zip(new, old)]
+        else:
+            value = alpha * (new or 0) + (1 - alpha) * (old or 0)
+            if value >= MIN_WEIGHT:
+                out[name] = round(value, 3)
+    return out
+
+
+class SceneChangeDetector:
+    """Smoothed, hysteretic scene-change scoring over a JSON-serializable state dict"""
+
+    def __init__(self, alpha=0.2, enter=0.35, exit=0.2, persist_frames=2, position_weight=0.25):
+        self.alpha = alpha                      # EMA weight of the newest frame
+        self.enter = enter                      # score that starts counting toward a change
+        self.exit = exit                        # score below which a pending change is dropped
+        self.persist_frames = persist_frames    # frames the score must stay high
+        self.position_weight = position_weight  # share of the score from object movement
+
+    def update(self, scene, labels):
+        """Fold one frame into scene (mutated in place); returns (score 0-1, changed)"""
+        confidences, centers = observe(labels)
+        if not scene.get("confidences"):
+            self._reset(scene, confidences, centers)
+            return 1.0, True
+
+        score = round((1 - self.position_weight) * label_distance(confidences, scene["confidences"])
+                      + self.position_weight * position_distance(centers, scene["centers"]), 3)
+        if score >= self.enter:
+            scene["pending"] = scene.get("pending", 0) + 1
+        elif score < self.exit:
+            scene["pending"] = 0
+
+        if scene.get("pending", 0) >= self.persist_frames:
+            self._reset(scene, confidences, centers)
+            return score, True
+
+        # Only frames that look like the current scene refine its baseline
+        if score < self.enter:
+            scene["confidences"] = blend(confidences, scene["confidences"], self.alpha)
+            scene["centers"] = {n: c for n, c in blend(centers, scene["centers"], self.alpha).items()
+                                if n in scene["confidences"]}
+        return score, False
+
+    def _reset(self, scene, confidences, centers):
+        scene["confidences"] = {n: round(c, 3) for n, c in confidences.items()}
+        scene["centers"] = {n: [round(v, 3) for v in c] for n, c in centers.items()}
+        scene["pending"] = 0
+
+
+def from_env():
+    """Build the detector configured by SCENE_* environment variables"""
+    return SceneChangeDetector(
+        alpha=float(os.environ.get('SCENE_EMA_ALPHA', '0.2')),
+        enter=float(os.environ.get('SCENE_CHANGE_ENTER', '0.35')),
+        exit=float(os.environ.get('SCENE_CHANGE_EXIT', '0.2')),
+        persist_frames=int(os.environ.get('SCENE_CHANGE_FRAMES', '2')),
+        position_weight=float(os.environ.get('SCENE_POSITION_WEIGHT', '0.25'))
+    )
@@ -0,0 +1,204 @@
+"""
+Per-session scene state for the vision Lambda
+Keeps each user's scene memory separate when several users share a warm
+container. Entries expire after a TTL and the least recently used sessions
+are evicted once the store grows past its memory (or entry count) cap.
+Backends keep running size and count totals, so a put only walks the LRU
+end when the store is over a cap or a periodic expiry sweep is due.
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+EVICT_BATCH = 64  # least recently used sessions examined per backend read
+
+
+class MemoryBackend:
+    """In-process backend; entries live as long as the container"""
+
+    def __init__(self):
+        self.entries = OrderedDict()  # session_id -> (state, size, touched)
+        self.size = 0
+
+    def get(self, session_id, now):
+        entry = self.entries.get(session_id)
+        if entry is None:
+            return None
+        state, size, touched = entry
+        self.entries[session_id] = (state, size, now)
+        self.entries.move_to_end(session_id)
+        return dict(state), touched
+
+    def set(self, session_id, state, size, now):
+        self.delete(session_id)
+        self.entries[session_id] = (dict(state), size, now)
+        self.size += size
+
+    def delete(self, session_id):
+        entry = self.entries.pop(session_id, None)
+        if entry:
+            self.size -= entry[1]
+
+    def oldest(self, limit):
+        """Up to limit (session_id, touched) pairs, least recently used first"""
+        return [(sid, entry[2]) for sid, entry in itertools.islice(self.entries.items(), limit)]
+
+    def total_size(self):
+        return self.size
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SqliteBackend:
+    """Local sqlite file backend; survives handler restarts within a container"""
+
+    def __init__(self, path, table="sessions"):
+        self.table = table
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " id TEXT PRIMARY KEY, state TEXT NOT NULL,"
+            " size INTEGER NOT NULL, touched REAL NOT NULL)"
+        )
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_touched ON {table}(touched)")
+        self.size, self.count = self.conn.execute(
+            f"SELECT COALESCE(SUM(size), 0), COUNT(*) FROM {table}"
+        ).fetchone()
+
+    def get(self, session_id, now):
+        row = self.conn.execute(
+            f"SELECT state, touched FROM {self.table} WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute(f"UPDATE {self.table} SET touched = ? WHERE id = ?", (now, session_id))
+        return json.loads(row[0]), row[1]
+
+    def set(self, session_id, state, size, now):
+        old = self._size_of(session_id)
+        self.size += size - (old or 0)
+        self.count += old is None
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (id, state, size, touched) VALUES (?, ?, ?, ?)",
+            (session_id, state_json(state), size, now)
+        )
+
+    def delete(self, session_id):
+        old = self._size_of(session_id)
+        if old is None:
+            return
+        self.size -= old
+        self.count -= 1
+        self.conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (session_id,))
+
+    def oldest(self, limit):
+        return self.conn.execute(
+            f"SELECT id, touched FROM {self.table} ORDER BY touched LIMIT ?", (limit,)
+        ).fetchall()
+
+    def total_size(self):
+        return self.size
+
+    def _size_of(self, session_id):
+        """Stored size of session_id, or None when it isn't stored"""
+        row = self.conn.execute(f"SELECT size FROM {self.table} WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def __len__(self):
+        return self.count
+
+
+def state_json(state):
+    return json.dumps(state, separators=(',', ':'), default=str)
+
+
+class SessionStore:
+    """Thread-safe LRU + TTL store of per-session state dicts"""
+
+    def __init__(self, backend, max_bytes=16 * 1024 * 1024, ttl_s=900, sweep_s=60, max_entries=None):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries  # None leaves the entry count unbounded
+        self.ttl_s = ttl_s
+        self.sweep_s = sweep_s  # expired sessions nobody reads again are dropped this often
+        self.next_sweep = time.time() + sweep_s
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def get(self, session_id):
+        """State for session_id, or an empty dict for new/expired sessions"""
+        now = time.time()
+        with self.lock:
+            entry = self.backend.get(session_id, now)
+            if entry is None:
+                self.stats["misses"] += 1
+                return {}
+            state, touched = entry
+            if now - touched > self.ttl_s:
+                self.backend.delete(session_id)
+                self.stats["expired"] += 1
+                return {}
+            self.stats["hits"] += 1
+            return state
+
+    def put(self, session_id, state):
+        """Save state for session_id and evict until the store fits its cap"""
+        size = len(state_json(state))
+        now = time.time()
+        with self.lock:
+            self.backend.set(session_id, state, size, now)
+            self._evict(now, keep=session_id)
+
+    def _over_cap(self):
+        if self.backend.total_size() > self.max_bytes:
+            return True
+        return self.max_entries is not None and len(self.backend) > self.max_entries
+
+    def _evict(self, now, keep):
+        over = self._over_cap()
+        if not over and now < self.next_sweep:
+            return
+        self.next_sweep = now + self.sweep_s
+        while True:
+            deleted = 0
+            for session_id, touched in self.backend.oldest(EVICT_BATCH):
+                expired = now - touched > self.ttl_s
+                if not expired and not over:
+                    return
+                if session_id == keep:
+                    continue
+                self.backend.delete(session_id)
+                self.stats["expired" if expired else "evicted"] += 1
+                over = self._over_cap()
+                deleted += 1
+            if not deleted:
+                return
+
+    def __len__(self):
+        with self.lock:
+            return len(self.backend)
+
+
+def from_env():
+    """Build the store configured by SESSION_* environment variables"""
+    kind = os.environ.get('SESSION_BACKEND', 'memory')
+    if kind == 'sqlite':
+        backend = SqliteBackend(os.environ.get('SESSION_DB_PATH', '/tmp/vision-sessions.db'))
+    elif kind == 'memory':
+        backend = MemoryBackend()
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {kind}")
+
+    return SessionStore(
+        backend,
+        max_bytes=int(os.environ.get('SESSION_MAX_BYTES', str(16 * 1024 * 1024))),
+        ttl_s=float(os.environ.get('SESSION_TTL_S', '900')),
+        sweep_s=float(os.environ.get('SESSION_SWEEP_S', '60'))
+    )
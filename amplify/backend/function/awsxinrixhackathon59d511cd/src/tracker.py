@@ -0,0 +1,122 @@
+"""
+Cross-frame object tracking for the vision Lambda
+Matches each frame's boxes to the session's tracks by class and overlap
+(IoU), so an object keeps its id from frame to frame. A track's box growth
+rate tells whether it is approaching and, for people, cars and bicycles,
+roughly how many seconds remain before it reaches the user.
+"""
+
+import os
+
+# Classes we estimate time-to-collision for, after alias folding
+TTC_CLASSES = frozenset(["person", "car", "bicycle"])
+CLASS_ALIASES = {"people": "person", "human": "person", "vehicle": "car", "bike": "bicycle"}
+MAX_TTC_S = 30.0
+MIN_DT_S = 0.05  # frames closer together than this carry no usable motion
+
+
+def object_class(label):
+    label = label.lower()
+    return CLASS_ALIASES.get(label, label)
+
+
+def as_list(bb):
+    return [round(bb.get("Left", 0), 4), round(bb.get("Top", 0), 4),
+            round(bb.get("Width", 0), 4), round(bb.get("Height", 0), 4)]
+
+
+def iou(a, b):
+    """Intersection over union of two [left, top, width, height] boxes"""
+    ix = max(0.0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Tracker:
+    """Greedy IoU + class matcher over a JSON-serializable per-session state dict"""
+
+    def __init__(self, min_iou=0.3, max_missed=2, max_age_s=5.0, smoothing=0.7, approach_rate=0.15):
+        self.min_iou = min_iou
+        self.max_missed = max_missed        # frames a track may go unseen before it's dropped
+        self.max_age_s = max_age_s          # ...or seconds, whichever comes first
+        self.smoothing = smoothing          # EMA weight of the newest growth measurement
+        self.approach_rate = approach_rate  # relative height growth per second that counts as approaching
+
+    def update(self, state, boxes, now):
+        """Match boxes (extract_boxes format) to tracks; returns one track summary per box"""
+        tracks = state.setdefault("tracks", [])
+        observed = [(object_class(b["label"]), as_list(b["box"])) for b in boxes]
+
+        # Best overlaps first; each track and each box is used at most once
+        pairs = sorted(
+            ((iou(t["box"], box), ti, bi)
+             for ti, t in enumerate(tracks)
+             for bi, (cls, box) in enumerate(observed) if t["cls"] == cls),
+            reverse=True
+        )
+        track_for_box, used = {}, set()
+        for overlap, ti, bi in pairs:
+            if overlap < self.min_iou:
+                break
+            if ti in used or bi in track_for_box:
+                continue
+            used.add(ti)
+            track_for_box[bi] = ti
+
+        existing = len(tracks)
+        summaries = []
+        for bi, (cls, box) in enumerate(observed):
+            if bi in track_for_box:
+                track = tracks[track_for_box[bi]]
+                self._advance(track, box, now)
+            else:
+                track = {"id": state.get("nextId", 1), "cls": cls, "box": box,
+                         "seen": now, "hits": 1, "missed": 0, "rate": None}
+                state["nextId"] = track["id"] + 1
+                tracks.append(track)
+            summaries.append(self.summary(track))
+
+        for ti in range(existing):
+            if ti not in used:
+                tracks[ti]["missed"] += 1
+        state["tracks"] = [t for t in tracks
+                           if t["missed"] <= self.max_missed and now - t["seen"] <= self.max_age_s]
+        return summaries
+
+    def summary(self, track):
+        """{trackId, approaching, ttc, growthRate} for one track"""
+        rate = track["rate"]
+        approaching = rate is not None and rate > self.approach_rate
+        ttc = None
+        if approaching and track["cls"] in TTC_CLASSES and 1.0 / rate <= MAX_TTC_S:
+            ttc = round(1.0 / rate, 1)
+        return {
+            "trackId": track["id"],
+            "approaching": approaching,
+            "ttc": ttc,
+            "growthRate": round(rate, 3) if rate is not None else None
+        }
+
+    def _advance(self, track, box, now):
+        dt = now - track["seen"]
+        old_h, new_h = track["box"][3], box[3]
+        if dt >= MIN_DT_S and old_h > 0:
+            # Apparent height is inversely proportional to distance, so for a
+            # steady approach (dh/dt) / h = 1 / time-to-collision
+            rate = (new_h - old_h) / (old_h * dt)
+            prev = track["rate"]
+            track["rate"] = rate if prev is None else self.smoothing * rate + (1 - self.smoothing) * prev
+        track.update(box=box, seen=now, hits=track["hits"] + 1, missed=0)
+
+
+def from_env():
+    """Build the tracker configured by TRACK_* environment variables"""
+    return Tracker(
+        min_iou=float(os.environ.get('TRACK_MIN_IOU', '0.3')),
+        max_missed=int(os.environ.get('TRACK_MAX_MISSED', '2')),
+        max_age_s=float(os.environ.get('TRACK_MAX_AGE_S', '5')),
+        smoothing=float(os.environ.get('TRACK_SMOOTHING', '0.7')),
+        approach_rate=float(os.environ.get('TRACK_APPROACH_RATE', '0.15'))
+    )
@@ -5,6 +5,10 @@ import { CameraView, NavigationMode, VisionMode, VideoDemoPlayer } from './compo
 
  const API_ENDPOINT = import.meta.env.VITE_API_URL
 
+// One id per page load so the backend keeps this user's scene memory separate
+const SESSION_ID = (window.crypto?.randomUUID && window.crypto.randomUUID())
+  || `s-${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
 export default function App() {
   // --- Your state and refs (unchanged) ---
   const [mode, setMode] = useState('navigation');
@@ -24,6 +28,8 @@ export default function App() {
   const streamRef = useRef(null);
   const navigationIntervalRef = useRef(null);
   const obstacleCheckIntervalRef = useRef(null);
+  const nextCaptureMsRef = useRef(2000);
+  const obstacleGenerationRef = useRef(0);
   const lastSpokenRef = useRef('');
   const speechSynthesisRef = useRef(window.speechSynthesis);
   const lastInstructionRef = useRef('');
@@ -254,6 +260,8 @@ export default function App() {
       const base64Image = imageData.split(',')[1];
 
       const payload = {
+        sessionId: SESSION_ID,
+        capturedAt: Date.now(),
         image: base64Image,
         continuous: isObstacleCheck,
         tell: !isObstacleCheck,
@@ -280,6 +288,11 @@ export default function App() {
       const data = await response.json();
       console.log('📥 API Response:', data);
 
+      // Server-recommended delay before the next obstacle frame
+      if (data.nextCaptureMs) {
+        nextCaptureMsRef.current = data.nextCaptureMs;
+      }
+
       // Handle obstacle warnings during navigation
       if (isObstacleCheck && data.obstacles) {
         handleObstacleWarning(data.obstacles);
@@ -388,17 +401,26 @@ export default function App() {
 
   const startObstacleDetection = () => {
     if (obstacleCheckIntervalRef.current) {
-      clearInterval(obstacleCheckIntervalRef.current);
+      clearTimeout(obstacleCheckIntervalRef.current);
     }
-    obstacleCheckIntervalRef.current = setInterval(() => {
-      captureAndAnalyze(true);
-    }, 2000); // Check every 2 seconds for obstacles
+    // Each check schedules the next one after the server's nextCaptureMs hint.
+    // A stop or restart bumps the generation, so a check still in flight
+    // from an older start doesn't re-arm a second polling chain.
+    const generation = ++obstacleGenerationRef.current;
+    const check = async () => {
+      await captureAndAnalyze(true);
+      if (obstacleGenerationRef.current === generation) {
+        obstacleCheckIntervalRef.current = setTimeout(check, nextCaptureMsRef.current);
+      }
+    };
+    obstacleCheckIntervalRef.current = setTimeout(check, 0);
     console.log('🚧 Obstacle detection started');
   };
 
   const stopObstacleDetection = () => {
+    obstacleGenerationRef.current += 1;
     if (obstacleCheckIntervalRef.current) {
-      clearInterval(obstacleCheckIntervalRef.current);
+      clearTimeout(obstacleCheckIntervalRef.current);
       obstacleCheckIntervalRef.current = null;
     }
     console.log('🚧 Obstacle detection stopped');
@@ -450,6 +472,8 @@ export default function App() {
       }
 
       const payload = {
+        sessionId: SESSION_ID,
+        capturedAt: Date.now(),
         image: imageData,
         latitude: currentLocation.lat,
         longitude: currentLocation.lng,
@@ -771,6 +795,7 @@ export default function App() {
     
     try {
       const payload = {
+        sessionId: SESSION_ID,
         image: canvasRef.current?.toDataURL('image/jpeg', 0.5) || '',
         latitude: currentLocation.lat,
         longitude: currentLocation.lng,
@@ -830,6 +855,7 @@ export default function App() {
         const base64Data = reader.result.split(',')[1];
 
         const payload = {
+          sessionId: SESSION_ID,
           image: base64Data,
           continuous: false,
           tell: true, // We want description
@@ -982,6 +1008,8 @@ export default function App() {
       const base64Data = imageData.split(',')[1];
 
       const payload = {
+        sessionId: SESSION_ID,
+        capturedAt: Date.now(),
         image: base64Data,
         continuous: false,
         tell: false,
@@ -1083,6 +1111,7 @@ export default function App() {
 
     try {
       const payload = {
+        sessionId: SESSION_ID,
         image: canvasRef.current?.toDataURL('image/jpeg', 0.5) || '',
         latitude: currentLocation.lat,
         longitude: currentLocation.lng